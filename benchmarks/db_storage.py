@@ -0,0 +1,172 @@
+"""
+Benchmark the storage formats of the DB service: database size, insert cost and full-text search latency.
+
+Each variant inserts the same synthetic interviews, in group-commit-sized batches, into a fresh database: plain text
+without and with the full-text index, then zlib, zstd and zstd with a dictionary trained on a first sample of the
+interviews, all with the index. The report has the file size, the insert time per row, the latency of a page of search
+results and of a page of interviews with their transcripts, which are decompressed on read.
+
+    python -m benchmarks.db_storage --rows 5000 --json storage.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from db.compression import train_dictionary, zstandard
+from db.storage import ConnectionPool, Storage, conversation_row
+
+QUESTIONS = [
+    "Tell me about a time you had to lead a team through a difficult project.",
+    "Describe a conflict with a colleague and how you resolved it.",
+    "How do you prioritize when everything seems urgent?",
+    "Tell me about a decision you made with incomplete information.",
+    "How did you adapt when the requirements changed late in a project?",
+    "Describe a time you received critical feedback.",
+    "How do you keep stakeholders informed during an incident?",
+    "Tell me about a mistake you made and what you learned from it.",
+]
+FRAGMENTS = [
+    "I led a team of {n} engineers through the {system} migration",
+    "we disagreed about the rollout plan for {system}, so I compared the risks with everyone",
+    "I prioritized by customer impact and agreed on deadlines with the product owner",
+    "when the requirements changed, I re-planned the sprint and moved the {system} work",
+    "I decided to delay the release by {n} days because the tests were flaky",
+    "I listened first, to understand how my colleagues felt about the {system} outage",
+    "we wrote a postmortem and added alerts on the {system} latency",
+    "I paired with a junior engineer for {n} weeks until they owned the {system} service",
+]
+SYSTEMS = ["billing", "search", "Kubernetes", "payments", "Kafka", "PostgreSQL", "checkout", "analytics", "GraphQL"]
+SEARCHES = ["migration", "conflict rollout", "postmortem alerts", "Kafka", "deadlines product owner", "junior engineer"]
+
+
+def fragment(rng: random.Random) -> str:
+    return rng.choice(FRAGMENTS).format(n=rng.randint(2, 12), system=rng.choice(SYSTEMS))
+
+
+def make_interview(rng: random.Random, turns: int) -> tuple:
+    """A synthetic transcript and evaluation, varied enough not to compress unrealistically well."""
+    lines = []
+    for question in rng.sample(QUESTIONS, min(turns, len(QUESTIONS))):
+        answer = ". ".join(fragment(rng) for _ in range(rng.randint(2, 5)))
+        lines.append(f"Interviewer: {question}\nCandidate: {answer[0].upper()}{answer[1:]}.")
+    evaluation = " ".join(
+        f"{skill}: {rng.randint(1, 5)}/5, the candidate said {fragment(rng)}."
+        for skill in ("Communication", "Teamwork", "Leadership", "Adaptability")
+    )
+    return "\n".join(lines), evaluation
+
+
+def make_rows(count: int, turns: int, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        conversation, evaluation = make_interview(rng, turns)
+        user = json.dumps({"name": f"Candidate {i}", "role": "Engineer", "email": f"candidate{i}@example.com"})
+        rows.append(conversation_row(f"session-{i}", user, conversation, evaluation))
+    return rows
+
+
+def percentiles(durations: list) -> dict:
+    ordered = sorted(durations)
+    return {
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)],
+    }
+
+
+def bench_variant(
+    db_name: str,
+    rows: list,
+    storage_format: str,
+    full_text_search: bool,
+    dictionary: bytes,
+    args: argparse.Namespace,
+) -> dict:
+    storage = Storage(
+        ConnectionPool(db_name, size=1, cache_mb=16, mmap_mb=256, busy_timeout_ms=30000),
+        storage_format=storage_format,
+        full_text_search=full_text_search,
+    )
+    if dictionary:
+        storage.add_dictionary(dictionary)
+    start = time.perf_counter()
+    for offset in range(0, len(rows), args.batch):
+        storage.insert_conversations(rows[offset : offset + args.batch])
+    insert_seconds = time.perf_counter() - start
+    with storage.pool.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    results = {
+        "size_mb": os.path.getsize(db_name) / 2**20,
+        "insert_us_per_row": insert_seconds / len(rows) * 1e6,
+        "inserts_per_s": len(rows) / insert_seconds,
+    }
+
+    if full_text_search:
+        durations = []
+        for _ in range(args.repeats):
+            for query in SEARCHES:
+                start = time.perf_counter()
+                storage.search(query, limit=20)
+                durations.append((time.perf_counter() - start) * 1000)
+        results["search"] = percentiles(durations)
+    durations = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        storage.list_interviews(50, fields=("conversation", "evaluation"))
+        durations.append((time.perf_counter() - start) * 1000)
+    results["read_page"] = percentiles(durations)
+    storage.pool.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the DB service's storage formats.")
+    parser.add_argument("--rows", type=int, default=5000, help="Interviews inserted per variant.")
+    parser.add_argument("--turns", type=int, default=8, help="Questions per synthetic interview.")
+    parser.add_argument("--batch", type=int, default=64, help="Rows per insert transaction, as in group commit.")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs of each read query.")
+    parser.add_argument("--training-rows", type=int, default=1000, help="Interviews the zstd dictionary is trained on.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.turns, seed=0)
+    variants = {
+        "text": ("text", False, b""),
+        "text + fts": ("text", True, b""),
+        "zlib + fts": ("zlib", True, b""),
+    }
+    if zstandard is not None:
+        training = make_rows(args.training_rows, args.turns, seed=1)
+        dictionary = train_dictionary([text for row in training for text in row[2:4]], 64 * 1024)
+        variants["zstd + fts"] = ("zstd", True, b"")
+        variants["zstd + dictionary + fts"] = ("zstd", True, dictionary)
+    else:
+        print("zstandard is not installed; skipping the zstd variants.")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (storage_format, full_text_search, dictionary) in variants.items():
+            db_name = os.path.join(tmp, f"{len(results)}.db")
+            results[name] = bench_variant(db_name, rows, storage_format, full_text_search, dictionary, args)
+
+    print(f"{args.rows} interviews")
+    print(f"{'variant':26s} {'size MB':>8s} {'us/insert':>10s} {'search p50':>11s} {'p95 ms':>8s} {'read p50':>9s}")
+    for name, result in results.items():
+        search = result.get("search", {})
+        print(
+            f"{name:26s} {result['size_mb']:8.1f} {result['insert_us_per_row']:10.0f} "
+            f"{search.get('p50_ms', float('nan')):11.2f} {search.get('p95_ms', float('nan')):8.2f} "
+            f"{result['read_page']['p50_ms']:9.2f}"
+        )
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"rows": args.rows, "variants": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
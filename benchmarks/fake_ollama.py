@@ -0,0 +1,98 @@
+"""
+Local stand-in for Ollama's /api/generate, for load tests without a GPU or network.
+
+Responses are canned, but timing follows a real model: a prefill delay per prompt token, then a delay per generated
+token, with at most FAKE_OLLAMA_PARALLEL generations running at once (like OLLAMA_NUM_PARALLEL). Streaming, the
+`context` field, `format: "json"` and the token counters are supported.
+
+    FAKE_OLLAMA_TOKEN_MS=20 uvicorn benchmarks.fake_ollama:app --port 11434
+
+Settings (environment variables):
+    FAKE_OLLAMA_TOKEN_MS: Delay per generated token, in milliseconds (default 10).
+    FAKE_OLLAMA_PREFILL_MS_PER_TOKEN: Delay per prompt token not covered by the context (default 0.2).
+    FAKE_OLLAMA_PARALLEL: Number of generations served concurrently (default 4).
+"""
+
+import asyncio
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+TOKEN_DELAY = float(os.getenv("FAKE_OLLAMA_TOKEN_MS", "10")) / 1000
+PREFILL_DELAY_PER_TOKEN = float(os.getenv("FAKE_OLLAMA_PREFILL_MS_PER_TOKEN", "0.2")) / 1000
+PARALLEL = int(os.getenv("FAKE_OLLAMA_PARALLEL", "4"))
+
+QUESTIONS = [
+    "Can you tell me about a time you had to resolve a disagreement within your team?",
+    "How do you prioritize your work when several deadlines overlap?",
+    "Describe a situation where you had to adapt quickly to a change in requirements.",
+    "What is a decision you made with incomplete information, and how did it turn out?",
+]
+REVIEW = (
+    "The candidate communicated clearly and gave concrete examples. They showed good teamwork and adaptability, "
+    "but could have gone deeper on how they handled conflict and on the reasoning behind their decisions."
+)
+
+app = FastAPI(title="Fake Ollama")
+slots = None
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def pieces(text: str) -> list:
+    # Roughly one token per word, with the separating space kept on the following piece.
+    words = text.split(" ")
+    return [words[0]] + [" " + word for word in words[1:]]
+
+
+def answer(body: dict) -> str:
+    if body.get("format") == "json":
+        return json.dumps({"score": random.randint(2, 5), "justification": "Gave specific, relevant examples."})
+    if "Conversation History:" in body.get("prompt", "") and "Guidelines" not in body.get("prompt", ""):
+        return REVIEW
+    return f"Interviewer: {random.choice(QUESTIONS)}"
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    global slots
+    if slots is None:
+        slots = asyncio.Semaphore(PARALLEL)
+    body = await request.json()
+    prompt = body.get("system", "") + body.get("prompt", "")
+    context = body.get("context") or []
+    prompt_tokens = estimate_tokens(prompt)
+    text = answer(body)
+    tokens = pieces(text)
+    final = {
+        "model": body.get("model"),
+        "done": True,
+        "context": context + list(range(prompt_tokens + len(tokens))),
+        "prompt_eval_count": prompt_tokens,
+        "eval_count": len(tokens),
+    }
+
+    if not body.get("stream", True):
+        async with slots:
+            await asyncio.sleep(prompt_tokens * PREFILL_DELAY_PER_TOKEN + len(tokens) * TOKEN_DELAY)
+        return {**final, "response": text}
+
+    async def chunks():
+        async with slots:
+            await asyncio.sleep(prompt_tokens * PREFILL_DELAY_PER_TOKEN)
+            for token in tokens:
+                await asyncio.sleep(TOKEN_DELAY)
+                yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+        yield json.dumps({**final, "response": ""}) + "\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": []}
@@ -0,0 +1,280 @@
+"""
+Frontend load test: how many concurrent candidate sessions one Streamlit server process can drive.
+
+A Streamlit server runs frontend/app.py, like one frontend pod, and each simulated candidate talks to it the way a
+browser does: over its own websocket, sending widget interactions and waiting until the script run they trigger has
+finished. Each candidate submits the form, answers questions until the interview is complete (or --turns), and
+finishes the interview, which shows the evaluation status. The fake Ollama, db and llm services are spawned as in
+benchmarks/load_test.py, unless --llm-url targets a running llm service; --frontend-url targets a running frontend.
+
+For each level of --concurrency, the report has p50/p95/p99 latency per step (from the interaction to the end of the
+script run), sessions completed per second, failed sessions and the frontend's peak memory. The highest level whose
+p95 turn latency stays within --slo-ms is printed last.
+
+    python -m benchmarks.frontend_load --concurrency 1,5,10,25,50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+
+from benchmarks.load_test import (
+    ANSWERS,
+    Recorder,
+    free_port,
+    sample_memory,
+    spawn_stack,
+    wait_ready,
+)
+
+
+class SessionError(Exception):
+    """Raised when a script run of a simulated session raised an exception or showed an error."""
+
+
+class BrowserSession:
+    """A simulated browser tab: one Streamlit session over its own websocket."""
+
+    def __init__(self, frontend_url: str, timeout: float) -> None:
+        self.url = frontend_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.timeout = timeout
+        self.websocket = None
+        self.page_script_hash = ""
+        # Widget IDs by (widget type, label), learned from the elements rendered so far.
+        self.widgets = {}
+
+    async def connect(self) -> None:
+        request = HTTPRequest(self.url, headers={"Sec-WebSocket-Protocol": "streamlit"})
+        self.websocket = await websocket_connect(request, subprotocols=["streamlit"])
+
+    def close(self) -> None:
+        if self.websocket is not None:
+            self.websocket.close()
+
+    def widget(self, kind: str, label: str) -> str:
+        return self.widgets[(kind, label)]
+
+    async def run(self, widget_states: Optional[list] = None) -> set:
+        """
+        Rerun the script with the given widget interactions, like a browser does, and wait until it has finished.
+
+        Args:
+            widget_states (Optional[list]): `WidgetState`s sent with the rerun.
+
+        Returns:
+            set: The (widget type, label) pairs rendered by the run.
+
+        Raises:
+            SessionError: If the run raised an exception or rendered an error.
+        """
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page_script_hash
+        message.rerun_script.widget_states.widgets.extend(widget_states or [])
+        await self.websocket.write_message(message.SerializeToString(), binary=True)
+        rendered = set()
+        while True:
+            payload = await asyncio.wait_for(self.websocket.read_message(), self.timeout)
+            if payload is None:
+                raise SessionError("The frontend closed the connection.")
+            forward = ForwardMsg()
+            forward.ParseFromString(payload)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                rendered |= self.record(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                return rendered
+
+    def record(self, element) -> set:
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            raise SessionError(f"{element.exception.type}: {element.exception.message}")
+        if kind == "alert" and element.alert.format == Alert.ERROR:
+            raise SessionError(element.alert.body)
+        if kind in ("text_input", "button"):
+            widget = getattr(element, kind)
+            self.widgets[(kind, widget.label)] = widget.id
+            return {(kind, widget.label)}
+        if kind == "chat_input":
+            self.widgets[(kind, element.chat_input.placeholder)] = element.chat_input.id
+            return {(kind, element.chat_input.placeholder)}
+        return set()
+
+
+async def run_session(frontend_url: str, recorder: Recorder, index: int, args: argparse.Namespace) -> None:
+    session = BrowserSession(frontend_url, args.timeout)
+    await session.connect()
+    try:
+        await session.run()
+        form = [
+            WidgetState(id=session.widget("text_input", label), string_value=value)
+            for label, value in (
+                ("Name", f"Candidate {index}"),
+                ("Email", f"candidate{index}@example.com"),
+                ("Role", "Software Engineer"),
+            )
+        ]
+        form.append(WidgetState(id=session.widget("button", "Submit"), trigger_value=True))
+        start = time.perf_counter()
+        rendered = await session.run(form)
+        recorder.add("start", time.perf_counter() - start)
+
+        for turn in range(args.turns):
+            if ("button", "Finish Interview") in rendered:
+                break
+            answer = WidgetState(id=session.widget("chat_input", "Your Response"))
+            answer.string_trigger_value.data = ANSWERS[(index + turn) % len(ANSWERS)]
+            start = time.perf_counter()
+            rendered = await session.run([answer])
+            recorder.add("turn", time.perf_counter() - start)
+            if args.think_ms:
+                await asyncio.sleep(args.think_ms / 1000)
+
+        if ("button", "Finish Interview") in rendered:
+            start = time.perf_counter()
+            await session.run([WidgetState(id=session.widget("button", "Finish Interview"), trigger_value=True)])
+            recorder.add("finish", time.perf_counter() - start)
+    finally:
+        session.close()
+
+
+async def run_level(frontend_url: str, concurrency: int, args: argparse.Namespace, pid: Optional[int]) -> dict:
+    """Run `concurrency * --rounds` sessions, `concurrency` at a time, and report their latencies."""
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            try:
+                await run_session(frontend_url, recorder, index, args)
+            except (SessionError, KeyError, OSError, asyncio.TimeoutError) as e:
+                failures.append(repr(e))
+                print(f"session {index} failed: {e!r}", file=sys.stderr)
+
+    peaks = {}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_memory({"frontend": pid} if pid else {}, peaks, stop))
+    sessions = concurrency * args.rounds
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "failed_sessions": len(failures),
+        "elapsed_s": elapsed,
+        "sessions_per_s": (sessions - len(failures)) / elapsed,
+        "steps": recorder.report(elapsed),
+        "peak_rss_mb": peaks.get("frontend"),
+    }
+
+
+@contextmanager
+def spawn_frontend(llm_url: str, args: argparse.Namespace, tmp: str) -> Iterator[tuple]:
+    """Start a Streamlit server for frontend/app.py; yield its URL and process ID."""
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "streamlit",
+        "run",
+        "frontend/app.py",
+        "--server.port",
+        str(port),
+        "--server.headless",
+        "true",
+        "--browser.gatherUsageStats",
+        "false",
+    ]
+    with open(os.path.join(tmp, "frontend.log"), "w") as log:
+        process = subprocess.Popen(
+            command, env={**os.environ, "BACKEND_URL": llm_url}, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            url = f"http://127.0.0.1:{port}"
+            wait_ready(f"{url}/_stcore/health", timeout=args.startup_timeout)
+            yield url, process.pid
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def print_level(results: dict) -> None:
+    memory = f", peak RSS {results['peak_rss_mb']:.0f} MB" if results["peak_rss_mb"] else ""
+    print(
+        f"concurrency {results['concurrency']}: {results['sessions']} sessions, {results['failed_sessions']} failed, "
+        f"{results['sessions_per_s']:.2f} sessions/s{memory}"
+    )
+    print(f"  {'step':12s} {'count':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, stats in results["steps"].items():
+        latencies = " ".join(f"{stats.get(key, float('nan')):9.1f}" for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"  {name:12s} {stats['count']:6d} {latencies}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test one Streamlit frontend process.")
+    parser.add_argument("--concurrency", default="1,5,10,25", help="Comma-separated concurrent session counts.")
+    parser.add_argument("--rounds", type=int, default=1, help="Sessions run per concurrent slot at each level.")
+    parser.add_argument("--turns", type=int, default=10, help="Maximum questions answered per session.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between a question and its answer.")
+    parser.add_argument("--slo-ms", type=float, default=2000, help="p95 turn latency a level must stay within.")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed for each script run.")
+    parser.add_argument("--frontend-url", help="Target a running frontend instead of spawning one.")
+    parser.add_argument("--llm-url", help="Point the spawned frontend at a running llm service.")
+    parser.add_argument("--token-ms", type=float, default=10, help="Fake Ollama delay per generated token.")
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Fake Ollama concurrent generations.")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Seconds to wait for each service.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    def run_levels(frontend_url: str, pid: Optional[int] = None) -> list:
+        levels = []
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            levels.append(asyncio.run(run_level(frontend_url, concurrency, args, pid)))
+            print_level(levels[-1])
+        return levels
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.frontend_url:
+            levels = run_levels(args.frontend_url)
+        elif args.llm_url:
+            with spawn_frontend(args.llm_url, args, tmp) as (frontend_url, pid):
+                levels = run_levels(frontend_url, pid)
+        else:
+            with spawn_stack(args, tmp) as stack, spawn_frontend(stack["urls"]["llm"], args, tmp) as (
+                frontend_url,
+                pid,
+            ):
+                levels = run_levels(frontend_url, pid)
+
+    within_slo = [
+        level["concurrency"]
+        for level in levels
+        if not level["failed_sessions"] and level["steps"].get("turn", {}).get("p95_ms", float("inf")) <= args.slo_ms
+    ]
+    print(f"highest concurrency within the {args.slo_ms:.0f} ms p95 turn SLO: {max(within_slo, default=0)}")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"slo_ms": args.slo_ms, "levels": levels}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Load test: drive simulated interviews through the llm and db services and report per-endpoint latency.
+
+By default the fake Ollama (benchmarks/fake_ollama.py), the db service and the llm service are started as local
+subprocesses on free ports, so no GPU is needed; with --fake-embeddings, the llm service also uses the deterministic
+fake embedding model instead of downloading the configured one, so no network is needed either. Pass --llm-url to
+target an already running stack.
+
+Each simulated candidate calls /start, answers --turns questions through /generate_question (or the streaming
+endpoint with --stream), calls /generate_evaluation and polls /evaluation/{job_id} until the evaluation is done.
+The report has p50/p95/p99 latency and throughput per endpoint, and the peak memory of the spawned services. The run
+fails if any request failed.
+
+    python -m benchmarks.load_test --interviews 50 --concurrency 10 --turns 3 --fake-embeddings
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import httpx
+
+from llm.embeddings import FAKE_MODEL
+
+ANSWERS = [
+    "In my last role I led a team of four engineers through a database migration.",
+    "I split the work into milestones and agreed on priorities with the product owner.",
+    "We had a disagreement about the rollout plan, so I set up a meeting to compare the risks.",
+    "I learned to communicate trade-offs earlier and to write decisions down.",
+]
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in megabytes, read from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class Recorder:
+    """Collects latencies and errors per endpoint."""
+
+    def __init__(self) -> None:
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except (httpx.HTTPError, KeyError, ValueError):
+            self.errors[name] += 1
+            raise
+        self.latencies[name].append(time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.latencies[name].append(seconds)
+
+    def report(self, elapsed: float) -> dict:
+        results = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies[name]
+            results[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "throughput_per_s": len(values) / elapsed,
+                **(
+                    {
+                        "p50_ms": percentile(values, 50) * 1000,
+                        "p95_ms": percentile(values, 95) * 1000,
+                        "p99_ms": percentile(values, 99) * 1000,
+                        "max_ms": max(values) * 1000,
+                    }
+                    if values
+                    else {}
+                ),
+            }
+        return results
+
+
+async def run_interview(client: httpx.AsyncClient, recorder: Recorder, index: int, args: argparse.Namespace) -> None:
+    candidate = {"name": f"Candidate {index}", "role": "Software Engineer", "email": f"candidate{index}@example.com"}
+    with recorder.measure("/start"):
+        response = await client.post("/start", json=candidate)
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+
+    for turn in range(args.turns):
+        payload = {"session_id": session_id, "user_input": ANSWERS[(index + turn) % len(ANSWERS)]}
+        if args.stream:
+            start = time.perf_counter()
+            first_token = None
+            with recorder.measure("/generate_question_stream"):
+                async with client.stream("POST", "/generate_question_stream", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if first_token is None and line.startswith("data:"):
+                            first_token = time.perf_counter() - start
+            if first_token is not None:
+                recorder.add("/generate_question_stream (first token)", first_token)
+        else:
+            with recorder.measure("/generate_question"):
+                response = await client.post("/generate_question", json=payload)
+                response.raise_for_status()
+        if args.think_ms:
+            await asyncio.sleep(args.think_ms / 1000)
+
+    with recorder.measure("/generate_evaluation"):
+        response = await client.post("/generate_evaluation", json={"session_id": session_id})
+        response.raise_for_status()
+        job_id = response.json().get("job_id")
+    if job_id is None:
+        return
+
+    # Time until the background evaluation is done, polled like the frontend would.
+    with recorder.measure("evaluation job"):
+        while True:
+            response = await client.get(f"/evaluation/{job_id}")
+            response.raise_for_status()
+            status = response.json()["status"]
+            if status in ("done", "failed"):
+                break
+            await asyncio.sleep(args.poll_ms / 1000)
+        if status == "failed":
+            raise ValueError(f"Evaluation job {job_id} failed.")
+
+
+async def drive(args: argparse.Namespace, llm_url: str) -> tuple:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=llm_url, timeout=args.timeout, limits=limits) as client:
+
+        async def one(index: int) -> None:
+            async with semaphore:
+                try:
+                    await run_interview(client, recorder, index, args)
+                except (httpx.HTTPError, KeyError, ValueError) as e:
+                    print(f"interview {index} failed: {e!r}", file=sys.stderr)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(args.interviews)))
+        elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+def wait_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.25)
+    raise RuntimeError(f"Service at {url} did not start within {timeout}s.")
+
+
+@contextmanager
+def spawn_stack(args: argparse.Namespace, tmp: str) -> Iterator[dict]:
+    """Start the fake Ollama, db and llm services; yield their URLs and process IDs."""
+    ports = {"ollama": free_port(), "db": free_port(), "llm": free_port()}
+    urls = {name: f"http://127.0.0.1:{port}" for name, port in ports.items()}
+    env = {
+        **os.environ,
+        "FAKE_OLLAMA_TOKEN_MS": str(args.token_ms),
+        "FAKE_OLLAMA_PARALLEL": str(args.ollama_parallel),
+        "DB_NAME": os.path.join(tmp, "conversations.db"),
+        "OLLAMA_URL": urls["ollama"],
+        "DB_SERVICE_URL": urls["db"],
+        "TOKENIZERS_PARALLELISM": "false",
+    }
+    if args.fake_embeddings:
+        env["EMBEDDING_MODEL"] = FAKE_MODEL
+    apps = {"ollama": "benchmarks.fake_ollama:app", "db": "db.main:app", "llm": "llm.api:app"}
+    processes = {}
+    try:
+        for name in ("ollama", "db", "llm"):
+            log = open(os.path.join(tmp, f"{name}.log"), "w")
+            processes[name] = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", apps[name], "--port", str(ports[name]), "--log-level", "warning"],
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            wait_ready(f"{urls[name]}/docs", timeout=args.startup_timeout)
+        yield {"urls": urls, "pids": {name: process.pid for name, process in processes.items()}}
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait(timeout=30)
+
+
+async def sample_memory(pids: dict, peaks: dict, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        for name, pid in pids.items():
+            value = rss_mb(pid)
+            if value is not None:
+                peaks[name] = max(peaks.get(name, 0), value)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args: argparse.Namespace, llm_url: str, pids: dict) -> dict:
+    peaks = {}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_memory(pids, peaks, stop))
+    recorder, elapsed = await drive(args, llm_url)
+    stop.set()
+    await sampler
+    return {
+        "interviews": args.interviews,
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "endpoints": recorder.report(elapsed),
+        "peak_rss_mb": peaks,
+    }
+
+
+def print_report(results: dict) -> None:
+    print(
+        f"{results['interviews']} interviews, concurrency {results['concurrency']}, "
+        f"{results['elapsed_s']:.1f}s wall time"
+    )
+    print(f"{'endpoint':42s} {'count':>6s} {'errors':>6s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, stats in results["endpoints"].items():
+        latencies = [f"{stats.get(key, float('nan')):9.1f}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(
+            f"{name:42s} {stats['count']:6d} {stats['errors']:6d} {stats['throughput_per_s']:8.2f} {' '.join(latencies)}"
+        )
+    for name, peak in results["peak_rss_mb"].items():
+        print(f"peak RSS {name:33s} {peak:8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the interview services.")
+    parser.add_argument("--interviews", type=int, default=20, help="Number of simulated interviews.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Interviews running at the same time.")
+    parser.add_argument("--turns", type=int, default=3, help="Questions answered per interview.")
+    parser.add_argument("--stream", action="store_true", help="Use /generate_question_stream.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between a question and its answer.")
+    parser.add_argument("--poll-ms", type=float, default=100, help="Evaluation status polling interval.")
+    parser.add_argument("--timeout", type=float, default=300, help="HTTP timeout per request, in seconds.")
+    parser.add_argument("--llm-url", help="Target a running llm service instead of spawning the stack.")
+    parser.add_argument("--token-ms", type=float, default=10, help="Fake Ollama delay per generated token.")
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Fake Ollama concurrent generations.")
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Spawn the llm service with a deterministic fake embedding model.",
+    )
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Seconds to wait for each service.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if args.llm_url:
+        results = asyncio.run(run(args, args.llm_url, pids={}))
+    else:
+        with tempfile.TemporaryDirectory() as tmp, spawn_stack(args, tmp) as stack:
+            results = asyncio.run(run(args, stack["urls"]["llm"], stack["pids"]))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    errors = sum(stats["errors"] for stats in results["endpoints"].values())
+    if errors:
+        sys.exit(f"{errors} requests failed.")
+
+
+if __name__ == "__main__":
+    main()
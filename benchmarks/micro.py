@@ -0,0 +1,159 @@
+"""
+Micro-benchmarks for the hot paths that do not need an LLM: loading the vectorstore, retrieving interview context
+and inserting interviews into SQLite.
+
+    python -m benchmarks.micro --fake-embeddings --json micro.json
+    python -m benchmarks.micro --fake-embeddings --baseline micro.json
+
+With --fake-embeddings, a deterministic fake embedding model replaces the configured one, so the run needs neither
+the model download nor a GPU; it then measures the index and retrieval code rather than the model. With --baseline,
+the run fails if a timing is more than --tolerance times slower than in the baseline file.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import yaml
+
+# InterviewChain reads the service URLs at construction; nothing is requested from them here.
+os.environ.setdefault("OLLAMA_URL", "http://127.0.0.1:11434")
+os.environ.setdefault("DB_SERVICE_URL", "http://127.0.0.1:8001")
+
+from benchmarks.db_insert import bench_group_commit, bench_pooled_per_row  # noqa: E402
+from llm.embeddings import FakeEmbedding  # noqa: E402
+from llm.index_cache import load_or_build_vectorstore  # noqa: E402
+from llm.interview_chain import InterviewChain  # noqa: E402
+from llm.retrieval import Retriever  # noqa: E402
+
+QUERIES = [
+    "I led a team of four engineers through a database migration.",
+    "We disagreed about the rollout plan, so I compared the risks with everyone.",
+    "I prioritize by impact and agree on deadlines with the product owner.",
+    "When requirements changed late, I re-planned the sprint with the team.",
+    "I made the call to delay the release because the tests were flaky.",
+    "I try to listen first and understand how my colleagues feel.",
+]
+
+
+def timed(function, repeats: int) -> list:
+    """Run `function` `repeats` times and return each duration in milliseconds."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations: list) -> dict:
+    ordered = sorted(durations)
+    return {
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)],
+    }
+
+
+def bench_vectorstore(config: dict, embedding, repeats: int) -> dict:
+    """Cold build of the index, then warm loads from the on-disk cache, as done by `init_vectorstore`."""
+    results = {
+        "vectorstore build (cold)": summarize(timed(lambda: load_or_build_vectorstore(config, True, embedding), 1))
+    }
+    results["vectorstore load (cached)"] = summarize(
+        timed(lambda: load_or_build_vectorstore(config, False, embedding), repeats)
+    )
+    return results
+
+
+def bench_get_context(config: dict, embedding, repeats: int) -> dict:
+    """`InterviewChain.get_context` with cold caches and with warm caches, for each retrieval mode."""
+    vectorstore = load_or_build_vectorstore(config, embedding=embedding)
+    results = {}
+    for mode in ("faiss", "exact"):
+        retriever = Retriever(vectorstore, {**config, "retrieval": {**config["retrieval"], "mode": mode}})
+        chain = InterviewChain(config, retriever=retriever)
+        turns = iter([QUERIES[i % len(QUERIES)] for i in range(repeats)])
+
+        def uncached():
+            retriever.embedding_cache.clear()
+            retriever.result_cache.clear()
+            chain.update_history(next(turns), "Candidate")
+            chain.get_context()
+
+        results[f"get_context {mode} (uncached)"] = summarize(timed(uncached, repeats))
+        chain.update_history(QUERIES[0], "Candidate")
+        chain.get_context()
+        results[f"get_context {mode} (cached)"] = summarize(timed(chain.get_context, repeats))
+    return results
+
+
+def bench_sqlite(rows: int, writers: int) -> dict:
+    """Per-interview insert cost of the DB service's pooled and group-commit paths."""
+    with tempfile.TemporaryDirectory() as tmp:
+        pooled = bench_pooled_per_row(os.path.join(tmp, "pooled.db"), rows, writers)
+        grouped = bench_group_commit(os.path.join(tmp, "grouped.db"), rows, writers, batch=256, latency_ms=0)
+    count = rows // writers * writers
+    return {
+        "sqlite insert pooled per row": {"median_ms": pooled / count * 1000},
+        "sqlite insert group commit": {"median_ms": grouped / count * 1000},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """List the timings that are more than `tolerance` times slower than the baseline."""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get(name, {}).get("median_ms")
+        if previous and stats["median_ms"] > previous * tolerance:
+            regressions.append(f"{name}: {stats['median_ms']:.3f} ms vs {previous:.3f} ms in the baseline")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark vectorstore loading, retrieval and SQLite inserts.")
+    parser.add_argument("--config", default="llm/config.yml", help="Path to the llm service config.")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use a deterministic fake embedding model.")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1000, help="Rows inserted by the SQLite benchmarks.")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writers in the SQLite benchmarks.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--baseline", help="Fail if a timing regressed compared to this results file.")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Allowed slowdown factor against the baseline.")
+    args = parser.parse_args()
+
+    with open(args.config) as config_file:
+        config = yaml.safe_load(config_file)
+    embedding = None
+    if args.fake_embeddings:
+        embedding = FakeEmbedding()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A private index cache, so the benchmark never reads or replaces the service's cached index.
+        config = {**config, "index_cache_dir": os.path.join(tmp, "index"), "index_seed_dir": ""}
+        results = {
+            **bench_vectorstore(config, embedding, args.repeats // 5 or 1),
+            **bench_get_context(config, embedding, args.repeats),
+        }
+    results.update(bench_sqlite(args.rows, args.writers))
+
+    for name, stats in results.items():
+        extra = f"  p95 {stats['p95_ms']:9.3f} ms" if "p95_ms" in stats else ""
+        print(f"{name:36s} median {stats['median_ms']:9.3f} ms{extra}")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
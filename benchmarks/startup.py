@@ -0,0 +1,121 @@
+"""
+Startup benchmark for the llm service: import time, time until the port is bound, and time until it is ready.
+
+Each run imports `llm.api` in a fresh interpreter, then starts the service with uvicorn and polls /health (liveness,
+answered as soon as the port is bound) and /ready (answered once the embedding model and the vectorstore are loaded).
+The first run may include building the index cache; later runs load it from disk. With --fake-embeddings, the service
+uses the deterministic fake embedding model, so the run needs no network but does not time loading the real model.
+
+    python -m benchmarks.startup --runs 5 --json bench-startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load_test import free_port
+from llm.embeddings import FAKE_MODEL
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import llm.api; print(time.perf_counter() - start)"
+
+
+def service_env(fake_embeddings: bool) -> dict:
+    # The service reads its upstream URLs at import; nothing is requested from them during startup.
+    env = {
+        **os.environ,
+        "OLLAMA_URL": os.environ.get("OLLAMA_URL", "http://127.0.0.1:11434"),
+        "DB_SERVICE_URL": os.environ.get("DB_SERVICE_URL", "http://127.0.0.1:8001"),
+        "TOKENIZERS_PARALLELISM": "false",
+    }
+    if fake_embeddings:
+        env["EMBEDDING_MODEL"] = FAKE_MODEL
+    return env
+
+
+def time_import(fake_embeddings: bool) -> float:
+    """Seconds to import `llm.api` in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=service_env(fake_embeddings),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def poll(client: httpx.Client, url: str, deadline: float) -> float:
+    """Poll a URL until it answers 200 and return the time it did, or raise after the deadline."""
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not answer within the timeout.")
+
+
+def time_server(timeout: float, log_path: str, fake_embeddings: bool) -> dict:
+    """Start the service and time until /health and then /ready answer."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "llm.api:app", "--port", str(port), "--log-level", "warning"],
+            env=service_env(fake_embeddings),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            deadline = time.monotonic() + timeout
+            with httpx.Client(timeout=1) as client:
+                live = poll(client, f"{url}/health", deadline)
+                ready = poll(client, f"{url}/ready", deadline)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return {"live_s": live - start, "ready_s": ready - start}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the llm service startup.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the service in each run.")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use a deterministic fake embedding model.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    imports, live, ready = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            imports.append(time_import(args.fake_embeddings))
+            timings = time_server(args.timeout, os.path.join(tmp, f"llm-{run}.log"), args.fake_embeddings)
+            live.append(timings["live_s"])
+            ready.append(timings["ready_s"])
+            print(
+                f"run {run}: import {imports[-1]:.2f}s, live after {timings['live_s']:.2f}s, "
+                f"ready after {timings['ready_s']:.2f}s"
+            )
+
+    results = {
+        name: {"median_s": statistics.median(values), "max_s": max(values), "runs": values}
+        for name, values in (("import", imports), ("live", live), ("ready", ready))
+    }
+    for name, stats in results.items():
+        print(f"{name:8s} median {stats['median_s']:7.2f}s  max {stats['max_s']:7.2f}s")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Compression of the large text columns: the interview transcript and the evaluation.
+
+Compressed values are stored as BLOBs in the same columns. SQLite keeps the type of each value, so rows written as
+plain text, before compression was enabled or with it disabled, stay readable next to compressed ones, whatever the
+current format. A compressed value starts with a one-byte codec tag and the 4-byte ID of the zstd dictionary it was
+compressed with (0 for none), followed by the compressed UTF-8 text.
+"""
+
+import struct
+import threading
+import zlib
+from typing import Callable, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ("text", "zlib", "zstd")
+ZLIB = 1
+ZSTD = 2
+HEADER = struct.Struct(">BI")
+# Shorter values are kept as text: the header and the compression framing would outweigh the savings.
+MIN_COMPRESSED_BYTES = 128
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+
+
+def train_dictionary(samples: list, size: int) -> bytes:
+    """
+    Train a zstd dictionary on past transcripts and evaluations.
+
+    Args:
+        samples (list): Texts representative of the stored values.
+        size (int): Maximum dictionary size, in bytes.
+
+    Returns:
+        bytes: The dictionary.
+
+    Raises:
+        RuntimeError: If the zstandard package is not installed, or the samples are too few to train on.
+    """
+    if zstandard is None:
+        raise RuntimeError("Training a dictionary requires the zstandard package.")
+    try:
+        return zstandard.train_dictionary(size, [sample.encode() for sample in samples]).as_bytes()
+    except zstandard.ZstdError as e:
+        raise RuntimeError(f"Could not train a dictionary on {len(samples)} samples: {e}")
+
+
+class TextCodec:
+    """
+    Compresses text values in the configured format and decompresses values of any format.
+
+    zstd values are compressed with the newest dictionary, and decompressed with the one they were compressed with.
+    Thread-safe: each thread uses its own zstd compressor and decompressors.
+    """
+
+    def __init__(
+        self,
+        storage_format: str = "text",
+        level: Optional[int] = None,
+        load_dictionaries: Optional[Callable[[], dict]] = None,
+    ) -> None:
+        """
+        Initialize the codec and load the dictionaries.
+
+        Args:
+            storage_format (str): `text` to store values uncompressed, `zlib`, or `zstd`.
+            level (Optional[int]): Compression level; the format's default if None.
+            load_dictionaries (Optional[Callable[[], dict]]): Returns the zstd dictionaries, keyed by ID.
+
+        Raises:
+            ValueError: If the format is unknown.
+            RuntimeError: If the format is `zstd` and the zstandard package is not installed.
+        """
+        if storage_format not in FORMATS:
+            raise ValueError(f"Unknown storage format {storage_format!r}; expected one of {', '.join(FORMATS)}.")
+        if storage_format == "zstd" and zstandard is None:
+            raise RuntimeError("The zstd storage format requires the zstandard package.")
+        self.storage_format = storage_format
+        self.level = level if level is not None else DEFAULT_LEVELS.get(storage_format)
+        self._load_dictionaries = load_dictionaries or dict
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """Reload the dictionaries; the newest one is used to compress from now on."""
+        dictionaries = self._load_dictionaries()
+        with self._lock:
+            self._dictionaries = (
+                {dict_id: zstandard.ZstdCompressionDict(data) for dict_id, data in dictionaries.items()}
+                if zstandard is not None
+                else {}
+            )
+            self.dictionary_id = max(dictionaries, default=0)
+            # Compressors and decompressors of each thread, bound to the dictionaries loaded above.
+            self._local = threading.local()
+
+    def encode(self, text: Optional[str]) -> Union[str, bytes, None]:
+        """
+        Compress a value for storage.
+
+        Args:
+            text (Optional[str]): Value to store.
+
+        Returns:
+            Union[str, bytes, None]: The compressed value, or the text itself if the format is `text` or compressing
+                does not make it smaller.
+        """
+        if text is None or self.storage_format == "text":
+            return text
+        data = text.encode()
+        if len(data) < MIN_COMPRESSED_BYTES:
+            return text
+        if self.storage_format == "zlib":
+            value = HEADER.pack(ZLIB, 0) + zlib.compress(data, self.level)
+        else:
+            local = self._local
+            if not hasattr(local, "compressor"):
+                dictionary_id = self.dictionary_id
+                dictionary = self._dictionaries.get(dictionary_id)
+                local.compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+                local.compressor_dictionary_id = dictionary_id
+            value = HEADER.pack(ZSTD, local.compressor_dictionary_id) + local.compressor.compress(data)
+        return value if len(value) < len(data) else text
+
+    def decode(self, value: Union[str, bytes, None]) -> Optional[str]:
+        """
+        Decompress a stored value.
+
+        Args:
+            value (Union[str, bytes, None]): Value as stored; text values are returned as is.
+
+        Returns:
+            Optional[str]: The text.
+
+        Raises:
+            RuntimeError: If the value is compressed with zstd and the zstandard package is not installed.
+            ValueError: If the value is compressed with an unknown codec or dictionary.
+        """
+        if not isinstance(value, bytes):
+            return value
+        codec, dictionary_id = HEADER.unpack_from(value)
+        payload = memoryview(value)[HEADER.size :]
+        if codec == ZLIB:
+            return zlib.decompress(payload).decode()
+        if codec != ZSTD:
+            raise ValueError(f"Unknown compression codec {codec}.")
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed values requires the zstandard package.")
+        if dictionary_id and dictionary_id not in self._dictionaries:
+            # Trained by the migration tool after the dictionaries were loaded.
+            self.reload()
+            if dictionary_id not in self._dictionaries:
+                raise ValueError(f"Unknown compression dictionary {dictionary_id}.")
+        local = self._local
+        if not hasattr(local, "decompressors"):
+            local.decompressors = {}
+        decompressor = local.decompressors.get(dictionary_id)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionaries.get(dictionary_id))
+            local.decompressors[dictionary_id] = decompressor
+        return decompressor.decompress(payload).decode()
@@ -1,35 +1,54 @@
+import asyncio
+import base64
+import binascii
+import json
 import os
-import sqlite3
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-app = FastAPI(title="Database Service")
+from db.metrics import QUERY_SECONDS, QUEUED_WRITES, instrument
+from db.storage import (
+    DEFAULT_FIELDS,
+    ConnectionPool,
+    Storage,
+    check_fields,
+    conversation_row,
+)
+from db.writer import GroupCommitWriter
 
 # Use an environment variable for the DB file name; default to conversations.db
 DB_NAME = os.getenv("DB_NAME", "conversations.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_CACHE_MB = int(os.getenv("DB_CACHE_MB", "16"))
+DB_MMAP_MB = int(os.getenv("DB_MMAP_MB", "256"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_GROUP_COMMIT_MAX_BATCH = int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", "256"))
+DB_GROUP_COMMIT_MAX_LATENCY_MS = float(os.getenv("DB_GROUP_COMMIT_MAX_LATENCY_MS", "0"))
+# How new transcripts and evaluations are stored: text, zlib or zstd; `python -m db.migrate` converts existing rows.
+DB_STORAGE_FORMAT = os.getenv("DB_STORAGE_FORMAT", "text")
+DB_FULL_TEXT_SEARCH = os.getenv("DB_FULL_TEXT_SEARCH", "1") == "1"
 
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS conversation (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            user TEXT,
-            conversation TEXT,
-            evaluation TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """
-    )
-    conn.commit()
-    conn.close()
-
-
-init_db()
+storage = Storage(
+    ConnectionPool(
+        DB_NAME,
+        size=DB_POOL_SIZE,
+        cache_mb=DB_CACHE_MB,
+        mmap_mb=DB_MMAP_MB,
+        busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+    ),
+    storage_format=DB_STORAGE_FORMAT,
+    full_text_search=DB_FULL_TEXT_SEARCH,
+)
+# All inserts go through one writer thread that group-commits them.
+writer = GroupCommitWriter(
+    storage, max_batch_size=DB_GROUP_COMMIT_MAX_BATCH, max_latency_ms=DB_GROUP_COMMIT_MAX_LATENCY_MS
+)
 
 
 class Conversation(BaseModel):
@@ -37,38 +56,184 @@ class Conversation(BaseModel):
     user: str
     conversation: str
     evaluation: str
+    # Set by structured evaluations: score per skill, their mean, and the hash of the evaluated transcript.
+    scores: Optional[dict[str, Optional[int]]] = None
+    overall_score: Optional[float] = None
+    transcript_hash: Optional[str] = None
+
+    def to_row(self) -> tuple:
+        return conversation_row(
+            self.session_id,
+            self.user,
+            self.conversation,
+            self.evaluation,
+            scores=self.scores,
+            overall_score=self.overall_score,
+            transcript_hash=self.transcript_hash,
+        )
+
+
+class ConversationBatch(BaseModel):
+    conversations: list[Conversation]
 
 
 class GetSession(BaseModel):
     session_id: str
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    writer.stop()
+    storage.pool.close()
+
+
+QUEUED_WRITES.set_function(lambda: len(writer))
+
+app = FastAPI(title="Database Service", lifespan=lifespan)
+instrument(app)
+
+
 @app.post("/log")
 async def log_conversation(conv: Conversation):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO conversation (session_id, user, conversation, evaluation) VALUES (?, ?, ?, ?)",
-            (conv.session_id, conv.user, conv.conversation, conv.evaluation),
-        )
-        conn.commit()
-        conn.close()
+        # The writer thread commits the row together with any concurrent inserts; wait for the commit.
+        await asyncio.wrap_future(writer.submit([conv.to_row()]))
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/log_batch")
+async def log_conversations(batch: ConversationBatch):
+    try:
+        rows = [conv.to_row() for conv in batch.conversations]
+        await asyncio.wrap_future(writer.submit(rows))
+        return {"status": "success", "count": len(rows)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Optional: An endpoint to retrieve logs (for debugging/demo purposes)
 @app.get("/get_log")
-async def get_log(request: GetSession):
-    session_id = request.session_id
+async def get_log(session_id: Optional[str] = None, request: Optional[GetSession] = None):
+    # The session ID can be passed as a query parameter; a JSON body is still accepted for older clients.
+    session_id = session_id or (request.session_id if request else None)
+    if session_id is None:
+        raise HTTPException(status_code=422, detail="session_id is required.")
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM conversation WHERE session_id=?", (session_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with QUERY_SECONDS.labels(query="get_log").time():
+            rows = await run_in_threadpool(storage.get_logs, session_id)
         return {"logs": rows}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def to_db_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime like SQLite's CURRENT_TIMESTAMP (UTC, second precision)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row["timestamp"], row["id"]]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    return tuple(field.strip() for field in fields.split(",")) if fields else DEFAULT_FIELDS
+
+
+@app.get("/interviews")
+async def list_interviews(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    role: Optional[str] = None,
+    email: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns; transcripts are excluded by default."),
+):
+    """
+    List interviews, newest first, one page at a time.
+
+    Pass the returned `next_cursor` as `cursor` to fetch the next page; it is null on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        with QUERY_SECONDS.labels(query="list_interviews").time():
+            rows = await run_in_threadpool(
+                storage.list_interviews,
+                limit,
+                after=after,
+                since=to_db_timestamp(since),
+                until=to_db_timestamp(until),
+                role=role,
+                email=email,
+                fields=parse_fields(fields),
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+@app.get("/search")
+async def search_interviews(
+    q: str = Query(..., min_length=1, description="Terms the transcript or evaluation must all contain."),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    raw: bool = Query(False, description="Pass `q` as an FTS5 query, with phrases, prefixes, NEAR, AND/OR/NOT."),
+    fields: Optional[str] = Query(None, description="Comma-separated columns; transcripts are excluded by default."),
+):
+    """
+    Full-text search over the interview transcripts and evaluations, best match first.
+
+    Each item has its BM25 relevance as `score`. Pass the returned `next_offset` as `offset` to fetch the next page;
+    it is null on the last page.
+    """
+    if not storage.full_text_search:
+        raise HTTPException(status_code=501, detail="Full-text search is disabled (DB_FULL_TEXT_SEARCH=0).")
+    try:
+        with QUERY_SECONDS.labels(query="search").time():
+            rows = await run_in_threadpool(storage.search, q, limit, offset, fields=parse_fields(fields), raw=raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    next_offset = offset + limit if len(rows) == limit else None
+    return {"items": rows, "next_offset": next_offset}
+
+
+@app.get("/interviews/export")
+async def export_interviews(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    role: Optional[str] = None,
+    email: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns; transcripts are excluded by default."),
+):
+    """Stream every matching interview as newline-delimited JSON, newest first."""
+    fields = parse_fields(fields)
+    try:
+        # Validate the fields before the response starts streaming.
+        check_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = storage.iter_interviews(
+        since=to_db_timestamp(since), until=to_db_timestamp(until), role=role, email=email, fields=fields
+    )
+    # Starlette iterates the synchronous generator in its threadpool, so SQLite reads stay off the event loop.
+    return StreamingResponse((json.dumps(row) + "\n" for row in rows), media_type="application/x-ndjson")
@@ -0,0 +1,71 @@
+"""
+Prometheus metrics for the database service, served at /metrics.
+
+They live in the service's own registry rather than the default one, so the module can be imported next to
+`llm.metrics`, which registers metrics of the same names, e.g. by the benchmarks.
+"""
+
+import time
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    GC_COLLECTOR,
+    PLATFORM_COLLECTOR,
+    PROCESS_COLLECTOR,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+REGISTRY = CollectorRegistry()
+# Keep the process, platform and GC metrics the default registry would have exported.
+for collector in (PROCESS_COLLECTOR, PLATFORM_COLLECTOR, GC_COLLECTOR):
+    REGISTRY.register(collector)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, per route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+COMMIT_SECONDS = Histogram(
+    "db_commit_seconds", "Time to commit one group of inserts.", buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+COMMIT_ROWS = Histogram(
+    "db_commit_rows",
+    "Rows committed per group commit.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+    registry=REGISTRY,
+)
+QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Time to run a read query.", ["query"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+QUEUED_WRITES = Gauge("db_writes_queued", "Insert requests waiting for the writer thread.", registry=REGISTRY)
+
+
+def instrument(app: FastAPI) -> None:
+    """
+    Time every request of an app and serve the metrics at /metrics.
+
+    Args:
+        app (FastAPI): The app to instrument.
+    """
+
+    @app.middleware("http")
+    async def time_request(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            method=request.method, route=route.path if route is not None else "unmatched", status=response.status_code
+        ).observe(time.perf_counter() - start)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
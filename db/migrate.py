@@ -0,0 +1,91 @@
+"""
+Convert the stored conversations to a storage format and rebuild the full-text index.
+
+Rows are rewritten in batches, each in its own short transaction, so the service can keep running; set the same
+`DB_STORAGE_FORMAT` on the service, or the rows it inserts stay in its own format. With `--train-dictionary`, a zstd
+dictionary is first trained on a sample of the stored transcripts and evaluations, and used for every row compressed
+afterwards. The pages freed by compression only return to the file system with `--vacuum`, which locks the database
+while it runs.
+
+    python -m db.migrate --db conversations.db --format zstd --train-dictionary --vacuum
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from db.compression import FORMATS, train_dictionary
+from db.storage import ConnectionPool, Storage
+
+
+def file_size(db_name: str) -> int:
+    """Size of the database file and its write-ahead log, in bytes."""
+    return sum(os.path.getsize(path) for path in (db_name, f"{db_name}-wal") if os.path.exists(path))
+
+
+def migrate(storage: Storage, batch_size: int, reindex: bool = True) -> dict:
+    """
+    Rewrite every row in the storage's format and, if `reindex`, rebuild the full-text index.
+
+    Args:
+        storage (Storage): Storage whose codec has the target format.
+        batch_size (int): Rows rewritten per transaction.
+        reindex (bool): Rebuild the full-text index.
+
+    Returns:
+        dict: The number of rows rewritten and indexed.
+    """
+    index_until = storage.clear_search_index() if reindex else 0
+    after, rewritten, indexed = 0, 0, 0
+    while True:
+        after, batch_rewritten, batch_indexed = storage.rewrite_rows(after, batch_size, index_until)
+        if after is None:
+            return {"rewritten": rewritten, "indexed": indexed}
+        rewritten += batch_rewritten
+        indexed += batch_indexed
+        logging.info(f"Migrated the rows up to {after}: {rewritten} rewritten, {indexed} indexed.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert the stored conversations and rebuild the search index.")
+    parser.add_argument("--db", default=os.getenv("DB_NAME", "conversations.db"), help="SQLite database file.")
+    parser.add_argument("--format", default=os.getenv("DB_STORAGE_FORMAT", "text"), choices=FORMATS)
+    parser.add_argument("--level", type=int, help="Compression level; the format's default if not set.")
+    parser.add_argument("--train-dictionary", action="store_true", help="Train a new zstd dictionary first.")
+    parser.add_argument("--dictionary-size", type=int, default=64 * 1024, help="Maximum dictionary size, in bytes.")
+    parser.add_argument("--samples", type=int, default=2000, help="Rows sampled to train the dictionary on.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows rewritten per transaction.")
+    parser.add_argument("--no-reindex", action="store_true", help="Keep the full-text index as it is.")
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the database file once the rows are rewritten.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.train_dictionary and args.format != "zstd":
+        parser.error("--train-dictionary requires --format zstd.")
+
+    size_before = file_size(args.db)
+    storage = Storage(
+        ConnectionPool(args.db, size=1, cache_mb=64, mmap_mb=0, busy_timeout_ms=30000),
+        storage_format=args.format,
+        full_text_search=True,
+        compression_level=args.level,
+    )
+    start = time.perf_counter()
+    try:
+        if args.train_dictionary:
+            samples = storage.sample_texts(args.samples)
+            dictionary_id = storage.add_dictionary(train_dictionary(samples, args.dictionary_size))
+            logging.info(f"Trained dictionary {dictionary_id} on {len(samples)} texts.")
+        result = migrate(storage, args.batch_size, reindex=not args.no_reindex)
+        if args.vacuum:
+            storage.vacuum()
+    finally:
+        storage.pool.close()
+    logging.info(
+        f"Migrated to {args.format} in {time.perf_counter() - start:.1f} s: {result['rewritten']} rows rewritten, "
+        f"{result['indexed']} indexed; {size_before / 2**20:.1f} MB -> {file_size(args.db) / 2**20:.1f} MB."
+    )
+
+
+if __name__ == "__main__":
+    main()
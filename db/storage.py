@@ -0,0 +1,550 @@
+import logging
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from db.compression import TextCodec
+
+# Skills scored by the structured evaluation; each gets its own integer column.
+SKILLS = (
+    "communication",
+    "teamwork",
+    "leadership",
+    "adaptability",
+    "problem_solving",
+    "conflict_resolution",
+    "emotional_intelligence",
+    "decision_making",
+)
+SCORE_COLUMNS = tuple(f"score_{skill}" for skill in SKILLS)
+# Columns written on insert, in the order of `conversation_row`.
+INSERT_COLUMNS = (
+    "session_id",
+    "user",
+    "conversation",
+    "evaluation",
+    *SCORE_COLUMNS,
+    "overall_score",
+    "transcript_hash",
+)
+# Columns callers can select; the large transcript fields are left out unless asked for.
+COLUMNS = (
+    "id",
+    "session_id",
+    "user",
+    "conversation",
+    "evaluation",
+    *SCORE_COLUMNS,
+    "overall_score",
+    "transcript_hash",
+    "timestamp",
+)
+DEFAULT_FIELDS = ("id", "session_id", "user", *SCORE_COLUMNS, "overall_score", "timestamp")
+# Large text columns, compressed by the storage format and indexed for full-text search.
+TEXT_COLUMNS = ("conversation", "evaluation")
+INDEX_ROW = f"INSERT INTO conversation_fts (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?, ?, ?)"
+ROLE = "json_extract(user, '$.role')"
+EMAIL = "json_extract(user, '$.email')"
+
+
+def check_fields(fields: tuple) -> None:
+    """
+    Check that every requested field is a selectable column.
+
+    Args:
+        fields (tuple): Requested column names.
+
+    Raises:
+        ValueError: If a field is not a known column.
+    """
+    unknown = set(fields) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+
+def match_query(text: str, raw: bool = False) -> str:
+    """
+    Build an FTS5 query.
+
+    Args:
+        text (str): Search terms, all of which must match; or an FTS5 query if `raw`.
+        raw (bool): Pass the text as an FTS5 query, with its phrase, prefix, NEAR and boolean syntax.
+
+    Returns:
+        str: The FTS5 query.
+
+    Raises:
+        ValueError: If there is no search term.
+    """
+    if not text.strip():
+        raise ValueError("The search query is empty.")
+    if raw:
+        return text
+    # Each term is quoted, so punctuation in it (e.g. "C++" or "node.js") is not read as FTS5 syntax.
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+
+def conversation_row(
+    session_id: str,
+    user: str,
+    conversation: str,
+    evaluation: str,
+    scores: Optional[dict] = None,
+    overall_score: Optional[float] = None,
+    transcript_hash: Optional[str] = None,
+) -> tuple:
+    """
+    Build an insert row in `INSERT_COLUMNS` order.
+
+    Args:
+        session_id (str): Interview session ID.
+        user (str): JSON-encoded candidate info.
+        conversation (str): Interview transcript.
+        evaluation (str): Evaluation text, or the JSON-encoded structured evaluation.
+        scores (Optional[dict]): Score per skill; skills that are missing or not in `SKILLS` are stored as NULL.
+        overall_score (Optional[float]): Mean of the skill scores.
+        transcript_hash (Optional[str]): Hash of the evaluated transcript.
+
+    Returns:
+        tuple: The row.
+    """
+    scores = scores or {}
+    return (
+        session_id,
+        user,
+        conversation,
+        evaluation,
+        *(scores.get(skill) for skill in SKILLS),
+        overall_score,
+        transcript_hash,
+    )
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections that can be used from any thread.
+
+    Each connection is opened once with the pool's pragmas and reused, instead of reconnecting on every request.
+    """
+
+    def __init__(self, db_name: str, size: int, cache_mb: int, mmap_mb: int, busy_timeout_ms: int) -> None:
+        """
+        Open the pool's connections.
+
+        Args:
+            db_name (str): Path of the SQLite database file.
+            size (int): Number of connections.
+            cache_mb (int): Page cache size per connection, in megabytes.
+            mmap_mb (int): Size of the memory-mapped I/O region, in megabytes.
+            busy_timeout_ms (int): How long a connection waits for a lock held by another writer.
+        """
+        self.db_name = db_name
+        self.cache_mb = cache_mb
+        self.mmap_mb = mmap_mb
+        self.busy_timeout_ms = busy_timeout_ms
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=self.busy_timeout_ms / 1000)
+        # WAL lets readers run alongside the writer, and commits only need to fsync the log at checkpoints
+        # when synchronous is NORMAL.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{self.cache_mb * 1024}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_mb * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection, waiting for one to be returned if all are in use.
+
+        Yields:
+            sqlite3.Connection: The borrowed connection.
+        """
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self) -> None:
+        """Close every idle connection in the pool."""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class Storage:
+    """Conversation storage on top of a connection pool. Methods are blocking and meant to run in worker threads."""
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        storage_format: str = "text",
+        full_text_search: bool = True,
+        compression_level: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the storage and create the schema if needed.
+
+        Args:
+            pool (ConnectionPool): Pool of connections to the database.
+            storage_format (str): How new transcripts and evaluations are stored: `text`, `zlib` or `zstd` (see
+                `db.compression`). Rows of every format can be read.
+            full_text_search (bool): Index the transcripts and evaluations of new rows for `search`.
+            compression_level (Optional[int]): Compression level; the format's default if None.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.pool = pool
+        self.full_text_search = full_text_search
+        self.init_db()
+        self.codec = TextCodec(storage_format, compression_level, self.load_dictionaries)
+
+    def init_db(self) -> None:
+        """Create the conversation table and its indexes, the full-text index and the compression dictionaries."""
+        with self.pool.connection() as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    user TEXT,
+                    conversation TEXT,
+                    evaluation TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            # Databases created before structured evaluations lack the score columns.
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(conversation)")}
+            for column, column_type in (
+                *((column, "INTEGER") for column in SCORE_COLUMNS),
+                ("overall_score", "REAL"),
+                ("transcript_hash", "TEXT"),
+            ):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE conversation ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_session_id ON conversation (session_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_timestamp_id ON conversation (timestamp, id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_conversation_role ON conversation ({ROLE}, timestamp, id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_conversation_email ON conversation ({EMAIL}, timestamp, id)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS compression_dictionary (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data BLOB NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            if not self.full_text_search:
+                return
+            indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'conversation_fts'").fetchone()
+            # Contentless: the index does not keep a copy of the text, which stays (compressed) in the table only.
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS conversation_fts "
+                "USING fts5(conversation, evaluation, content='', tokenize='porter unicode61')"
+            )
+            if not indexed and conn.execute("SELECT 1 FROM conversation LIMIT 1").fetchone():
+                self.logger.warning("Existing conversations are not searchable until `python -m db.migrate` is run.")
+
+    def load_dictionaries(self) -> dict:
+        """
+        Load the zstd compression dictionaries.
+
+        Returns:
+            dict: Each dictionary, keyed by ID.
+        """
+        with self.pool.connection() as conn:
+            return dict(conn.execute("SELECT id, data FROM compression_dictionary").fetchall())
+
+    def add_dictionary(self, data: bytes) -> int:
+        """
+        Store a zstd dictionary; rows compressed from now on use it.
+
+        Args:
+            data (bytes): Dictionary trained by `db.compression.train_dictionary`.
+
+        Returns:
+            int: The dictionary ID.
+        """
+        with self.pool.connection() as conn, conn:
+            dictionary_id = conn.execute("INSERT INTO compression_dictionary (data) VALUES (?)", (data,)).lastrowid
+        self.codec.reload()
+        return dictionary_id
+
+    def _encode_row(self, row: tuple) -> tuple:
+        return tuple(
+            self.codec.encode(value) if column in TEXT_COLUMNS else value for column, value in zip(INSERT_COLUMNS, row)
+        )
+
+    def _decode_row(self, row: tuple) -> tuple:
+        # Only the text columns can hold compressed values; the codec returns every other value as is.
+        return tuple(self.codec.decode(value) for value in row)
+
+    def insert_conversation(self, row: tuple) -> None:
+        """
+        Insert one conversation and commit it.
+
+        Args:
+            row (tuple): Row built by `conversation_row`.
+        """
+        self.insert_conversations([row])
+
+    def insert_conversations(self, rows: list) -> int:
+        """
+        Insert many conversations in a single transaction.
+
+        A row whose session is already stored is skipped, so an interview whose save is retried, e.g. after a timeout
+        on a save that was in fact committed, is stored once.
+
+        Args:
+            rows (list): Rows built by `conversation_row`.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        placeholders = ", ".join("?" for _ in INSERT_COLUMNS)
+        insert = (
+            f"INSERT INTO conversation ({', '.join(INSERT_COLUMNS)}) SELECT {placeholders} "
+            "WHERE NOT EXISTS (SELECT 1 FROM conversation WHERE session_id = ?)"
+        )
+        # Compressed before a connection is borrowed, so the transaction is held only for the writes.
+        stored = [(*self._encode_row(row), row[0]) for row in rows]
+        with self.pool.connection() as conn, conn:
+            if not self.full_text_search:
+                return conn.executemany(insert, stored).rowcount
+            inserted = 0
+            for row, stored_row in zip(rows, stored):
+                cursor = conn.execute(insert, stored_row)
+                if not cursor.rowcount:
+                    continue
+                conn.execute(
+                    INDEX_ROW, (cursor.lastrowid, *(row[INSERT_COLUMNS.index(column)] for column in TEXT_COLUMNS))
+                )
+                inserted += 1
+            return inserted
+
+    def get_logs(self, session_id: str) -> list:
+        """
+        Fetch every row logged for a session.
+
+        Args:
+            session_id (str): Interview session ID.
+
+        Returns:
+            list: The matching rows.
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT * FROM conversation WHERE session_id=?", (session_id,)).fetchall()
+        return [self._decode_row(row) for row in rows]
+
+    def list_interviews(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        role: Optional[str] = None,
+        email: Optional[str] = None,
+        fields: tuple = DEFAULT_FIELDS,
+    ) -> list:
+        """
+        Fetch one page of interviews, newest first, using keyset pagination on (timestamp, id).
+
+        Args:
+            limit (int): Maximum number of rows.
+            after (Optional[tuple]): `(timestamp, id)` of the last row of the previous page.
+            since (Optional[str]): Only interviews logged at or after this UTC timestamp.
+            until (Optional[str]): Only interviews logged before this UTC timestamp.
+            role (Optional[str]): Only interviews for this role.
+            email (Optional[str]): Only interviews of the candidate with this email.
+            fields (tuple): Columns to return; `id` and `timestamp` are always included.
+
+        Returns:
+            list: The rows as dictionaries.
+        """
+        query, params = self._interview_query(after, since, until, role, email, fields)
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f"{query} LIMIT ?", (*params, limit))
+            names = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        return [dict(zip(names, self._decode_row(row))) for row in rows]
+
+    def iter_interviews(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        role: Optional[str] = None,
+        email: Optional[str] = None,
+        fields: tuple = DEFAULT_FIELDS,
+        chunk_size: int = 500,
+    ) -> Iterator[dict]:
+        """
+        Stream every matching interview, newest first, without loading them all into memory.
+
+        Rows are read one keyset page at a time, and the connection goes back to the pool between pages, so a slow
+        reader of a long export does not hold one of the pool's connections for its whole duration.
+
+        Args:
+            since (Optional[str]): Only interviews logged at or after this UTC timestamp.
+            until (Optional[str]): Only interviews logged before this UTC timestamp.
+            role (Optional[str]): Only interviews for this role.
+            email (Optional[str]): Only interviews of the candidate with this email.
+            fields (tuple): Columns to return; `id` and `timestamp` are always included.
+            chunk_size (int): Number of rows read per page.
+
+        Yields:
+            dict: Each row as a dictionary.
+        """
+        after = None
+        while True:
+            rows = self.list_interviews(
+                chunk_size, after=after, since=since, until=until, role=role, email=email, fields=fields
+            )
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+    def search(
+        self, query: str, limit: int, offset: int = 0, fields: tuple = DEFAULT_FIELDS, raw: bool = False
+    ) -> list:
+        """
+        Fetch one page of the interviews whose transcript or evaluation matches a full-text query, best match first.
+
+        Args:
+            query (str): Search terms, all of which must match; or an FTS5 query if `raw`.
+            limit (int): Maximum number of rows.
+            offset (int): Number of better matches to skip.
+            fields (tuple): Columns to return; `id` and `timestamp` are always included.
+            raw (bool): Pass the query to FTS5 as is.
+
+        Returns:
+            list: The rows as dictionaries, each with its BM25 relevance as `score` (higher is better).
+
+        Raises:
+            ValueError: If a field is unknown, or the query is empty or not a valid FTS5 query.
+        """
+        check_fields(fields)
+        columns = [f"c.{column}" for column in COLUMNS if column in fields or column in ("id", "timestamp")]
+        # Rank and page in the full-text index first, so only the rows of the page are read and decompressed.
+        sql = f"""
+            WITH hits AS (
+                SELECT rowid, rank FROM conversation_fts WHERE conversation_fts MATCH ?
+                ORDER BY rank, rowid LIMIT ? OFFSET ?
+            )
+            SELECT {', '.join(columns)}, -hits.rank AS score
+            FROM hits JOIN conversation c ON c.id = hits.rowid
+            ORDER BY hits.rank, hits.rowid
+        """
+        with self.pool.connection() as conn:
+            try:
+                cursor = conn.execute(sql, (match_query(query, raw), limit, offset))
+                rows = cursor.fetchall()
+            except sqlite3.OperationalError as e:
+                # Quoted terms are always valid, so only raw queries can be malformed.
+                if raw:
+                    raise ValueError(f"Invalid search query: {e}")
+                raise
+            names = [column[0] for column in cursor.description]
+        return [dict(zip(names, self._decode_row(row))) for row in rows]
+
+    def sample_texts(self, count: int) -> list:
+        """
+        Pick random transcripts and evaluations, e.g. to train a compression dictionary on.
+
+        Args:
+            count (int): Number of rows to sample.
+
+        Returns:
+            list: The non-empty transcripts and evaluations of the sampled rows.
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(TEXT_COLUMNS)} FROM conversation ORDER BY random() LIMIT ?", (count,)
+            ).fetchall()
+        return [text for row in rows for text in self._decode_row(row) if text]
+
+    def clear_search_index(self) -> int:
+        """
+        Empty the full-text index before it is rebuilt with `rewrite_rows`.
+
+        Returns:
+            int: The ID of the last row at the time; rows inserted later are indexed by their insert.
+        """
+        with self.pool.connection() as conn, conn:
+            conn.execute("INSERT INTO conversation_fts (conversation_fts) VALUES ('delete-all')")
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM conversation").fetchone()[0]
+
+    def rewrite_rows(self, after: int, limit: int, index_until: int = 0) -> tuple:
+        """
+        Store a batch of rows in the current format and add them to the full-text index, in one transaction.
+
+        Args:
+            after (int): ID of the last row of the previous batch; 0 to start from the first row.
+            limit (int): Maximum number of rows in the batch.
+            index_until (int): Rows with an ID up to this one are added to the full-text index.
+
+        Returns:
+            tuple: The ID of the last row of the batch (None once every row is done), and the number of rows rewritten
+                and indexed.
+        """
+        with self.pool.connection() as conn, conn:
+            rows = conn.execute(
+                f"SELECT id, {', '.join(TEXT_COLUMNS)} FROM conversation WHERE id > ? ORDER BY id LIMIT ?",
+                (after, limit),
+            ).fetchall()
+            rewritten = indexed = 0
+            for row_id, *stored in rows:
+                texts = [self.codec.decode(value) for value in stored]
+                encoded = [self.codec.encode(text) for text in texts]
+                if encoded != stored:
+                    assignments = ", ".join(f"{column} = ?" for column in TEXT_COLUMNS)
+                    conn.execute(f"UPDATE conversation SET {assignments} WHERE id = ?", (*encoded, row_id))
+                    rewritten += 1
+                if row_id <= index_until:
+                    conn.execute(INDEX_ROW, (row_id, *texts))
+                    indexed += 1
+        return (rows[-1][0] if rows else None), rewritten, indexed
+
+    def vacuum(self) -> None:
+        """Rebuild the database file, returning the pages freed by compression to the file system."""
+        with self.pool.connection() as conn:
+            conn.execute("VACUUM")
+
+    @staticmethod
+    def _interview_query(
+        after: Optional[tuple],
+        since: Optional[str],
+        until: Optional[str],
+        role: Optional[str],
+        email: Optional[str],
+        fields: tuple,
+    ) -> tuple:
+        check_fields(fields)
+        columns = [column for column in COLUMNS if column in fields or column in ("id", "timestamp")]
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(after)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if role is not None:
+            conditions.append(f"{ROLE} = ?")
+            params.append(role)
+        if email is not None:
+            conditions.append(f"{EMAIL} = ?")
+            params.append(email)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {', '.join(columns)} FROM conversation {where} ORDER BY timestamp DESC, id DESC"
+        return query, params
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from db.metrics import COMMIT_ROWS, COMMIT_SECONDS
+from db.storage import Storage
+
+
+class GroupCommitWriter:
+    """
+    Write-behind queue that group-commits conversation inserts.
+
+    Inserts submitted from any thread are collected by a single writer thread and committed together with
+    `executemany` in one transaction, so many concurrent writes share one fsync. Rows that arrive while a commit is
+    running form the next batch. A batch is committed once it holds `max_batch_size` rows, or once the queue is empty
+    and its oldest row has waited `max_latency_ms`.
+    """
+
+    def __init__(self, storage: Storage, max_batch_size: int, max_latency_ms: float) -> None:
+        """
+        Start the writer thread.
+
+        Args:
+            storage (Storage): Storage the batches are committed to.
+            max_batch_size (int): Maximum number of rows per transaction.
+            max_latency_ms (float): Maximum time the writer waits for more rows before committing a partial batch;
+                with 0, a batch is committed as soon as the queue is drained.
+        """
+        self.storage = storage
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: list) -> Future:
+        """
+        Queue rows for insertion.
+
+        Args:
+            rows (list): Rows built by `conversation_row`.
+
+        Returns:
+            Future: Resolves once the rows are committed, or fails with the commit error.
+        """
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self) -> None:
+        """Commit everything still queued and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_latency
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        rows = [row for rows, _ in batch for row in rows]
+        start = time.perf_counter()
+        try:
+            self.storage.insert_conversations(rows)
+        except Exception as e:
+            self.logger.error(f"Error committing {len(rows)} conversations: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        COMMIT_SECONDS.observe(time.perf_counter() - start)
+        COMMIT_ROWS.observe(len(rows))
+        for _, future in batch:
+            future.set_result(len(rows))
@@ -1,15 +1,150 @@
-import asyncio
+import json
 import os
-import threading
+import random
+import time
+from typing import Iterator, Optional
 
 import httpx
-import requests
 import streamlit as st
 
 FASTAPI_BASE_URL = os.environ["BACKEND_URL"]
 START_URL = f"{FASTAPI_BASE_URL}/start"
-CHAT_URL = f"{FASTAPI_BASE_URL}/generate_question"
+CHAT_STREAM_URL = f"{FASTAPI_BASE_URL}/generate_question_stream"
 FINISH_URL = f"{FASTAPI_BASE_URL}/generate_evaluation"
+EVALUATION_URL = f"{FASTAPI_BASE_URL}/evaluation"
+
+# Bounded timeouts, so a stalled backend fails the request instead of hanging the script. The read timeout is the
+# longest wait for the next bytes of a response, e.g. the next token of a streamed question.
+BACKEND_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("BACKEND_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("BACKEND_READ_TIMEOUT", "180")),
+    write=10,
+    pool=10,
+)
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "100"))
+BACKEND_MAX_ATTEMPTS = int(os.getenv("BACKEND_MAX_ATTEMPTS", "3"))
+BACKEND_BACKOFF_SECONDS = float(os.getenv("BACKEND_BACKOFF_SECONDS", "0.5"))
+# Failures after which the backend has not acted on the request, so it can be sent again.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRY_STATUSES = {429, 502, 503, 504}
+# Statuses the llm service's admission control answers with, along with Retry-After, before acting on a request.
+TURNED_AWAY_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def can_retry(method: str, response: httpx.Response) -> bool:
+    """
+    Whether a failed response can be retried without the backend acting on the request twice.
+
+    Any retryable status is retried for idempotent methods. A POST, e.g. /start, is only retried when the backend
+    turned it away with `Retry-After`; a 502 or 504 from a proxy may come after the backend created a session or queued
+    an evaluation.
+
+    Args:
+        method (str): HTTP method of the request.
+        response (httpx.Response): The failed response.
+
+    Returns:
+        bool: Whether the request can be sent again.
+    """
+    if response.status_code not in RETRY_STATUSES:
+        return False
+    if method.upper() in IDEMPOTENT_METHODS:
+        return True
+    return response.status_code in TURNED_AWAY_STATUSES and "Retry-After" in response.headers
+
+
+class BackendClient:
+    """
+    Pooled HTTP client for the llm service, shared by every session of the Streamlit server.
+
+    Connections are kept alive between turns. Requests that failed before reaching the backend, or that the backend
+    turned away as unavailable or overloaded (see `can_retry`), are retried with exponential backoff and jitter,
+    honoring `Retry-After`.
+    The read timeout is sent as `X-Request-Timeout`, so the backend drops queued generations nobody waits for anymore.
+    """
+
+    def __init__(self) -> None:
+        limits = httpx.Limits(
+            max_connections=BACKEND_MAX_CONNECTIONS, max_keepalive_connections=BACKEND_MAX_CONNECTIONS
+        )
+        self.client = httpx.Client(
+            timeout=BACKEND_TIMEOUT, limits=limits, headers={"X-Request-Timeout": str(BACKEND_TIMEOUT.read)}
+        )
+
+    @staticmethod
+    def backoff(attempt: int, response: Optional[httpx.Response] = None) -> None:
+        delay = random.uniform(0, BACKEND_BACKOFF_SECONDS * 2**attempt)
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            delay = max(delay, float(response.headers["Retry-After"]))
+        time.sleep(delay)
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying it while the backend is unreachable or unavailable.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Endpoint URL.
+            **kwargs: Passed to `httpx.Client.request`, e.g. `json`.
+
+        Returns:
+            httpx.Response: The successful response.
+
+        Raises:
+            httpx.HTTPError: If the last attempt failed.
+        """
+        for attempt in range(BACKEND_MAX_ATTEMPTS):
+            last = attempt == BACKEND_MAX_ATTEMPTS - 1
+            try:
+                response = self.client.request(method, url, **kwargs)
+            except RETRY_ERRORS:
+                if last:
+                    raise
+                self.backoff(attempt)
+                continue
+            if can_retry(method, response) and not last:
+                self.backoff(attempt, response)
+                continue
+            response.raise_for_status()
+            return response
+
+    def stream_lines(self, method: str, url: str, **kwargs) -> Iterator[str]:
+        """
+        Send a request and yield the lines of the response as they arrive, retrying like `request` until it starts.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Endpoint URL.
+            **kwargs: Passed to `httpx.Client.stream`, e.g. `json`.
+
+        Yields:
+            str: Each line of the response body.
+
+        Raises:
+            httpx.HTTPError: If the last attempt failed, or the response broke off.
+        """
+        for attempt in range(BACKEND_MAX_ATTEMPTS):
+            last = attempt == BACKEND_MAX_ATTEMPTS - 1
+            try:
+                with self.client.stream(method, url, **kwargs) as response:
+                    if can_retry(method, response) and not last:
+                        retry_response = response
+                    else:
+                        response.raise_for_status()
+                        yield from response.iter_lines()
+                        return
+            except RETRY_ERRORS:
+                if last:
+                    raise
+                retry_response = None
+            self.backoff(attempt, retry_response)
+
+
+@st.cache_resource
+def get_backend_client() -> BackendClient:
+    """The backend client shared by every session of this Streamlit server process."""
+    return BackendClient()
 
 
 def initialize_session() -> None:
@@ -22,9 +157,13 @@ def initialize_session() -> None:
         st.session_state.chat_history = []
     if "finish_interview" not in st.session_state:
         st.session_state.finish_interview = False
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = None
+    if "evaluation_job_id" not in st.session_state:
+        st.session_state.evaluation_job_id = None
 
 
-def call_start_endpoint(user_info: dict) -> str:
+def call_start_endpoint(user_info: dict) -> dict:
     """
     Call the start endpoint to get the first interview question.
 
@@ -32,61 +171,81 @@ def call_start_endpoint(user_info: dict) -> str:
         user_info: Candidate information.
 
     Returns:
-        str: The starting question.
+        dict: The starting question and the session ID of the new interview.
     """
     try:
-        response = requests.post(START_URL, json=user_info)
-        response.raise_for_status()
-        data = response.json()
-        return data["question"]
-    except requests.RequestException as e:
+        return get_backend_client().request("POST", START_URL, json=user_info).json()
+    except httpx.HTTPError as e:
         st.sidebar.error(f"Error starting interview: {e}")
         return None
 
 
-async def call_chat_endpoint(user_response: str) -> dict:
+def stream_chat_endpoint(session_id: str, user_response: str, result: dict) -> Iterator[str]:
     """
-    Asynchronously call the chat endpoint to generate the next interview question.
+    Call the streaming chat endpoint and yield the next interview question as it is generated.
 
     Args:
+        session_id (str): The interview session ID returned by the start endpoint.
         user_response (str): The candidate's text response.
+        result (dict): Updated with the final event's data, including `finish_interview`.
 
-    Returns:
-        The response data including the question.
+    Yields:
+        str: Successive pieces of the question.
     """
-    async with httpx.AsyncClient(timeout=None) as client:
-        try:
-            payload = {"user_input": user_response}
-            response = await client.post(CHAT_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data
-        except httpx.RequestError as e:
-            st.error(f"Error generating question: {e}")
-            return {"question": "Error generating question. Please try again."}
+    payload = {"session_id": session_id, "user_input": user_response}
+    try:
+        event = "message"
+        for line in get_backend_client().stream_lines("POST", CHAT_STREAM_URL, json=payload):
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:") :])
+                if event == "done":
+                    result.update(data)
+                elif event == "error":
+                    st.error(f"Error generating question: {data['detail']}")
+                    yield "Error generating question. Please try again."
+                else:
+                    yield data["token"]
+            elif not line:
+                event = "message"
+    except httpx.HTTPError as e:
+        st.error(f"Error generating question: {e}")
+        yield "Error generating question. Please try again."
 
 
-async def call_finish_endpoint() -> dict:
+def call_finish_endpoint(session_id: str) -> dict:
     """
-    Asynchronously call the finish endpoint to complete the interview.
+    Call the finish endpoint to complete the interview. The evaluation runs in the background on the backend.
+
+    Args:
+        session_id (str): The interview session ID returned by the start endpoint.
 
     Returns:
-        dict: The data returned after finishing the interview.
+        dict: The data returned after finishing the interview, including the evaluation job ID.
     """
-    async with httpx.AsyncClient(timeout=None) as client:
-        try:
-            response = await client.post(FINISH_URL)
-            response.raise_for_status()
-            data = response.json()
-            return data
-        except httpx.RequestError as e:
-            st.error(f"Error finishing interview: {e}")
-            return {"message": "Error finishing interview. Please try again."}
+    try:
+        return get_backend_client().request("POST", FINISH_URL, json={"session_id": session_id}).json()
+    except httpx.HTTPError as e:
+        st.error(f"Error finishing interview: {e}")
+        return None
+
+
+def call_evaluation_endpoint(job_id: str) -> dict:
+    """
+    Get the status of the interview's evaluation job.
 
+    Args:
+        job_id (str): The evaluation job ID returned by the finish endpoint.
 
-def finish_in_background() -> None:
-    """Run the finish endpoint call in a background thread."""
-    asyncio.run(call_finish_endpoint())
+    Returns:
+        dict: The job status, and the evaluation once it is done.
+    """
+    try:
+        return get_backend_client().request("GET", f"{EVALUATION_URL}/{job_id}").json()
+    except httpx.HTTPError as e:
+        st.error(f"Error fetching evaluation status: {e}")
+        return None
 
 
 def reset_app() -> None:
@@ -117,10 +276,11 @@ if st.session_state.phase == "form":
                 with st.spinner("Starting the interview..."):
                     start_response = call_start_endpoint(user_info)
                     if start_response:
+                        st.session_state.session_id = start_response["session_id"]
                         st.session_state.chat_history.append(
                             {
                                 "role": "assistant",
-                                "content": start_response,
+                                "content": start_response["question"],
                             }
                         )
                     else:
@@ -138,22 +298,34 @@ if st.session_state.phase == "chat":
         st.info("The interview is complete. Please click 'Finish Interview' to submit your responses.")
         if st.button("Finish Interview"):
             with st.spinner("Finishing the interview..."):
-                threading.Thread(target=finish_in_background, daemon=True).start()
+                finish_response = call_finish_endpoint(st.session_state.session_id)
+            if finish_response:
+                st.session_state.evaluation_job_id = finish_response["job_id"]
                 st.session_state.phase = "finished"
-            st.rerun()
+                st.rerun()
     else:
         user_input = st.chat_input("Your Response", key="chat_input")
         if user_input:
-            with st.spinner("..."):
-                st.session_state.chat_history.append({"role": "user", "content": user_input})
-                chat_data = asyncio.run(call_chat_endpoint(user_input))
-                st.session_state.chat_history.append({"role": "assistant", "content": chat_data["question"]})
-                if chat_data.get("finish_interview", False):
-                    st.session_state.finish_interview = True
+            st.session_state.chat_history.append({"role": "user", "content": user_input})
+            with st.chat_message("user"):
+                st.write(user_input)
+            # Render the question token by token as the backend streams it.
+            with st.chat_message("assistant"):
+                chat_data = {}
+                question = st.write_stream(stream_chat_endpoint(st.session_state.session_id, user_input, chat_data))
+            st.session_state.chat_history.append({"role": "assistant", "content": question})
+            if chat_data.get("finish_interview", False):
+                st.session_state.finish_interview = True
             st.rerun()
 
 if st.session_state.phase == "finished":
     st.title("Thank You for Participating in the Interview!")
     st.write("Your interview has been completed.")
+    if st.session_state.evaluation_job_id:
+        job = call_evaluation_endpoint(st.session_state.evaluation_job_id)
+        if job:
+            st.caption(f"Evaluation status: {job['status']}")
+        if st.button("Refresh Status"):
+            st.rerun()
     if st.button("Restart Interview"):
         reset_app()
@@ -1,14 +1,173 @@
+import asyncio
+import json
+import os
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+
 import yaml
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
+from llm.evaluation import SkillEvaluator
+from llm.http_client import AsyncHTTPClient
+from llm.ingestion import DocumentIngestor
 from llm.interview_chain import InterviewChain
+from llm.jobs import EvaluationJobQueue, JobStore
+from llm.llm_router import LLMError, LLMRouter, backend_urls
+from llm.metrics import ACTIVE_SESSIONS, QUEUED_EVALUATIONS, instrument
+from llm.opening_questions import OpeningQuestionCache
+from llm.retrieval import Retriever
+from llm.scheduler import LLMOverloadedError, LLMScheduler, admit
+from llm.session_backends import create_backend
+from llm.session_store import SessionNotFoundError, SessionRegistry
+from llm.streaming import sse_event
+from llm.warmup import Warmup
+from llm.write_buffer import InterviewWriteBuffer
 
-app = FastAPI()
+INTERVIEW_COMPLETE_MESSAGE = "Thank you for your time. The interview is now complete."
 
 config = yaml.safe_load(open("llm/config.yml"))
-interview_chain = InterviewChain(config)
+# E.g. "fake" to run without downloading the model, as the benchmarks do.
+config["embedding_model"] = os.getenv("EMBEDDING_MODEL", config["embedding_model"])
+
+
+def load_retriever() -> Retriever:
+    """Load the embedding model and the vectorstore, and build the retriever over them."""
+    return Retriever(InterviewChain.init_vectorstore(config), config)
+
+
+# The retriever (with its vectorstore and embedding model) and the HTTP connection pool are created once and shared
+# by every session. The retriever is loaded after the server started, so the port is bound and liveness probes pass
+# while the model loads; requests that need it wait for it.
+retriever = Warmup(load_retriever, "retriever")
+http_client = AsyncHTTPClient(config)
+scheduler = LLMScheduler(config)
+llm_router = LLMRouter(config, http_client, urls=backend_urls(config), scheduler=scheduler)
+evaluator = SkillEvaluator(config, llm_router)
+opening_questions = OpeningQuestionCache(config)
+ingestor = DocumentIngestor(config)
+write_buffer = None
+if config["db_writes"]["buffered"]:
+    write_buffer = InterviewWriteBuffer(
+        http_client,
+        db_url=os.environ["DB_SERVICE_URL"],
+        max_batch_size=config["db_writes"]["max_batch_size"],
+        flush_interval_seconds=config["db_writes"]["flush_interval_seconds"],
+        max_pending=config["db_writes"]["max_pending"],
+    )
+
+
+def new_chain() -> InterviewChain:
+    """Create an interview chain sharing the service-wide retriever and connection pools; the retriever must be loaded."""
+    return InterviewChain(
+        config,
+        retriever=retriever.value,
+        http_client=http_client,
+        write_buffer=write_buffer,
+        evaluator=evaluator,
+        llm_router=llm_router,
+        opening_questions=opening_questions,
+    )
+
+
+sessions = SessionRegistry(
+    factory=new_chain,
+    # The backend and Redis URL can be set per deployment, e.g. to share sessions between replicas.
+    backend=create_backend(
+        config["sessions"],
+        backend=os.getenv("SESSION_BACKEND", config["sessions"]["backend"]),
+        redis_url=os.getenv("REDIS_URL", config["sessions"]["redis_url"]),
+    ),
+    ttl_seconds=config["sessions"]["ttl_seconds"],
+    max_sessions=config["sessions"]["max_sessions"],
+    max_memory_mb=config["sessions"]["max_memory_mb"],
+)
+
+
+async def run_evaluation(snapshot: dict) -> str:
+    """
+    Evaluate a finished interview and save it.
+
+    In `skills` mode, the evaluation is the JSON-encoded per-skill scores; otherwise it is a free-text review.
+
+    Args:
+        snapshot (dict): Session state captured by `InterviewChain.snapshot`.
+
+    Returns:
+        str: The evaluation.
+
+    Raises:
+        LLMError: If an LLM call failed, so the job is retried.
+        httpx.HTTPError: If the interview could not be saved, so the job is retried.
+        WriteBufferFullError: If the write buffer was full, so the job is retried.
+    """
+    await retriever.wait()
+    interview_chain = new_chain()
+    interview_chain.restore(snapshot)
+    if config["evaluation"]["mode"] == "skills":
+        skill_evaluation = await interview_chain.generate_skill_evaluation()
+        evaluation = json.dumps(skill_evaluation)
+        await interview_chain.save_interview(evaluation, skill_evaluation=skill_evaluation)
+        return evaluation
+    evaluation = await interview_chain.generate_evaluation()
+    await interview_chain.save_interview(evaluation)
+    return evaluation
+
+
+evaluation_jobs = EvaluationJobQueue(
+    JobStore(config["evaluation_jobs"]["store_path"]),
+    run=run_evaluation,
+    workers=config["evaluation_jobs"]["workers"],
+    max_attempts=config["evaluation_jobs"]["max_attempts"],
+    retry_backoff_seconds=config["evaluation_jobs"]["retry_backoff_seconds"],
+    retention_seconds=config["evaluation_jobs"]["retention_seconds"],
+    on_update=sessions.backend.put_job,
+)
+
+
+async def prewarm_opening_questions() -> None:
+    """Generate the opening questions of the common roles, once the retriever is loaded."""
+    await retriever.wait()
+    await opening_questions.prewarm(new_chain().generate_opening_template)
+
+
+async def watch_documents() -> None:
+    """Keep the RAG index up to date with `rag_dir_path`, once the retriever is loaded."""
+    await retriever.wait()
+    await ingestor.watch(retriever.value, config["ingestion"]["watch_interval_seconds"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = []
+    if config["startup"]["warmup"]:
+        retriever.start()
+        if opening_questions.enabled and opening_questions.prewarm_roles:
+            background.append(asyncio.create_task(prewarm_opening_questions()))
+    if config["ingestion"]["watch_interval_seconds"] > 0:
+        background.append(asyncio.create_task(watch_documents()))
+    await llm_router.start()
+    await evaluation_jobs.start()
+    yield
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await evaluation_jobs.stop()
+    await llm_router.stop()
+    if write_buffer is not None:
+        await write_buffer.aclose()
+    await http_client.aclose()
+    sessions.close()
+
+
+ACTIVE_SESSIONS.set_function(lambda: len(sessions))
+QUEUED_EVALUATIONS.set_function(lambda: len(evaluation_jobs))
+
+app = FastAPI(lifespan=lifespan)
+instrument(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,61 +184,260 @@ class CandidateInfo(BaseModel):
     email: str
 
 
-class UserInput(BaseModel):
+class SessionRequest(BaseModel):
+    session_id: str
+
+
+class UserInput(SessionRequest):
     user_input: str
 
 
+async def get_session(session_id: str) -> InterviewChain:
+    """
+    Look up the interview chain for a session.
+
+    Args:
+        session_id (str): Session ID returned by /start.
+
+    Returns:
+        InterviewChain: The chain holding the session's state.
+
+    Raises:
+        HTTPException: 404 if the session does not exist or has expired.
+    """
+    await retriever.wait()
+    try:
+        return await sessions.get(session_id)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+
+
+def overloaded(error: LLMOverloadedError) -> HTTPException:
+    """The 429 or 503 response of a generation turned away by the scheduler, telling the client when to retry."""
+    return HTTPException(status_code=error.status_code, detail=str(error), headers=error.headers)
+
+
+@app.get("/health")
+async def health():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: the retriever is loaded, so interview requests are served without waiting for it.
+
+    Without `startup.warmup`, the retriever is loaded by the first request that needs it, and the service reports ready
+    right away. When loading failed, the error is reported and loading starts again, since no request comes to retry
+    it while the probe fails.
+
+    Returns:
+        dict: The retriever's warmup status; with status code 503 while it is loading or after it failed to load.
+    """
+    status = retriever.status()
+    if retriever.ready or not config["startup"]["warmup"]:
+        return {"status": "ready", "warmup": status}
+    if status["error"] is not None and not status["loading"]:
+        retriever.start()
+        return JSONResponse(status_code=503, content={"status": "failed", "warmup": status})
+    return JSONResponse(status_code=503, content={"status": "loading", "warmup": status})
+
+
+@app.post("/admin/reindex")
+async def reindex(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Update the live RAG index with the documents added, changed or removed in `rag_dir_path`.
+
+    Searches keep using the previous index until the update is complete. Only this process is updated; run every
+    replica with `ingestion.watch_interval_seconds` to keep them all in sync.
+
+    Args:
+        x_admin_token (Optional[str]): Must match the `ADMIN_TOKEN` environment variable, when it is set.
+
+    Returns:
+        dict: The number of documents and chunks added, updated and removed.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if admin_token and not secrets.compare_digest(x_admin_token or "", admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    try:
+        await retriever.wait()
+        return await asyncio.to_thread(ingestor.sync, retriever.value)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/start")
-async def start(request: CandidateInfo):
+async def start(
+    request: CandidateInfo, http_request: Request, x_request_timeout: Optional[float] = Header(default=None)
+):
+    # Queued generations are dropped once the client has gone away or stopped waiting.
+    admit(x_request_timeout, http_request.is_disconnected)
     try:
-        user_input = f"Hi, my name is {request.name}, and I applied for the role of {request.role}. I am ready for the interview."
-        interview_chain.init_new_session()
+        await retriever.wait()
+        interview_chain = await sessions.create()
         interview_chain.add_candidate_info(name=request.name, role=request.role, email=request.email)
-        llm_response = interview_chain.generate_question(user_input)
+        async with interview_chain.lock:
+            try:
+                llm_response = await interview_chain.generate_opening_question()
+            except LLMError:
+                await sessions.remove(str(interview_chain.session_id))
+                raise
+            await sessions.save(interview_chain)
         if llm_response is None:
             raise HTTPException(status_code=500, detail="Failed to generate initial question.")
-        return {"question": llm_response}
+        return {"question": llm_response, "session_id": str(interview_chain.session_id)}
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise overloaded(e)
+    except LLMError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/generate_question")
-async def generate_question(request: UserInput):
+async def generate_question(
+    request: UserInput, http_request: Request, x_request_timeout: Optional[float] = Header(default=None)
+):
+    admit(x_request_timeout, http_request.is_disconnected)
+    interview_chain = await get_session(request.session_id)
     try:
-        if interview_chain.question_count > interview_chain.max_questions:
-            # If the number of asked questions exceeds the maximum,
-            # end the interview and return a completion message.
-            llm_response = "Thank you for your time. The interview is now complete."
-            interview_chain.update_history(request.user_input, "Candidate")
-            interview_chain.update_history(llm_response, "Interviewer")
-            return {"question": llm_response, "finish_interview": True}
-        else:
-            # Generate a new question based on the user's input.
-            llm_response = interview_chain.generate_question(request.user_input)
-            if llm_response is None:
-                raise HTTPException(status_code=500, detail="Failed to generate question.")
-            return {"question": llm_response}
+        async with interview_chain.lock:
+            if interview_chain.question_count > interview_chain.max_questions:
+                # If the number of asked questions exceeds the maximum,
+                # end the interview and return a completion message.
+                llm_response = INTERVIEW_COMPLETE_MESSAGE
+                interview_chain.update_history(request.user_input, "Candidate")
+                interview_chain.update_history(llm_response, "Interviewer")
+                await sessions.save(interview_chain)
+                return {"question": llm_response, "finish_interview": True}
+            else:
+                # Generate a new question based on the user's input.
+                llm_response = await interview_chain.generate_question(request.user_input)
+                await sessions.save(interview_chain)
+                if llm_response is None:
+                    raise HTTPException(status_code=500, detail="Failed to generate question.")
+                return {"question": llm_response}
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise overloaded(e)
+    except LLMError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate_question_stream")
+async def generate_question_stream(request: UserInput, x_request_timeout: Optional[float] = Header(default=None)):
+    """
+    Stream the next interview question as server-sent events while the LLM generates it.
+
+    Each piece of the question is sent as a `{"token": ...}` message event, followed by a final `done` event carrying
+    `{"finish_interview": ...}`. If no question could be generated, an `error` event carrying `{"detail": ...}` is sent
+    instead, and the candidate's response is not kept, so it can be sent again; when the scheduler dropped the
+    generation, the event also carries `retry_after`. When the queue is already full, the request is turned away with
+    429 before the stream starts.
+
+    Args:
+        request (UserInput): The session and the candidate's response.
+        x_request_timeout (Optional[float]): Seconds the client waits for the question.
+
+    Returns:
+        StreamingResponse: The `text/event-stream` response.
+    """
+    interview_chain = await get_session(request.session_id)
+    try:
+        scheduler.check(interview_chain.turn_priority())
+    except LLMOverloadedError as e:
+        raise overloaded(e)
+
+    async def events():
+        # The stream is cancelled if the client goes away, which also takes the generation out of the queue.
+        admit(x_request_timeout, None)
+        async with interview_chain.lock:
+            if interview_chain.question_count > interview_chain.max_questions:
+                interview_chain.update_history(request.user_input, "Candidate")
+                interview_chain.update_history(INTERVIEW_COMPLETE_MESSAGE, "Interviewer")
+                await sessions.save(interview_chain)
+                yield sse_event({"token": INTERVIEW_COMPLETE_MESSAGE})
+                yield sse_event({"finish_interview": True}, event="done")
+                return
+            try:
+                async for token in interview_chain.stream_question(request.user_input):
+                    yield sse_event({"token": token})
+            except LLMOverloadedError as e:
+                yield sse_event({"detail": str(e), "retry_after": e.retry_after}, event="error")
+                return
+            except LLMError as e:
+                yield sse_event({"detail": str(e)}, event="error")
+                return
+            finally:
+                # Shielded, so the turn is still saved when the client disconnects and the stream is cancelled.
+                await asyncio.shield(sessions.save(interview_chain))
+        yield sse_event({"finish_interview": False}, event="done")
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/generate_evaluation")
-async def generate_evaluation():
+async def generate_evaluation(request: SessionRequest):
+    """
+    Queue the evaluation of a completed interview.
+
+    The evaluation is generated and the interview saved by a background worker, so this returns immediately; poll
+    /evaluation/{job_id} for the result. The session is released.
+
+    Args:
+        request (SessionRequest): The session to evaluate.
+
+    Returns:
+        dict: A completion message, the evaluation job ID and its status.
+    """
+    interview_chain = await get_session(request.session_id)
+    try:
+        async with interview_chain.lock:
+            snapshot = interview_chain.snapshot()
+        job_id = await evaluation_jobs.submit(request.session_id, snapshot)
+        await sessions.remove(request.session_id)
+        return {"message": "Interview completed.", "job_id": job_id, "status": "pending"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/evaluation/{job_id}")
+async def get_evaluation(job_id: str):
     """
-    Generate an evaluation after the interview is complete.
+    Get the status of an evaluation job, and its result once done.
 
-    This endpoint calls the interview chain to generate an evaluation,
-    saves the interview data, and returns a completion message.
+    Args:
+        job_id (str): Job ID returned by /generate_evaluation.
 
     Returns:
-        dict: A dictionary containing a message confirming interview completion.
+        dict: The job's status (`pending`, `running`, `done` or `failed`), attempts, result and last error.
     """
     try:
-        llm_response = interview_chain.generate_evaluation()
-        interview_chain.save_interview(llm_response)
-        return {"message": "Interview completed."}
+        job = await evaluation_jobs.get(job_id)
+        if job is None:
+            # The job may run on another replica.
+            job = await asyncio.to_thread(sessions.backend.get_job, job_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown evaluation job: {job_id}")
+    return {
+        "job_id": job["id"],
+        "session_id": job["session_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+    }
 
 
 if __name__ == "__main__":
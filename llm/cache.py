@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Entries are evicted in least-recently-used order once their combined size, as measured by `sizeof`, exceeds
+    `max_size`. Entries can also expire after `ttl_seconds`.
+    """
+
+    def __init__(
+        self, max_size: int, sizeof: Callable[[Any], int] = sys.getsizeof, ttl_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size (int): Maximum combined size of the cached values.
+            sizeof (Callable[[Any], int]): Measures the size of a value, in bytes by default.
+            ttl_seconds (Optional[float]): Time after which an entry expires; entries never expire if None.
+        """
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a value and mark it as recently used.
+
+        Args:
+            key (Hashable): Cache key.
+            default (Any): Value returned on a miss.
+
+        Returns:
+            Any: The cached value, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.monotonic() - entry[2] > self.ttl_seconds:
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries if the cache is over its size limit.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to store.
+        """
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self.size += size
+            while self.size > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove an entry if present.
+
+        Args:
+            key (Hashable): Cache key.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
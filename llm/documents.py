@@ -0,0 +1,172 @@
+"""
+Loading, splitting and embedding of the RAG documents, streamed in fixed-size batches.
+
+Documents are identified by their path relative to `rag_dir_path` and versioned by a hash of their content. Plain text
+and markdown files are read whole; PDF files are read page by page and need the optional `pypdf` package. Chunks are
+embedded and added to the vectorstore `batch_size` at a time, so memory stays bounded by one batch plus the index,
+however large the corpus.
+"""
+
+import hashlib
+import logging
+import os
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Only needed to index PDF documents.
+    PdfReader = None
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def list_documents(rag_dir_path: str) -> list:
+    """
+    List the RAG documents in a stable order.
+
+    Args:
+        rag_dir_path (str): Directory holding the documents.
+
+    Returns:
+        list: Sorted paths of the documents with a supported extension, relative to `rag_dir_path`.
+    """
+    paths = []
+    for root, _, files in os.walk(rag_dir_path):
+        for file in files:
+            if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(root, file), rag_dir_path))
+    return sorted(paths)
+
+
+def file_hash(path: str) -> str:
+    """
+    Hash a file's content without reading it into memory at once.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_pages(path: str) -> Iterator[str]:
+    """
+    Read the text of a document, one page at a time.
+
+    Args:
+        path (str): Document path.
+
+    Yields:
+        str: The text of each PDF page, or the whole text of a text or markdown file.
+
+    Raises:
+        ImportError: If the document is a PDF and `pypdf` is not installed.
+    """
+    if path.lower().endswith(".pdf"):
+        if PdfReader is None:
+            raise ImportError("Indexing PDF documents requires the `pypdf` package.")
+        for page in PdfReader(path).pages:
+            yield page.extract_text() or ""
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield f.read()
+
+
+def iter_chunks(config: dict, doc_ids: Iterable[str], hashes: dict) -> Iterator[tuple]:
+    """
+    Split documents into chunks, lazily.
+
+    A document that cannot be read is logged and skipped.
+
+    Args:
+        config (dict): Configuration with the document directory and splitter settings.
+        doc_ids (Iterable[str]): Documents to split, as paths relative to `rag_dir_path`.
+        hashes (dict): Content hash of each document, stored with its chunks.
+
+    Yields:
+        tuple: The chunk ID, text and metadata of each chunk.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config["text_splitter"]["chunk_size"],
+        chunk_overlap=config["text_splitter"]["chunk_overlap"],
+    )
+    for doc_id in doc_ids:
+        path = os.path.join(config["rag_dir_path"], doc_id)
+        position = 0
+        try:
+            for page in read_pages(path):
+                for text in splitter.split_text(page):
+                    metadata = {"source": path, "doc_id": doc_id, "doc_hash": hashes[doc_id], "chunk": position}
+                    yield f"{doc_id}#{position}", text, metadata
+                    position += 1
+        except (OSError, ImportError, ValueError) as e:
+            logger.warning(f"Skipping document {doc_id}: {e}")
+
+
+def add_chunks(vectorstore: "FAISS", chunks: Iterable[tuple], batch_size: int) -> int:
+    """
+    Embed chunks and add them to a vectorstore, `batch_size` at a time.
+
+    Args:
+        vectorstore (FAISS): Writable vectorstore; its embedding model embeds the chunks.
+        chunks (Iterable[tuple]): `(chunk_id, text, metadata)` tuples, e.g. from `iter_chunks`.
+        batch_size (int): Number of chunks embedded per model call.
+
+    Returns:
+        int: Number of chunks added.
+    """
+    added = 0
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            added += add_batch(vectorstore, batch)
+            batch = []
+    if batch:
+        added += add_batch(vectorstore, batch)
+    return added
+
+
+def add_batch(vectorstore: "FAISS", batch: list) -> int:
+    ids, texts, metadatas = zip(*batch)
+    vectors = vectorstore.embeddings.embed_documents(list(texts))
+    vectorstore.add_embeddings(zip(texts, vectors), metadatas=list(metadatas), ids=list(ids))
+    return len(batch)
+
+
+def empty_vectorstore(embedding: "Embeddings") -> "FAISS":
+    """
+    Create an empty, writable vectorstore for an embedding model.
+
+    Args:
+        embedding (Embeddings): Embedding model; embedded once to find its dimension.
+
+    Returns:
+        FAISS: A vectorstore over an empty exact L2 index.
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    dimension = len(embedding.embed_query("dimension"))
+    return FAISS(
+        embedding_function=embedding,
+        index=faiss.IndexFlatL2(dimension),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
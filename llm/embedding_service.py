@@ -0,0 +1,231 @@
+"""
+Embedding service: runs the embedding model in a pool of worker processes, out of the llm service's process.
+
+Queries are micro-batched: those arriving within `max_wait_ms` of each other are embedded with one model call, on
+worker processes reserved for queries. Document lists, sent when the RAG index is built or updated, are split into
+batches spread over the bulk workers, so a build uses every core without delaying the queries. Each worker process
+loads its own copy of the model.
+
+    uvicorn llm.embedding_service:app --port 8002
+
+Point the llm service at it with `embeddings.service_url` or `EMBEDDING_SERVICE_URL` (see `llm.embeddings`).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+import yaml
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from llm.embeddings import load_model
+from llm.metrics import EMBEDDING_BATCH_SIZE, instrument
+
+config = yaml.safe_load(open("llm/config.yml"))
+# E.g. "fake" to run without downloading the model, as the benchmarks do.
+config["embedding_model"] = os.getenv("EMBEDDING_MODEL", config["embedding_model"])
+
+# The model loaded in each worker process by `init_worker`.
+worker_model = None
+
+
+def init_worker(model_name: str, threads: int) -> None:
+    """Load the embedding model in a worker process, limited to its share of the cores."""
+    global worker_model
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    worker_model = load_model(model_name)
+
+
+def embed_in_worker(texts: list) -> list:
+    return worker_model.embed_documents(texts)
+
+
+class EmbeddingWorkerPool:
+    """Query and bulk worker processes, each with its own copy of the embedding model."""
+
+    def __init__(
+        self, model_name: str, bulk_workers: int, query_workers: int, max_batch_size: int, max_wait_ms: float
+    ) -> None:
+        """
+        Initialize the pool; call `start` from the event loop to start the workers.
+
+        Args:
+            model_name (str): Embedding model loaded by every worker.
+            bulk_workers (int): Worker processes for document batches; 0 for every core not used by the query workers.
+            query_workers (int): Worker processes reserved for queries.
+            max_batch_size (int): Maximum number of texts per model call.
+            max_wait_ms (float): Time a query waits for others to share its model call.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        cores = os.cpu_count() or 1
+        self.query_workers = query_workers
+        self.bulk_workers = bulk_workers or max(cores - query_workers, 1)
+        # Split the cores between the workers, so they do not oversubscribe them with intra-op threads.
+        self.threads_per_worker = max(cores // (self.bulk_workers + self.query_workers), 1)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.query_pool: Optional[ProcessPoolExecutor] = None
+        self.bulk_pool: Optional[ProcessPoolExecutor] = None
+        self._pending: list = []
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # Running query batches, referenced so they are not garbage collected.
+        self._batches: set = set()
+
+    async def start(self) -> None:
+        """Start the worker processes and wait until each pool has loaded the model."""
+        # Spawned rather than forked: the model's thread pools do not survive a fork.
+        context = multiprocessing.get_context("spawn")
+        initargs = (self.model_name, self.threads_per_worker)
+        self.query_pool = ProcessPoolExecutor(self.query_workers, context, init_worker, initargs)
+        self.bulk_pool = ProcessPoolExecutor(self.bulk_workers, context, init_worker, initargs)
+        self._batch_full = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(self.query_pool, embed_in_worker, ["warmup"]),
+            loop.run_in_executor(self.bulk_pool, embed_in_worker, ["warmup"]),
+        )
+        self.logger.info(
+            f"Started {self.query_workers} query and {self.bulk_workers} bulk embedding workers, "
+            f"{self.threads_per_worker} threads each."
+        )
+
+    def stop(self) -> None:
+        """Stop the worker processes."""
+        for pool in (self.query_pool, self.bulk_pool):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    async def embed_queries(self, texts: List[str]) -> list:
+        """
+        Embed queries, sharing model calls with the queries of concurrent requests.
+
+        Args:
+            texts (List[str]): Query texts.
+
+        Returns:
+            list: One vector per text.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        self._pending.extend(zip(texts, futures))
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+        return list(await asyncio.gather(*futures))
+
+    async def _flush(self) -> None:
+        try:
+            await asyncio.wait_for(self._batch_full.wait(), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        self._batch_full.clear()
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            task = asyncio.create_task(self._embed_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _embed_batch(self, batch: list) -> None:
+        EMBEDDING_BATCH_SIZE.labels(kind="query").observe(len(batch))
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                self.query_pool, embed_in_worker, [text for text, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    async def embed_documents(self, texts: List[str]) -> list:
+        """
+        Embed document chunks, in batches spread over the bulk workers.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            list: One vector per text.
+        """
+        loop = asyncio.get_running_loop()
+        batches = [texts[start : start + self.max_batch_size] for start in range(0, len(texts), self.max_batch_size)]
+        for batch in batches:
+            EMBEDDING_BATCH_SIZE.labels(kind="documents").observe(len(batch))
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.bulk_pool, embed_in_worker, batch) for batch in batches)
+        )
+        return [vector for vectors in results for vector in vectors]
+
+
+service_config = config["embeddings"]["service"]
+pool = EmbeddingWorkerPool(
+    config["embedding_model"],
+    bulk_workers=service_config["bulk_workers"],
+    query_workers=service_config["query_workers"],
+    max_batch_size=service_config["max_batch_size"],
+    max_wait_ms=service_config["max_wait_ms"],
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pool.start()
+    yield
+    pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+instrument(app)
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    kind: Literal["query", "documents"] = "query"
+    model: Optional[str] = None
+
+
+@app.get("/health")
+async def health():
+    """Liveness probe; the service only accepts connections once every worker has loaded the model."""
+    return {"status": "ok", "model": pool.model_name}
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    """
+    Embed texts with the service's model.
+
+    Args:
+        request (EmbedRequest): Texts, whether they are queries or document chunks, and optionally the model the
+            caller expects, which must be the one the service runs.
+
+    Returns:
+        dict: One vector per text, under `vectors`.
+    """
+    if request.model is not None and request.model != pool.model_name:
+        raise HTTPException(status_code=409, detail=f"This service embeds with {pool.model_name}, not {request.model}.")
+    try:
+        if request.kind == "query":
+            vectors = await pool.embed_queries(request.texts)
+        else:
+            vectors = await pool.embed_documents(request.texts)
+        return {"vectors": vectors}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
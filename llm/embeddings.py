@@ -0,0 +1,152 @@
+"""
+The embedding model used for the RAG index and the interview queries.
+
+By default the model runs inside the llm service. When an embedding service is configured (see
+`llm.embedding_service`), texts are sent to it instead, so the llm service's CPU and GIL stay free for requests. With
+`embedding_model: "fake"`, a deterministic fake model is used instead, so tests and benchmarks run without downloading
+a model.
+"""
+
+import os
+from typing import List
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+# `embedding_model` selecting `FakeEmbedding`.
+FAKE_MODEL = "fake"
+
+
+def service_url(config: dict) -> str:
+    """
+    The URL of the embedding service, from `EMBEDDING_SERVICE_URL` or `embeddings.service_url`; empty if none.
+
+    Args:
+        config (dict): Configuration with an `embeddings` section.
+    """
+    return os.getenv("EMBEDDING_SERVICE_URL", config["embeddings"]["service_url"])
+
+
+def create_embedding(config: dict) -> Embeddings:
+    """
+    Create the embedding model for the configured `embedding_model`.
+
+    Args:
+        config (dict): Configuration with the embedding model name and an `embeddings` section.
+
+    Returns:
+        Embeddings: A client of the embedding service if one is configured, else the model loaded in this process.
+    """
+    url = service_url(config)
+    if url:
+        return EmbeddingClient(url, config["embedding_model"], config["embeddings"]["request_timeout_seconds"])
+    return load_model(config["embedding_model"])
+
+
+def load_model(model_name: str) -> Embeddings:
+    """
+    Load an embedding model in this process.
+
+    Args:
+        model_name (str): HuggingFace model name, or `FAKE_MODEL`.
+
+    Returns:
+        Embeddings: The loaded model.
+    """
+    if model_name == FAKE_MODEL:
+        return FakeEmbedding()
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+class FakeEmbedding(Embeddings):
+    """
+    Deterministic stand-in for the embedding model, for tests and benchmarks.
+
+    Each vector is derived from a hash of its text, so a text gets the same vector in every process, e.g. in the workers
+    of the embedding service, but the vectors carry no meaning.
+    """
+
+    def __init__(self, size: int = 384) -> None:
+        """
+        Args:
+            size (int): Vector dimension; the default matches the default `embedding_model`.
+        """
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+
+        self.model = DeterministicFakeEmbedding(size=size)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+
+class EmbeddingClient(Embeddings):
+    """
+    Embeds texts through the embedding service.
+
+    Queries are micro-batched by the service with other queries; document lists are split by the service across its
+    worker processes. Thread-safe, so it can be called from the retriever's worker threads.
+    """
+
+    def __init__(self, url: str, model: str, timeout_seconds: float) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            url (str): Base URL of the embedding service.
+            model (str): Model the service must be running, so the vectors match the cached index.
+            timeout_seconds (float): Timeout of each request.
+        """
+        self.url = url.rstrip("/")
+        self.model = model
+        self.client = httpx.Client(timeout=timeout_seconds)
+
+    def embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        if not texts:
+            return []
+        response = self.client.post(f"{self.url}/embed", json={"texts": texts, "kind": kind, "model": self.model})
+        response.raise_for_status()
+        return response.json()["vectors"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed document chunks, using every worker of the service.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text.
+        """
+        return self.embed(texts, "documents")
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries at once, on the service's query workers.
+
+        Args:
+            texts (List[str]): Query texts.
+
+        Returns:
+            List[List[float]]: One vector per query.
+        """
+        return self.embed(texts, "query")
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, batched by the service with concurrent queries.
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return self.embed_queries([text])[0]
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Callable, Optional
+
+from llm.cache import LRUCache
+from llm.llm_router import LLMError, LLMRouter
+from llm.metrics import LLM_ERRORS, observe_llm_response, stage
+from llm.scheduler import EVALUATION
+
+MB = 1024 * 1024
+MIN_SCORE = 1
+MAX_SCORE = 5
+
+
+def parse_skill_result(text: str) -> dict:
+    """
+    Parse the LLM's JSON answer for one skill.
+
+    Args:
+        text (str): Raw LLM response, expected to hold `{"score": ..., "justification": ...}`.
+
+    Returns:
+        dict: `score` (an int clamped to the scale, or None if the answer could not be parsed) and `justification`.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    try:
+        data = json.loads(match.group(0) if match else text)
+        score = int(round(float(data["score"])))
+    except (ValueError, TypeError, KeyError):
+        return {"score": None, "justification": text.strip()}
+    return {
+        "score": min(max(score, MIN_SCORE), MAX_SCORE),
+        "justification": str(data.get("justification", "")).strip(),
+    }
+
+
+class SkillEvaluator:
+    """
+    Scores an interview transcript skill by skill, with one small LLM call per skill.
+
+    The calls for one transcript run concurrently, in the scheduler's evaluation class, and at most `max_parallel`
+    skill calls are in flight across the service. Parsed results are cached by a hash of the transcript, model and
+    prompt version, so re-evaluating an unchanged interview, or retrying one whose evaluation partly failed, only calls
+    the LLM for what is missing.
+    """
+
+    def __init__(self, config: dict, llm_router: LLMRouter) -> None:
+        """
+        Initialize the evaluator.
+
+        Args:
+            config (dict): Configuration with an `evaluation` section holding the skills, parallelism, cache size and
+                prompt version.
+            llm_router (LLMRouter): Shared router sending the generations to Ollama.
+        """
+        evaluation_config = config["evaluation"]
+        self.logger = logging.getLogger(__name__)
+        self.llm_router = llm_router
+        self.model = config["ollama"]["model"]
+        self.skills = evaluation_config["skills"]
+        self.max_parallel = evaluation_config["max_parallel"]
+        self.prompt_version = evaluation_config["prompt_version"]
+        self.cache = LRUCache(
+            max_size=int(evaluation_config["cache_mb"] * MB), sizeof=lambda result: len(result["justification"]) + 64
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding the number of in-flight skill calls."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_parallel)
+        return self._slots
+
+    def transcript_hash(self, transcript: str) -> str:
+        """
+        Hash a transcript together with everything else that determines its scores.
+
+        Args:
+            transcript (str): Interview transcript.
+
+        Returns:
+            str: Hex SHA-256 digest.
+        """
+        key = json.dumps([self.model, self.prompt_version, transcript])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    async def evaluate(self, transcript: str, build_payload: Callable[[str], dict]) -> dict:
+        """
+        Score every skill of a transcript.
+
+        Args:
+            transcript (str): Interview transcript.
+            build_payload (Callable[[str], dict]): Builds the Ollama request body for a skill.
+
+        Returns:
+            dict: `skills` (score and justification per skill), `scores` (score per skill), `overall_score` (mean of
+                the parsed scores, or None) and `transcript_hash`.
+
+        Raises:
+            LLMError: If an LLM call failed; skills scored before the failure stay cached.
+        """
+        transcript_hash = self.transcript_hash(transcript)
+        results = await asyncio.gather(
+            *(self.evaluate_skill(transcript_hash, skill, build_payload) for skill in self.skills)
+        )
+        skills = dict(zip(self.skills, results))
+        scores = {skill: result["score"] for skill, result in skills.items()}
+        parsed = [score for score in scores.values() if score is not None]
+        return {
+            "skills": skills,
+            "scores": scores,
+            "overall_score": round(sum(parsed) / len(parsed), 2) if parsed else None,
+            "transcript_hash": transcript_hash,
+        }
+
+    async def evaluate_skill(self, transcript_hash: str, skill: str, build_payload: Callable[[str], dict]) -> dict:
+        """
+        Score one skill, using the cache when possible.
+
+        Args:
+            transcript_hash (str): Hash of the transcript, from `transcript_hash`.
+            skill (str): Skill to score.
+            build_payload (Callable[[str], dict]): Builds the Ollama request body for a skill.
+
+        Returns:
+            dict: The skill's score and justification.
+        """
+        key = (transcript_hash, skill)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        async with self.slots:
+            try:
+                with stage("llm_skill"):
+                    response_data = await self.llm_router.generate(build_payload(skill), priority=EVALUATION)
+            except LLMError:
+                LLM_ERRORS.inc()
+                raise
+        observe_llm_response(response_data)
+        result = parse_skill_result(response_data["response"])
+        if result["score"] is None:
+            self.logger.warning(f"Could not parse the {skill} score: {response_data['response']!r}")
+        else:
+            self.cache.put(key, result)
+        return result
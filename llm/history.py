@@ -0,0 +1,150 @@
+import re
+import sys
+from collections import deque
+
+SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the number of LLM tokens in a text (about four characters per token for English).
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+
+class ConversationHistory:
+    """
+    Structured interview history with a bounded prompt view.
+
+    Every turn is kept for the evaluation and the saved transcript, but prompts only include the most recent turns
+    verbatim, within a token budget, preceded by a rolling summary of the older turns. Prompt size per turn therefore
+    stays roughly constant however long the interview runs.
+    """
+
+    def __init__(self, recent_turns: int, token_budget: int, summary_token_budget: int) -> None:
+        """
+        Initialize an empty history.
+
+        Args:
+            recent_turns (int): Maximum number of turns included verbatim in prompts.
+            token_budget (int): Maximum estimated tokens of verbatim turns included in prompts.
+            summary_token_budget (int): Maximum estimated tokens of the rolling summary.
+        """
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.turns = []
+        self.summary_parts = deque()
+        self.summary_tokens = 0
+        # Turns before this index have been folded into the summary.
+        self.summarized = 0
+        self.recent_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def __str__(self) -> str:
+        return self.transcript()
+
+    def append(self, role: str, text: str) -> None:
+        """
+        Add a turn, folding the oldest verbatim turns into the summary once the window is full.
+
+        Args:
+            role (str): Speaker of the turn (e.g. 'Candidate', 'Interviewer').
+            text (str): Turn content.
+        """
+        self.turns.append((role, text))
+        self.recent_tokens += estimate_tokens(self.format_turn(role, text))
+        while len(self.turns) - self.summarized > 1 and (
+            len(self.turns) - self.summarized > self.recent_turns or self.recent_tokens > self.token_budget
+        ):
+            self.fold_oldest_turn()
+
+    def fold_oldest_turn(self) -> None:
+        """Move the oldest verbatim turn into the rolling summary."""
+        role, text = self.turns[self.summarized]
+        self.summarized += 1
+        self.recent_tokens -= estimate_tokens(self.format_turn(role, text))
+        part = f"{role}: {self.summarize_turn(text)}"
+        self.summary_parts.append(part)
+        self.summary_tokens += estimate_tokens(part)
+        # Keep the newest part of the summary within its budget.
+        while len(self.summary_parts) > 1 and self.summary_tokens > self.summary_token_budget:
+            self.summary_tokens -= estimate_tokens(self.summary_parts.popleft())
+
+    @property
+    def summary(self) -> str:
+        """Rolling summary of the turns that left the verbatim window."""
+        return " ".join(self.summary_parts)
+
+    @staticmethod
+    def summarize_turn(text: str, max_words: int = 30) -> str:
+        """
+        Compact a turn to its first sentence, capped at `max_words` words.
+
+        Args:
+            text (str): Turn content.
+            max_words (int): Maximum number of words kept.
+
+        Returns:
+            str: The compacted turn.
+        """
+        first_sentence = SENTENCE_END.split(" ".join(text.split()), maxsplit=1)[0]
+        words = first_sentence.split()
+        if len(words) > max_words:
+            return " ".join(words[:max_words]) + "..."
+        return first_sentence
+
+    @staticmethod
+    def format_turn(role: str, text: str) -> str:
+        return f"{role}: {text}\n"
+
+    def transcript(self) -> str:
+        """
+        The full conversation, every turn verbatim.
+
+        Returns:
+            str: One "Role: text" line per turn.
+        """
+        return "".join(self.format_turn(role, text) for role, text in self.turns)
+
+    def prompt_view(self) -> str:
+        """
+        The bounded view of the conversation used in question prompts.
+
+        Returns:
+            str: The rolling summary of older turns followed by the recent turns verbatim.
+        """
+        recent = "".join(self.format_turn(role, text) for role, text in self.turns[self.summarized :])
+        if not self.summary:
+            return recent
+        return f"Summary of the earlier conversation: {self.summary}\n{recent}"
+
+    def latest(self) -> str:
+        """
+        The newest turn, used as the retrieval query.
+
+        Returns:
+            str: Content of the newest turn, or an empty string if there are none.
+        """
+        return self.turns[-1][1] if self.turns else ""
+
+    def memory_footprint(self) -> int:
+        """
+        Estimate the memory held by the history.
+
+        Returns:
+            int: Approximate size in bytes.
+        """
+        return (
+            sys.getsizeof(self.turns)
+            + sum(sys.getsizeof(text) for _, text in self.turns)
+            + sum(sys.getsizeof(part) for part in self.summary_parts)
+        )
@@ -0,0 +1,60 @@
+from typing import Optional
+
+import httpx
+
+
+class AsyncHTTPClient:
+    """
+    Long-lived, pooled async HTTP client shared by all interview sessions.
+
+    Connections to Ollama and the DB service are kept alive between requests. The number of concurrent generations is
+    bounded by `LLMScheduler`, not by the connection pool.
+    """
+
+    def __init__(self, config: dict) -> None:
+        """
+        Initialize the client settings. The underlying connection pool is created lazily inside the running event loop.
+
+        Args:
+            config (dict): Configuration with an `http` section holding timeouts and pool limits.
+        """
+        self.http_config = config["http"]
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled httpx client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    self.http_config["read_timeout"],
+                    connect=self.http_config["connect_timeout"],
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.http_config["max_connections"],
+                    max_keepalive_connections=self.http_config["max_keepalive_connections"],
+                    keepalive_expiry=self.http_config["keepalive_expiry"],
+                ),
+            )
+        return self._client
+
+    async def post_db(self, url: str, payload: dict) -> httpx.Response:
+        """
+        Post a request to the DB service.
+
+        Args:
+            url (str): DB service endpoint URL.
+            payload (dict): JSON request body.
+
+        Returns:
+            httpx.Response: The successful response.
+        """
+        response = await self.client.post(url, json=payload, timeout=self.http_config["db_timeout"])
+        response.raise_for_status()
+        return response
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
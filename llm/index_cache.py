@@ -0,0 +1,281 @@
+"""
+On-disk cache for the RAG vectorstore.
+
+The FAISS index is stored under `index_cache_dir`, in a directory named after a fingerprint of everything the index
+depends on: the document contents, the embedding model and the text splitter settings. The index is only rebuilt when
+one of these changes, and is memory-mapped on load so several worker processes share its pages. A running service
+updates it incrementally instead (see `llm.ingestion`).
+
+LangChain and the embedding model are only imported when an index is loaded or built, not when this module is imported,
+so importing the llm service stays fast.
+
+Prebuild the index (e.g. at image build time) with:
+
+    python -m llm.index_cache --config llm/config.yml
+
+When `index_cache_dir` is a volume, an index prebuilt into the image would be hidden by it; build it into another
+directory with `--cache-dir` and point `index_seed_dir` (or `INDEX_SEED_DIR`) at it, and the service copies it into the
+cache instead of rebuilding it.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Optional
+
+import faiss
+import yaml
+
+from llm.documents import (
+    add_chunks,
+    empty_vectorstore,
+    file_hash,
+    iter_chunks,
+    list_documents,
+)
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.json"
+# Bump when the layout of the cached index or its chunk metadata changes, so older caches are rebuilt.
+INDEX_FORMAT = 2
+
+logger = logging.getLogger(__name__)
+
+
+def document_hashes(config: dict) -> dict:
+    """
+    Hash the content of every RAG document.
+
+    Args:
+        config (dict): Configuration with the document directory.
+
+    Returns:
+        dict: Content hash of each document, keyed by its path relative to `rag_dir_path`.
+    """
+    return {
+        path: file_hash(os.path.join(config["rag_dir_path"], path)) for path in list_documents(config["rag_dir_path"])
+    }
+
+
+def index_fingerprint(config: dict, hashes: Optional[dict] = None) -> str:
+    """
+    Hash every input the index depends on.
+
+    Args:
+        config (dict): Configuration with the embedding model, document directory and splitter settings.
+        hashes (Optional[dict]): Document hashes from `document_hashes`, if already computed.
+
+    Returns:
+        str: Hex digest identifying the index.
+    """
+    if hashes is None:
+        hashes = document_hashes(config)
+    digest = hashlib.sha256()
+    digest.update(str(INDEX_FORMAT).encode())
+    digest.update(config["embedding_model"].encode())
+    digest.update(json.dumps(config["text_splitter"], sort_keys=True).encode())
+    for path in sorted(hashes):
+        digest.update(path.encode())
+        digest.update(hashes[path].encode())
+    return digest.hexdigest()
+
+
+def build_vectorstore(config: dict, embedding: "Embeddings", hashes: Optional[dict] = None) -> "FAISS":
+    """
+    Load, split and embed the documents in `rag_dir_path`, streaming them in batches of `ingestion.batch_size` chunks.
+
+    Args:
+        config (dict): Configuration with the document directory, splitter settings and ingestion batch size.
+        embedding (Embeddings): Embedding model used for the chunks.
+        hashes (Optional[dict]): Document hashes from `document_hashes`, if already computed.
+
+    Returns:
+        FAISS: A vectorstore built from the split document chunks.
+    """
+    if hashes is None:
+        hashes = document_hashes(config)
+    vectorstore = empty_vectorstore(embedding)
+    chunks = add_chunks(vectorstore, iter_chunks(config, sorted(hashes), hashes), config["ingestion"]["batch_size"])
+    logger.info(f"Embedded {chunks} chunks from {len(hashes)} documents.")
+    return vectorstore
+
+
+def save_vectorstore(vectorstore: "FAISS", path: str) -> None:
+    """
+    Write the FAISS index and its chunks to a directory.
+
+    Args:
+        vectorstore (FAISS): Vectorstore to save.
+        path (str): Target directory; created if missing.
+    """
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(path, INDEX_FILE))
+    docs = []
+    for position in range(vectorstore.index.ntotal):
+        docstore_id = vectorstore.index_to_docstore_id[position]
+        doc = vectorstore.docstore.search(docstore_id)
+        docs.append({"id": docstore_id, "page_content": doc.page_content, "metadata": doc.metadata})
+    with open(os.path.join(path, DOCS_FILE), "w") as f:
+        json.dump(docs, f)
+
+
+def load_vectorstore(path: str, embedding: "Embeddings") -> "FAISS":
+    """
+    Load a saved FAISS index, memory-mapping it when the index type supports it.
+
+    Args:
+        path (str): Directory written by `save_vectorstore`.
+        embedding (Embeddings): Embedding model used for queries.
+
+    Returns:
+        FAISS: The loaded vectorstore.
+    """
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    index_path = os.path.join(path, INDEX_FILE)
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    try:
+        index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_path)
+    with open(os.path.join(path, DOCS_FILE)) as f:
+        docs = json.load(f)
+    docstore = InMemoryDocstore(
+        {doc["id"]: Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in docs}
+    )
+    index_to_docstore_id = {position: doc["id"] for position, doc in enumerate(docs)}
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def load_or_build_vectorstore(config: dict, force: bool = False, embedding: Optional["Embeddings"] = None) -> "FAISS":
+    """
+    Load the cached index for the current inputs, building and caching it first if needed.
+
+    Args:
+        config (dict): Configuration with the embedding model, document directory, splitter settings and
+            `index_cache_dir`.
+        force (bool): Rebuild even if a cached index exists.
+        embedding (Optional[Embeddings]): Embedding model to use instead of `embedding_model`, e.g. a deterministic
+            fake for benchmarks; give it its own `index_cache_dir`, since the fingerprint only covers the model name.
+
+    Returns:
+        FAISS: The vectorstore for the current documents.
+    """
+    if embedding is None:
+        from llm.embeddings import create_embedding
+
+        embedding = create_embedding(config)
+    hashes = document_hashes(config)
+    fingerprint = index_fingerprint(config, hashes)
+    path = os.path.join(config["index_cache_dir"], fingerprint)
+
+    if not force and (os.path.exists(os.path.join(path, DOCS_FILE)) or seed_index(config, fingerprint)):
+        logger.info(f"Loading cached vectorstore from {path}.")
+        return load_vectorstore(path, embedding)
+
+    logger.info(f"Building vectorstore for fingerprint {fingerprint}.")
+    vectorstore = build_vectorstore(config, embedding, hashes)
+    cache_vectorstore(vectorstore, config["index_cache_dir"], fingerprint)
+    return vectorstore
+
+
+def seed_index(config: dict, fingerprint: str) -> bool:
+    """
+    Copy the index prebuilt for a fingerprint from `index_seed_dir` into the cache, if there is one.
+
+    Args:
+        config (dict): Configuration with `index_cache_dir` and `index_seed_dir`.
+        fingerprint (str): Fingerprint of the current inputs.
+
+    Returns:
+        bool: Whether the cache now holds the index for the fingerprint.
+    """
+    seed_dir = os.getenv("INDEX_SEED_DIR", config["index_seed_dir"])
+    source = os.path.join(seed_dir, fingerprint)
+    if not seed_dir or not os.path.exists(os.path.join(source, DOCS_FILE)):
+        return False
+    cache_dir = config["index_cache_dir"]
+    path = os.path.join(cache_dir, fingerprint)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Copy to a temporary directory and rename it, like `cache_vectorstore`; a concurrent worker may win the rename.
+    tmp_path = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        shutil.copytree(source, tmp_path, dirs_exist_ok=True)
+        os.rename(tmp_path, path)
+        logger.info(f"Seeded the vectorstore cache from {source}.")
+    except OSError as e:
+        logger.warning(f"Could not seed vectorstore {path} from {source}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return os.path.exists(os.path.join(path, DOCS_FILE))
+
+
+def cache_vectorstore(vectorstore: "FAISS", cache_dir: str, fingerprint: str) -> None:
+    """
+    Save a vectorstore as the cached index for a fingerprint, and remove the indexes of older fingerprints.
+
+    Args:
+        vectorstore (FAISS): Vectorstore to save.
+        cache_dir (str): Index cache directory.
+        fingerprint (str): Fingerprint of the inputs the vectorstore was built from.
+    """
+    path = os.path.join(cache_dir, fingerprint)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary directory and rename it, so concurrent workers never see a partial index.
+    tmp_path = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        save_vectorstore(vectorstore, tmp_path)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache vectorstore in {path}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    prune_stale_indexes(cache_dir, keep=fingerprint)
+
+
+def prune_stale_indexes(cache_dir: str, keep: str) -> None:
+    """
+    Remove cached indexes for outdated fingerprints.
+
+    Args:
+        cache_dir (str): Index cache directory.
+        keep (str): Fingerprint of the index to keep.
+    """
+    for entry in os.listdir(cache_dir):
+        if entry != keep and not entry.startswith("."):
+            logger.info(f"Removing stale vectorstore {entry}.")
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prebuild the cached RAG vectorstore.")
+    parser.add_argument("--config", default="llm/config.yml", help="Path to the llm service config.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the index is up to date.")
+    parser.add_argument("--cache-dir", help="Build into this directory instead of `index_cache_dir`.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    if args.cache_dir:
+        config = {**config, "index_cache_dir": args.cache_dir, "index_seed_dir": ""}
+    load_or_build_vectorstore(config, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
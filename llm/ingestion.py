@@ -0,0 +1,174 @@
+"""
+Incremental updates of the live RAG index.
+
+The documents in `rag_dir_path` are compared with the chunks in the index, by path and content hash: chunks of
+removed and changed documents are deleted, and new and changed documents are split and embedded in batches. The update
+is applied to a copy of the index, which is then cached on disk and swapped into the retriever, so searches keep being
+served from the previous index until the new one is complete.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from llm.documents import add_chunks, file_hash, iter_chunks, list_documents
+from llm.index_cache import cache_vectorstore, index_fingerprint
+from llm.retrieval import Retriever
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+
+def indexed_documents(vectorstore: "FAISS") -> tuple:
+    """
+    List the documents a vectorstore holds chunks of.
+
+    Args:
+        vectorstore (FAISS): Vectorstore built from `llm.documents.iter_chunks` chunks.
+
+    Returns:
+        tuple: The content hash of each indexed document, and the chunk IDs of each, both keyed by document ID.
+    """
+    hashes, chunk_ids = {}, {}
+    for chunk_id in vectorstore.index_to_docstore_id.values():
+        metadata = vectorstore.docstore.search(chunk_id).metadata
+        if "doc_id" in metadata:
+            hashes[metadata["doc_id"]] = metadata["doc_hash"]
+            chunk_ids.setdefault(metadata["doc_id"], []).append(chunk_id)
+    return hashes, chunk_ids
+
+
+def copy_vectorstore(vectorstore: "FAISS") -> "FAISS":
+    """
+    Copy a vectorstore into memory, so it can be modified while the original is still searched.
+
+    Args:
+        vectorstore (FAISS): Vectorstore to copy; its index may be memory-mapped read-only.
+
+    Returns:
+        FAISS: A writable copy sharing the embedding model and the chunk documents.
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    ids = vectorstore.index_to_docstore_id
+    return FAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=faiss.clone_index(vectorstore.index),
+        docstore=InMemoryDocstore({chunk_id: vectorstore.docstore.search(chunk_id) for chunk_id in ids.values()}),
+        index_to_docstore_id=dict(ids),
+    )
+
+
+class DocumentIngestor:
+    """
+    Brings the live RAG index up to date with the documents in `rag_dir_path`.
+
+    Documents whose size and modification time have not changed since the last scan are not hashed again, and documents
+    without any text (e.g. scanned PDFs) are not read again until they change.
+    """
+
+    def __init__(self, config: dict) -> None:
+        """
+        Initialize the ingestor.
+
+        Args:
+            config (dict): Configuration with the document directory, splitter settings, `index_cache_dir` and an
+                `ingestion` section holding the batch size.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.batch_size = config["ingestion"]["batch_size"]
+        self._stats: dict = {}
+        # Content hash of the documents that yielded no chunks, which the index therefore does not record.
+        self._empty: dict = {}
+        self._lock = threading.Lock()
+
+    def scan(self) -> dict:
+        """
+        Hash the current documents, reusing the hashes of files that did not change since the last scan.
+
+        Returns:
+            dict: Content hash of each document, keyed by its path relative to `rag_dir_path`.
+        """
+        hashes, stats = {}, {}
+        for doc_id in list_documents(self.config["rag_dir_path"]):
+            path = os.path.join(self.config["rag_dir_path"], doc_id)
+            try:
+                stat = os.stat(path)
+                key = (stat.st_mtime_ns, stat.st_size)
+                cached = self._stats.get(doc_id)
+                hashes[doc_id] = cached[1] if cached and cached[0] == key else file_hash(path)
+            except OSError as e:
+                # Removed or unreadable between listing and hashing; it is picked up by the next scan.
+                self.logger.warning(f"Could not read document {doc_id}: {e}")
+                continue
+            stats[doc_id] = (key, hashes[doc_id])
+        self._stats = stats
+        return hashes
+
+    def sync(self, retriever: Retriever) -> dict:
+        """
+        Reindex the documents that were added, changed or removed since the retriever's index was built.
+
+        Blocking; only one update runs at a time.
+
+        Args:
+            retriever (Retriever): Retriever whose vectorstore is updated and swapped.
+
+        Returns:
+            dict: The number of documents added, updated and removed, of chunks added and removed, and of chunks in
+                the index, and the time taken.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            hashes = self.scan()
+            indexed, chunk_ids = indexed_documents(retriever.vectorstore)
+            self._empty = {doc_id: digest for doc_id, digest in self._empty.items() if hashes.get(doc_id) == digest}
+            added = sorted(doc_id for doc_id in hashes.keys() - indexed.keys() if doc_id not in self._empty)
+            removed = sorted(indexed.keys() - hashes.keys())
+            updated = sorted(doc_id for doc_id in hashes.keys() & indexed.keys() if hashes[doc_id] != indexed[doc_id])
+            result = {"added": len(added), "updated": len(updated), "removed": len(removed)}
+            if not (added or updated or removed):
+                return {**result, "chunks_added": 0, "chunks_removed": 0, "chunks": retriever.vectorstore.index.ntotal}
+
+            vectorstore = copy_vectorstore(retriever.vectorstore)
+            stale = [chunk_id for doc_id in removed + updated for chunk_id in chunk_ids[doc_id]]
+            if stale:
+                vectorstore.delete(stale)
+            result["chunks_removed"] = len(stale)
+            chunked = set()
+
+            def track(chunks):
+                for chunk in chunks:
+                    chunked.add(chunk[2]["doc_id"])
+                    yield chunk
+
+            chunks = track(iter_chunks(self.config, added + updated, hashes))
+            result["chunks_added"] = add_chunks(vectorstore, chunks, self.batch_size)
+            self._empty.update({doc_id: hashes[doc_id] for doc_id in added + updated if doc_id not in chunked})
+            result["chunks"] = vectorstore.index.ntotal
+            cache_vectorstore(vectorstore, self.config["index_cache_dir"], index_fingerprint(self.config, hashes))
+            retriever.swap(vectorstore)
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            self.logger.info(f"Reindexed the RAG documents: {result}")
+            return result
+
+    async def watch(self, retriever: Retriever, interval_seconds: float) -> None:
+        """
+        Keep the retriever's index up to date, checking the documents every `interval_seconds`.
+
+        Args:
+            retriever (Retriever): Retriever whose vectorstore is updated and swapped.
+            interval_seconds (float): Time between two checks.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.sync, retriever)
+            except Exception as e:
+                self.logger.error(f"Could not reindex the RAG documents: {e}")
+            await asyncio.sleep(interval_seconds)
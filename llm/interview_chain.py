@@ -1,21 +1,44 @@
+import asyncio
 import json
 import logging
 import os
+import sys
+import time
 import uuid
-
-import requests
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_community.vectorstores import FAISS
-from langchain_core.prompts import PromptTemplate
-from langchain_huggingface import HuggingFaceEmbeddings
-
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from llm.evaluation import SkillEvaluator
+from llm.history import ConversationHistory
+from llm.http_client import AsyncHTTPClient
+from llm.index_cache import load_or_build_vectorstore
+from llm.llm_context import SessionLLMContext
+from llm.llm_router import LLMError, LLMRouter
+from llm.metrics import (
+    LLM_ERRORS,
+    STAGE_SECONDS,
+    log_payload,
+    observe_llm_response,
+    stage,
+    start_span,
+)
+from llm.opening_questions import NAME_PLACEHOLDER, OpeningQuestionCache
 from llm.prompts import (
     evaluation_system_prompt,
     evaluation_user_prompt,
+    interview_continuation_guidelines_prompt,
+    interview_continuation_prompt,
     interview_system_prompt,
     interview_user_prompt,
+    skill_evaluation_system_prompt,
+    skill_evaluation_user_prompt,
 )
+from llm.retrieval import Retriever
+from llm.scheduler import EVALUATION, START, TURN, LLMOverloadedError, LLMScheduler
+from llm.streaming import IncrementalResponseProcessor
+from llm.write_buffer import InterviewWriteBuffer
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -25,23 +48,60 @@ class InterviewChain:
     Manages the interview session, including generating questions, evaluating responses, and logging the conversation.
     """
 
-    def __init__(self, config: dict) -> None:
+    def __init__(
+        self,
+        config: dict,
+        retriever: Optional[Retriever] = None,
+        http_client: Optional[AsyncHTTPClient] = None,
+        write_buffer: Optional[InterviewWriteBuffer] = None,
+        evaluator: Optional[SkillEvaluator] = None,
+        llm_router: Optional[LLMRouter] = None,
+        opening_questions: Optional[OpeningQuestionCache] = None,
+    ) -> None:
         """
         Initialize the InterviewChain with configuration data.
 
         Args:
             config (dict): Configuration parameters for interview, vectorstore, and LLM.
+            retriever (Optional[Retriever]): Shared retriever; built over the documents in `rag_dir_path` if not
+                provided.
+            http_client (Optional[AsyncHTTPClient]): Shared pooled HTTP client; a private one is created if not provided.
+            write_buffer (Optional[InterviewWriteBuffer]): Shared buffer for saving interviews in batches; interviews
+                are saved one by one if not provided.
+            evaluator (Optional[SkillEvaluator]): Shared per-skill evaluator and its result cache; a private one is
+                created if not provided.
+            llm_router (Optional[LLMRouter]): Shared router over the Ollama backends and its scheduler; a private one
+                sending every generation to `OLLAMA_URL` is created if not provided.
+            opening_questions (Optional[OpeningQuestionCache]): Shared cache of opening questions per role; every
+                opening question is generated if not provided.
         """
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.llm_url = os.environ["OLLAMA_URL"]
         self.db_url = os.environ["DB_SERVICE_URL"]
         self.candidate_info = {}
-        self.history = ""
+        self.history = self.init_history()
+        self.llm_context = SessionLLMContext(max_tokens=self.config["ollama"]["max_context_tokens"])
+        # Final response of the last LLM call, or None if it failed.
+        self.last_llm_response: Optional[dict] = None
         self.max_questions = self.config["max_questions"]
         self.question_count = 0
-        self.vectorstore = self.init_vectorstore()
+        self.retriever = retriever if retriever is not None else Retriever(self.init_vectorstore(config), config)
         self.session_id = None
+        # Number of history turns already stored in the session backend.
+        self.persisted_turns = 0
+        self.http_client = http_client if http_client is not None else AsyncHTTPClient(config)
+        self.llm_router = (
+            llm_router
+            if llm_router is not None
+            else LLMRouter(config, self.http_client, urls=[self.llm_url], scheduler=LLMScheduler(config))
+        )
+        self.write_buffer = write_buffer
+        self.opening_questions = opening_questions
+        self.payload_log_sample_rate = config["observability"]["payload_log_sample_rate"]
+        self.evaluator = evaluator if evaluator is not None else SkillEvaluator(config, self.llm_router)
+        # Serializes requests for the same session, since each turn reads and updates the history.
+        self.lock = asyncio.Lock()
 
     def init_candidate_info(self) -> None:
         """Initialize an empty candidate info dictionary."""
@@ -52,28 +112,111 @@ class InterviewChain:
         Initialize a new interview session by resetting history and candidate info and assigning a new session ID.
         """
         self.logger.info("Initializing new interview session.")
-        self.history = ""
+        self.history = self.init_history()
+        self.llm_context.reset()
         self.init_candidate_info()
         self.question_count = 0
         self.session_id = uuid.uuid4()
+        self.persisted_turns = 0
+
+    def init_history(self) -> ConversationHistory:
+        """
+        Create an empty conversation history bounded by the `history` settings.
+
+        Returns:
+            ConversationHistory: The new history.
+        """
+        return ConversationHistory(
+            recent_turns=self.config["history"]["recent_turns"],
+            token_budget=self.config["history"]["token_budget"],
+            summary_token_budget=self.config["history"]["summary_token_budget"],
+        )
 
-    def init_vectorstore(self) -> FAISS:
+    @staticmethod
+    def init_vectorstore(config: dict) -> "FAISS":
         """
         Initialize the vectorstore from documents in the provided directory.
 
+        The index is loaded from the on-disk cache in `index_cache_dir` and only rebuilt when the documents, the
+        embedding model or the splitter settings change. The vectorstore holds no session state, so a single
+        instance can be shared by all sessions.
+
+        Args:
+            config (dict): Configuration with the embedding model, document directory and splitter settings.
+
         Returns:
             FAISS: A vectorstore built from the split document chunks.
         """
-        embedding = HuggingFaceEmbeddings(model_name=self.config["embedding_model"])
-        dir_loader = DirectoryLoader(self.config["rag_dir_path"], glob="**/*.txt", loader_cls=TextLoader)
-        docs = dir_loader.load()
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.config["text_splitter"]["chunk_size"],
-            chunk_overlap=self.config["text_splitter"]["chunk_overlap"],
-        )
-        docs = splitter.split_documents(docs)
-        vectorstore = FAISS.from_documents(docs, embedding)
-        return vectorstore
+        return load_or_build_vectorstore(config)
+
+    def memory_footprint(self) -> int:
+        """
+        Estimate the memory held by this session's state.
+
+        Returns:
+            int: Approximate size in bytes of the history and candidate info.
+        """
+        return self.history.memory_footprint() + sum(sys.getsizeof(value) for value in self.candidate_info.values())
+
+    def snapshot(self) -> dict:
+        """
+        Capture the session state as plain data, e.g. to evaluate it after the session is gone.
+
+        Returns:
+            dict: JSON-serializable session state.
+        """
+        return {
+            "session_id": str(self.session_id),
+            "candidate_info": dict(self.candidate_info),
+            "turns": [list(turn) for turn in self.history.turns],
+            "question_count": self.question_count,
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """
+        Load session state captured by `snapshot`.
+
+        Args:
+            snapshot (dict): Session state.
+        """
+        self.session_id = uuid.UUID(snapshot["session_id"])
+        self.candidate_info = dict(snapshot["candidate_info"])
+        self.history = self.init_history()
+        for role, text in snapshot["turns"]:
+            self.history.append(role, text)
+        self.question_count = snapshot["question_count"]
+        self.llm_context.reset()
+
+    def session_meta(self) -> dict:
+        """
+        Session state other than the turns, as stored by the session backends.
+
+        Returns:
+            dict: JSON-serializable candidate info, question count, number of turns and LLM context.
+        """
+        return {
+            "candidate_info": self.candidate_info,
+            "question_count": self.question_count,
+            "turns": len(self.history),
+            "llm_context": self.llm_context.to_state(),
+        }
+
+    def apply_session_state(self, session_id: str, meta: dict, turns: list) -> None:
+        """
+        Bring the session up to date with state loaded from a session backend.
+
+        Args:
+            session_id (str): Session ID.
+            meta (dict): Meta record built by `session_meta`.
+            turns (list): The `(role, text)` turns this chain does not hold yet.
+        """
+        self.session_id = uuid.UUID(session_id)
+        for role, text in turns:
+            self.history.append(role, text)
+        self.candidate_info = dict(meta["candidate_info"])
+        self.question_count = meta["question_count"]
+        self.llm_context.load_state(meta["llm_context"])
+        self.persisted_turns = meta["turns"]
 
     def add_candidate_info(self, name: str, role: str, email: str) -> None:
         """
@@ -98,12 +241,7 @@ class InterviewChain:
         Returns:
             str: The formatted prompt.
         """
-        prompt_template = PromptTemplate.from_template(interview_user_prompt)
-        prompt = prompt_template.format(
-            context=context,
-            history=self.history,
-        )
-        return prompt
+        return interview_user_prompt.format(context=context, history=self.history.prompt_view())
 
     def create_evaluation_prompt(self) -> str:
         """
@@ -112,10 +250,62 @@ class InterviewChain:
         Returns:
             str: The formatted evaluation prompt.
         """
-        prompt_template = PromptTemplate.from_template(evaluation_user_prompt)
-        prompt = prompt_template.format(history=self.history)
+        with stage("prompt", self.session_id):
+            prompt = evaluation_user_prompt.format(history=self.history.transcript())
         return prompt
 
+    def create_skill_evaluation_prompt(self, skill: str) -> str:
+        """
+        Create the prompt for scoring one skill over the interview conversation.
+
+        Args:
+            skill (str): Skill to score.
+
+        Returns:
+            str: The formatted skill evaluation prompt.
+        """
+        return skill_evaluation_user_prompt.format(skill=skill.replace("_", " "), history=self.history.transcript())
+
+    def create_turn_prompt(self, context: str) -> tuple:
+        """
+        Create the prompt for the next question, continuing from the cached LLM context when possible.
+
+        With a usable context, the prompt only holds the turns added since the last generation, plus the guidelines if
+        they changed. Otherwise it is the full question prompt.
+
+        Args:
+            context (str): Additional context from the vectorstore.
+
+        Returns:
+            tuple: The prompt and the LLM context tokens to send with it, or None for a full prompt.
+        """
+        with stage("prompt", self.session_id):
+            return self._create_turn_prompt(context)
+
+    def _create_turn_prompt(self, context: str) -> tuple:
+        if not self.config["ollama"]["reuse_context"] or not self.llm_context.usable():
+            return self.create_question_prompt(context), None
+
+        new_turns = self.history.turns[self.llm_context.covered_turns :]
+        history = "".join(self.history.format_turn(role, text) for role, text in new_turns)
+        if context == self.llm_context.guidelines:
+            prompt = interview_continuation_prompt.format(history=history)
+        else:
+            prompt = interview_continuation_guidelines_prompt.format(context=context, history=history)
+        return prompt, self.llm_context.tokens
+
+    def record_llm_context(self, context: str, reused: bool) -> None:
+        """
+        Keep the LLM context returned for the question just added to the history, and record the prefill saved.
+
+        Args:
+            context (str): Guidelines sent with the question prompt.
+            reused (bool): Whether the question continued from the cached context.
+        """
+        full_prompt_chars = len(interview_system_prompt) + len(self.create_question_prompt(context))
+        self.llm_context.record_turn(self.last_llm_response, full_prompt_chars, reused)
+        self.llm_context.update(self.last_llm_response, covered_turns=len(self.history), guidelines=context)
+
     def update_history(self, text: str, role: str) -> None:
         """
         Update the conversation history with a new message.
@@ -124,20 +314,24 @@ class InterviewChain:
             text (str): Message content.
             role (str): Role of the sender (e.g., 'User', 'Chatbot', 'AI').
         """
-        self.history += f"{role}: {text}\n"
+        self.history.append(role, text)
 
     def get_context(self) -> str:
         """
-        Retrieve relevant context via a similarity search on the conversation history.
+        Retrieve relevant context via a similarity search on the newest turn of the conversation.
+
+        Only the newest turn is embedded, so the query cost does not grow with the interview, and repeated queries are
+        answered from the retriever's cache.
 
         Returns:
             str: Concatenated context string.
         """
-        results = self.vectorstore.similarity_search(self.history, k=1)
+        with stage("retrieval", self.session_id):
+            results = self.retriever.search(self.history.latest(), k=1)
         context = "\n".join([doc.page_content for doc in results])
         return context
 
-    def generate_question(self, user_input: str) -> str:
+    async def generate_question(self, user_input: str) -> str:
         """
         Generate a new interview question based on the candidate's input.
 
@@ -146,21 +340,185 @@ class InterviewChain:
 
         Returns:
             str: Generated interview question.
+
+        Raises:
+            LLMError: If the question could not be generated; the candidate's input is not kept, so it can be sent again.
         """
         if self.question_count > self.max_questions:
             return None
         else:
-            context = self.get_context()
             self.update_history(user_input, "Candidate")
-            prompt = self.create_question_prompt(context)
-            response = self.call_llm(
-                prompt, interview_system_prompt, stopwords=["Candidate:", f"\n{self.candidate_info['name']}", "(Note"]
-            )
+            # Retrieval embeds the query on the CPU, so keep it off the event loop.
+            context = await asyncio.to_thread(self.get_context)
+            prompt, llm_context = self.create_turn_prompt(context)
+            priority = self.turn_priority()
+            try:
+                try:
+                    response = await self.call_llm(
+                        prompt,
+                        interview_system_prompt,
+                        stopwords=self.question_stopwords(),
+                        llm_context=llm_context,
+                        priority=priority,
+                    )
+                except LLMOverloadedError:
+                    raise
+                except LLMError:
+                    if llm_context is None:
+                        raise
+                    self.logger.warning("LLM call with cached context failed; retrying with the full prompt.")
+                    self.llm_context.reset()
+                    prompt, llm_context = self.create_turn_prompt(context)
+                    response = await self.call_llm(
+                        prompt, interview_system_prompt, stopwords=self.question_stopwords(), priority=priority
+                    )
+            except LLMError:
+                self.discard_latest_turn()
+                raise
 
         self.update_history(response, "Interviewer")
+        self.record_llm_context(context, reused=llm_context is not None)
         self.question_count += 1
         return response
 
+    async def stream_question(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Generate a new interview question, yielding it piece by piece as the LLM produces it.
+
+        The question is added to the history once the stream ends, or with whatever was generated if the stream is
+        closed early or breaks off. If nothing was generated, e.g. the client went away before the first piece, neither
+        the question nor the candidate's input is kept, and the question is not counted.
+
+        Args:
+            user_input (str): Candidate input text.
+
+        Yields:
+            str: Successive pieces of the generated question.
+
+        Raises:
+            LLMError: If nothing could be generated; the candidate's input is not kept, so it can be sent again.
+        """
+        if self.question_count > self.max_questions:
+            return
+        self.update_history(user_input, "Candidate")
+        context = await asyncio.to_thread(self.get_context)
+        prompt, llm_context = self.create_turn_prompt(context)
+        priority = self.turn_priority()
+        pieces = []
+        try:
+            async for piece in self.stream_llm(
+                prompt,
+                interview_system_prompt,
+                stopwords=self.question_stopwords(),
+                llm_context=llm_context,
+                priority=priority,
+            ):
+                pieces.append(piece)
+                yield piece
+            if not pieces and self.last_llm_response is None and llm_context is not None:
+                self.logger.warning("LLM stream with cached context failed; retrying with the full prompt.")
+                self.llm_context.reset()
+                prompt, llm_context = self.create_turn_prompt(context)
+                async for piece in self.stream_llm(
+                    prompt, interview_system_prompt, stopwords=self.question_stopwords(), priority=priority
+                ):
+                    pieces.append(piece)
+                    yield piece
+            if not pieces:
+                raise LLMError("Failed to generate a question.")
+        finally:
+            if not pieces:
+                self.discard_latest_turn()
+            else:
+                self.update_history("".join(pieces), "Interviewer")
+                self.record_llm_context(context, reused=llm_context is not None)
+                self.question_count += 1
+
+    @staticmethod
+    def opening_input(name: str, role: str) -> str:
+        """
+        The candidate's opening turn, sent on their behalf when the interview starts.
+
+        Args:
+            name (str): Candidate's name.
+            role (str): Role the candidate applied for.
+
+        Returns:
+            str: The greeting.
+        """
+        return f"Hi, my name is {name}, and I applied for the role of {role}. I am ready for the interview."
+
+    async def generate_opening_question(self) -> str:
+        """
+        Start the interview: add the candidate's greeting and the first question to the history.
+
+        With an opening question cache, the question is the one cached for the candidate's role, with their name
+        filled in, and is only generated on a miss.
+
+        Returns:
+            str: The first interview question.
+
+        Raises:
+            LLMError: If the question could not be generated.
+        """
+        user_input = self.opening_input(self.candidate_info["name"], self.candidate_info["role"])
+        if self.opening_questions is None or not self.opening_questions.enabled:
+            return await self.generate_question(user_input)
+        template = await self.opening_questions.get(self.candidate_info["role"], self.generate_opening_template)
+        question = self.opening_questions.render(template, self.candidate_info["name"])
+        self.update_history(user_input, "Candidate")
+        self.update_history(question, "Interviewer")
+        self.question_count += 1
+        return question
+
+    async def generate_opening_template(self, role: str) -> str:
+        """
+        Generate the opening question for a role in a throwaway session, with a placeholder for the candidate's name.
+
+        Args:
+            role (str): Normalized role.
+
+        Returns:
+            str: The question, holding `NAME_PLACEHOLDER` wherever it addresses the candidate by name.
+
+        Raises:
+            LLMError: If the generation failed.
+        """
+        chain = InterviewChain(
+            self.config,
+            retriever=self.retriever,
+            http_client=self.http_client,
+            evaluator=self.evaluator,
+            llm_router=self.llm_router,
+        )
+        chain.add_candidate_info(name=NAME_PLACEHOLDER, role=role, email="")
+        return await chain.generate_question(chain.opening_input(NAME_PLACEHOLDER, role))
+
+    def turn_priority(self) -> str:
+        """
+        The scheduler class of the next question's generation.
+
+        Returns:
+            str: `START` for the first question of the interview, `TURN` for the others.
+        """
+        return START if self.question_count == 0 else TURN
+
+    def discard_latest_turn(self) -> None:
+        """Drop the newest turn, e.g. the candidate input of a question that could not be generated."""
+        turns = self.history.turns[:-1]
+        self.history = self.init_history()
+        for role, text in turns:
+            self.history.append(role, text)
+
+    def question_stopwords(self) -> list:
+        """
+        Stopwords that keep the LLM from writing the candidate's side of the conversation.
+
+        Returns:
+            list: Stopwords for question generation.
+        """
+        return ["Candidate:", f"\n{self.candidate_info['name']}", "(Note"]
+
     def get_first_prompt(self) -> str:
         """
         Generate the initial greeting prompt.
@@ -170,37 +528,74 @@ class InterviewChain:
         """
         return f"Hi, my name is {self.candidate_info['name']}, and I applied for the role of {self.candidate_info['role']}."
 
-    def generate_evaluation(self) -> str:
+    async def generate_evaluation(self) -> str:
         """
-        Generate an evaluation of the interview conversation.
+        Generate an evaluation of the interview conversation, in the scheduler's lowest priority class.
 
         Returns:
             str: Generated evaluation.
+
+        Raises:
+            LLMError: If the LLM call failed.
         """
         prompt = self.create_evaluation_prompt()
-        response = self.call_llm(prompt, evaluation_system_prompt, stopwords=[])
+        response = await self.call_llm(prompt, evaluation_system_prompt, stopwords=[], priority=EVALUATION)
         return response
 
-    def save_interview(self, evaluation: str) -> None:
+    async def generate_skill_evaluation(self) -> dict:
         """
-        Save the complete interview session to the database.
+        Score each skill of the interview conversation with its own prompt, concurrently.
+
+        Returns:
+            dict: The structured evaluation returned by `SkillEvaluator.evaluate`.
+
+        Raises:
+            LLMError: If an LLM call failed.
+        """
+
+        def build_payload(skill: str) -> dict:
+            prompt = self.create_skill_evaluation_prompt(skill)
+            return self.create_llm_payload(
+                prompt, skill_evaluation_system_prompt, stopwords=[], stream=False, response_format="json"
+            )
+
+        return await self.evaluator.evaluate(self.history.transcript(), build_payload)
+
+    async def save_interview(self, evaluation: str, skill_evaluation: Optional[dict] = None) -> None:
+        """
+        Save the complete interview session to the database, returning once it is committed.
+
+        With a write buffer, the interview is sent in a batch with the interviews of concurrent sessions. The DB
+        service stores one interview per session, so saving again, e.g. from a retried evaluation job, is harmless.
 
         Args:
             evaluation (str): Evaluation text.
+            skill_evaluation (Optional[dict]): Structured evaluation, whose scores are stored in their own columns.
+
+        Raises:
+            httpx.HTTPError: If the interview could not be saved.
+            WriteBufferFullError: If the write buffer holds too many interviews to take this one.
         """
+        with stage("db_save", self.session_id):
+            await self._save_interview(evaluation, skill_evaluation)
+
+    async def _save_interview(self, evaluation: str, skill_evaluation: Optional[dict]) -> None:
         self.logger.info("Saving interview data.")
         interview = {
             "session_id": str(self.session_id),
             "user": json.dumps(self.candidate_info),
-            "conversation": self.history,
+            "conversation": self.history.transcript(),
             "evaluation": evaluation,
         }
-        try:
-            response = requests.post(f"{self.db_url}/log", json=interview, timeout=None)
-            response.raise_for_status()
-        except Exception as e:
-            self.logger.error(f"Error saving interview data: {e}")
-        self.logger.info(f"db response: {response}")
+        if skill_evaluation is not None:
+            interview["scores"] = skill_evaluation["scores"]
+            interview["overall_score"] = skill_evaluation["overall_score"]
+            interview["transcript_hash"] = skill_evaluation["transcript_hash"]
+        if self.write_buffer is not None:
+            await self.write_buffer.add(interview)
+        else:
+            response = await self.http_client.post_db(f"{self.db_url}/log", interview)
+            self.logger.info(f"db response: {response}")
         self.logger.info("Interview data saved.")
 
     def process_llm_response(self, response: str) -> str:
@@ -220,21 +615,144 @@ class InterviewChain:
             response = response.split(":\n\n")[1].strip()
         return response
 
-    def call_llm(self, prompt: str, system_prompt: str, stopwords: list) -> str:
+    async def call_llm(
+        self,
+        prompt: str,
+        system_prompt: str,
+        stopwords: list,
+        llm_context: Optional[list] = None,
+        priority: str = TURN,
+    ) -> str:
         """
         Call the external LLM API with the provided prompt.
 
+        The final response is kept in `last_llm_response`, or None if the call failed. The generation is sent through
+        `llm_router`, which retries it on other backends before giving up.
+
         Args:
             prompt (str): Prompt to send.
+            system_prompt (str): System prompt to send.
+            stopwords (list): Strings that end the response.
+            llm_context (Optional[list]): Ollama context to continue from.
+            priority (str): Scheduler class of the generation: `TURN`, `START` or `EVALUATION`.
 
         Returns:
             str: Processed response from the LLM.
+
+        Raises:
+            LLMError: If the generation failed, or was turned away by the scheduler (`LLMOverloadedError`).
+        """
+        self.last_llm_response = None
+        data = self.create_llm_payload(prompt, system_prompt, stopwords, stream=False, llm_context=llm_context)
+        log_payload(self.logger, "Calling LLM with payload", data, self.payload_log_sample_rate)
+        try:
+            with stage("llm", self.session_id):
+                response_data = await self.llm_router.generate(data, priority=priority)
+        except LLMError as e:
+            LLM_ERRORS.inc()
+            self.logger.error(f"Error calling LLM: {e}")
+            raise
+        self.last_llm_response = response_data
+        observe_llm_response(response_data)
+        log_payload(self.logger, "LLM response", response_data, self.payload_log_sample_rate)
+        with stage("postprocess", self.session_id):
+            processed = self.process_llm_response(response_data["response"])
+        return processed
+
+    async def stream_llm(
+        self,
+        prompt: str,
+        system_prompt: str,
+        stopwords: list,
+        llm_context: Optional[list] = None,
+        priority: str = TURN,
+    ) -> AsyncIterator[str]:
+        """
+        Call the external LLM API in streaming mode, trimming the response incrementally.
+
+        The final chunk is kept in `last_llm_response`. It is None if the call failed, and empty if the stream was
+        cut short at a stopword.
+
+        Args:
+            prompt (str): Prompt to send.
+            system_prompt (str): System prompt to send.
+            stopwords (list): Strings that end the response.
+            llm_context (Optional[list]): Ollama context to continue from.
+            priority (str): Scheduler class of the generation: `TURN` or `START`.
+
+        Yields:
+            str: Successive pieces of the processed response.
+
+        Raises:
+            LLMOverloadedError: If the scheduler turned the generation away; other failures end the stream early.
+        """
+        self.last_llm_response = None
+        data = self.create_llm_payload(prompt, system_prompt, stopwords, stream=True, llm_context=llm_context)
+        log_payload(self.logger, "Streaming from LLM with payload", data, self.payload_log_sample_rate)
+        processor = IncrementalResponseProcessor(stopwords)
+        chunks = self.llm_router.stream(data, priority=priority)
+        # The stream is spread over yields, so it is timed by hand rather than with `stage`.
+        span = start_span("llm_stream", self.session_id)
+        start = time.perf_counter()
+        first_piece = True
+        try:
+            async for chunk in chunks:
+                text = processor.feed(chunk.get("response", ""))
+                if text:
+                    if first_piece:
+                        STAGE_SECONDS.labels(stage="llm_first_piece").observe(time.perf_counter() - start)
+                        first_piece = False
+                    yield text
+                if chunk.get("done"):
+                    self.last_llm_response = chunk
+                    observe_llm_response(chunk)
+                    break
+                if processor.stopped:
+                    self.last_llm_response = {}
+                    break
+        except LLMOverloadedError:
+            raise
+        except LLMError as e:
+            LLM_ERRORS.inc()
+            self.logger.error(f"Error streaming from LLM: {e}")
+            return
+        finally:
+            await chunks.aclose()
+            STAGE_SECONDS.labels(stage="llm_stream").observe(time.perf_counter() - start)
+            if span is not None:
+                span.end()
+        text = processor.finish()
+        if text:
+            yield text
+
+    def create_llm_payload(
+        self,
+        prompt: str,
+        system_prompt: str,
+        stopwords: list,
+        stream: bool,
+        llm_context: Optional[list] = None,
+        response_format: Optional[str] = None,
+    ) -> dict:
+        """
+        Build the Ollama /api/generate request body.
+
+        Args:
+            prompt (str): Prompt to send.
+            system_prompt (str): System prompt to send; omitted when continuing from a context that already holds it.
+            stopwords (list): Strings that end the response.
+            stream (bool): Whether Ollama should stream the response as NDJSON.
+            llm_context (Optional[list]): Ollama context to continue from.
+            response_format (Optional[str]): Output format Ollama should constrain the response to, e.g. "json".
+
+        Returns:
+            dict: The request body.
         """
         data = {
             "model": self.config["ollama"]["model"],
-            "system": system_prompt,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": self.config["ollama"]["keep_alive"],
             "options": {
                 "temperature": self.config["ollama"]["temperature"],
                 "top_p": self.config["ollama"]["top_p"],
@@ -242,14 +760,12 @@ class InterviewChain:
                 "repeat_penalty": self.config["ollama"]["repeat_penalty"],
             },
         }
-        self.logger.info(f"Calling LLM with payload: {data}")
-        try:
-            response = requests.post(f"{self.llm_url}/api/generate", json=data)
-            response.raise_for_status()
-            response_data = response.json()
-        except requests.RequestException as e:
-            self.logger.error(f"Error calling LLM: {e}")
-            return "Error generating response from LLM."
-        self.logger.info(f"LLM response: {response_data}")
-        processed = self.process_llm_response(response_data["response"])
-        return processed
+        if llm_context is not None:
+            # The context already encodes the system prompt of the turn it started from. Once the context is reset,
+            # the next payload has no context and carries the system prompt again.
+            data["context"] = llm_context
+        else:
+            data["system"] = system_prompt
+        if response_format is not None:
+            data["format"] = response_format
+        return data
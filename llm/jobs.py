@@ -0,0 +1,273 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+    """
+    SQLite-backed record of evaluation jobs, so jobs that were queued or running survive a restart.
+
+    Methods are blocking and meant to run in worker threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the store and create its table if needed.
+
+        Args:
+            path (str): Path of the SQLite database file.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS evaluation_job (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT,
+                    status TEXT,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_job_status ON evaluation_job (status)")
+
+    def add(self, job_id: str, session_id: str, payload: dict) -> None:
+        """
+        Record a new pending job.
+
+        Args:
+            job_id (str): Job ID.
+            session_id (str): Session being evaluated.
+            payload (dict): JSON-serializable job input.
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO evaluation_job (id, session_id, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, session_id, PENDING, json.dumps(payload), now, now),
+            )
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        attempts: int,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Update the status of a job.
+
+        Args:
+            job_id (str): Job ID.
+            status (str): New status.
+            attempts (int): Number of attempts made so far.
+            result (Optional[str]): Job result, once done.
+            error (Optional[str]): Error of the last failed attempt.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE evaluation_job SET status=?, attempts=?, result=?, error=?, updated_at=? WHERE id=?",
+                (status, attempts, result, error, time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Fetch a job without its payload.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            Optional[dict]: The job, or None if it does not exist.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, session_id, status, result, error, attempts, created_at, updated_at "
+                "FROM evaluation_job WHERE id=?",
+                (job_id,),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def unfinished(self) -> list:
+        """
+        Fetch the jobs that were pending or running, oldest first.
+
+        Returns:
+            list: `(job_id, attempts, payload)` tuples.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, attempts, payload FROM evaluation_job WHERE status IN (?, ?) ORDER BY created_at",
+                (PENDING, RUNNING),
+            ).fetchall()
+        return [(row["id"], row["attempts"], json.loads(row["payload"])) for row in rows]
+
+    def prune(self, older_than_seconds: float) -> int:
+        """
+        Delete finished jobs that have not been updated for a while.
+
+        Args:
+            older_than_seconds (float): Minimum age of the deleted jobs.
+
+        Returns:
+            int: Number of deleted jobs.
+        """
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM evaluation_job WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - older_than_seconds),
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self.lock:
+            self.conn.close()
+
+
+class EvaluationJobQueue:
+    """
+    Runs interview evaluations in the background on a fixed pool of workers.
+
+    Jobs are persisted in a `JobStore` before they are queued. A job whose run raises is retried with a linear backoff
+    up to `max_attempts` times, then marked as failed. Jobs that were still pending or running when the service stopped
+    are queued again on start.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run: Callable[[dict], Awaitable[str]],
+        workers: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        retention_seconds: float,
+        on_update: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        """
+        Initialize the queue; call `start` from the event loop to start the workers.
+
+        Args:
+            store (JobStore): Store the jobs are persisted in.
+            run (Callable[[dict], Awaitable[str]]): Runs a job on its payload and returns its result.
+            workers (int): Number of jobs run concurrently.
+            max_attempts (int): Number of attempts before a job is marked as failed.
+            retry_backoff_seconds (float): Delay before the first retry; later retries wait proportionally longer.
+            retention_seconds (float): How long finished jobs are kept for status polling.
+            on_update (Optional[Callable[[dict], None]]): Called in a worker thread with the job, as returned by
+                `JobStore.get`, whenever it is added or its status changes; e.g. to share it with other replicas.
+        """
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff_seconds
+        self.retention_seconds = retention_seconds
+        self.on_update = on_update
+        self.logger = logging.getLogger(__name__)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def __len__(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the workers and queue the jobs left unfinished by a previous run."""
+        self._queue = asyncio.Queue()
+        pruned = await asyncio.to_thread(self.store.prune, self.retention_seconds)
+        unfinished = await asyncio.to_thread(self.store.unfinished)
+        for job in unfinished:
+            self._queue.put_nowait(job)
+        if pruned or unfinished:
+            self.logger.info(f"Pruned {pruned} finished evaluation jobs; resuming {len(unfinished)}.")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, session_id: str, payload: dict) -> str:
+        """
+        Persist and queue a new job.
+
+        Args:
+            session_id (str): Session being evaluated.
+            payload (dict): JSON-serializable input passed to `run`.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = str(uuid.uuid4())
+        await asyncio.to_thread(self._record, self.store.add, job_id, session_id, payload)
+        self._queue.put_nowait((job_id, 0, payload))
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            Optional[dict]: The job's status, result and error, or None if it does not exist.
+        """
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs that did not finish are resumed on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.close)
+
+    def _record(self, write: Callable, job_id: str, *args, **kwargs) -> None:
+        write(job_id, *args, **kwargs)
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(self.store.get(job_id))
+        except Exception as e:
+            self.logger.warning(f"Failed to publish the status of evaluation job {job_id}: {e}")
+
+    async def _work(self) -> None:
+        while True:
+            job_id, attempts, payload = await self._queue.get()
+            attempts += 1
+            await asyncio.to_thread(self._record, self.store.update, job_id, RUNNING, attempts)
+            try:
+                result = await self.run(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempts >= self.max_attempts:
+                    self.logger.error(f"Evaluation job {job_id} failed after {attempts} attempts: {e}")
+                    await asyncio.to_thread(self._record, self.store.update, job_id, FAILED, attempts, error=str(e))
+                else:
+                    delay = self.retry_backoff * attempts
+                    self.logger.warning(f"Evaluation job {job_id} failed; retrying in {delay}s: {e}")
+                    await asyncio.to_thread(self._record, self.store.update, job_id, PENDING, attempts, error=str(e))
+                    asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, (job_id, attempts, payload))
+                continue
+            await asyncio.to_thread(self._record, self.store.update, job_id, DONE, attempts, result=result)
+            self.logger.info(f"Evaluation job {job_id} done after {attempts} attempts.")
@@ -0,0 +1,134 @@
+import base64
+import logging
+import zlib
+from array import array
+from typing import Optional
+
+from llm.metrics import LLM_CONTEXT_TURNS, LLM_PREFILL_TOKENS_SAVED
+
+
+class SessionLLMContext:
+    """
+    Ollama KV context of one interview.
+
+    Ollama returns a `context` token array encoding the prompt and response of a generation. Sending it back with the
+    next request lets Ollama reuse the cached prefill for everything before it, so later turns only need to send the
+    messages added since. The context is dropped, and the next turn falls back to the full prompt, when it grows past
+    `max_tokens` or when the LLM rejects it.
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        """
+        Initialize an empty context.
+
+        Args:
+            max_tokens (int): Context length past which the context is dropped and rebuilt from the bounded history.
+        """
+        self.max_tokens = max_tokens
+        self.logger = logging.getLogger(__name__)
+        self.tokens: Optional[list] = None
+        # Number of history turns encoded in `tokens`.
+        self.covered_turns = 0
+        # Guidelines last sent to the LLM, so unchanged guidelines are not sent again.
+        self.guidelines: Optional[str] = None
+        # Prompt tokens per character Ollama counted on the last turn sent with the full prompt, to size the full
+        # prompt of turns that continue from the context.
+        self.tokens_per_char: Optional[float] = None
+        self.stats = {"turns": 0, "reused_turns": 0, "prompt_eval_tokens": 0, "prefill_tokens_saved": 0}
+
+    def usable(self) -> bool:
+        """Whether the next turn can continue from the cached context."""
+        return self.tokens is not None
+
+    def reset(self) -> None:
+        """Drop the cached context, so the next turn sends the full prompt."""
+        self.tokens = None
+        self.covered_turns = 0
+        self.guidelines = None
+
+    def update(self, response_data: Optional[dict], covered_turns: int, guidelines: str) -> None:
+        """
+        Keep the context returned by a generation, or drop it if it is missing or too long.
+
+        Args:
+            response_data (Optional[dict]): Final Ollama response, or None if the generation failed.
+            covered_turns (int): Number of history turns encoded in the returned context.
+            guidelines (str): Guidelines included in the context.
+        """
+        tokens = (response_data or {}).get("context")
+        if not tokens or len(tokens) > self.max_tokens:
+            self.reset()
+            return
+        self.tokens = tokens
+        self.covered_turns = covered_turns
+        self.guidelines = guidelines
+
+    def to_state(self) -> Optional[dict]:
+        """
+        Serialize the context compactly, e.g. to share it with other replicas through a session backend.
+
+        The tokens are packed as 32-bit integers and compressed, which is several times smaller than a JSON list.
+
+        Returns:
+            Optional[dict]: JSON-serializable state, or None if there is no usable context.
+        """
+        if self.tokens is None:
+            return None
+        packed = zlib.compress(array("i", self.tokens).tobytes())
+        return {
+            "tokens": base64.b64encode(packed).decode(),
+            "covered_turns": self.covered_turns,
+            "guidelines": self.guidelines,
+            "tokens_per_char": self.tokens_per_char,
+        }
+
+    def load_state(self, state: Optional[dict]) -> None:
+        """
+        Load a context serialized by `to_state`.
+
+        Args:
+            state (Optional[dict]): Serialized context, or None to drop the context.
+        """
+        if state is None:
+            self.reset()
+            return
+        tokens = array("i")
+        tokens.frombytes(zlib.decompress(base64.b64decode(state["tokens"])))
+        self.tokens = tokens.tolist()
+        self.covered_turns = state["covered_turns"]
+        self.guidelines = state["guidelines"]
+        self.tokens_per_char = state.get("tokens_per_char")
+
+    def record_turn(self, response_data: Optional[dict], full_prompt_chars: int, reused: bool) -> int:
+        """
+        Record prefill statistics for a turn, in the session's stats and the service-wide metrics.
+
+        Both sides of the saving are Ollama's `prompt_eval_count`: a turn sent with the full prompt measures its tokens
+        per character, and a turn continuing from the context is compared with its full prompt sized at that rate. No
+        saving is recorded until a full prompt has been measured.
+
+        Args:
+            response_data (Optional[dict]): Final Ollama response, or None if the generation failed.
+            full_prompt_chars (int): Length of the full prompt, system prompt included, i.e. without context reuse.
+            reused (bool): Whether the turn continued from the cached context.
+
+        Returns:
+            int: Prefill tokens saved by reusing the context.
+        """
+        prompt_eval_tokens = (response_data or {}).get("prompt_eval_count", 0)
+        saved = 0
+        if not reused and prompt_eval_tokens and full_prompt_chars:
+            self.tokens_per_char = prompt_eval_tokens / full_prompt_chars
+        elif reused and response_data and self.tokens_per_char is not None:
+            saved = max(0, round(full_prompt_chars * self.tokens_per_char) - prompt_eval_tokens)
+        self.stats["turns"] += 1
+        self.stats["reused_turns"] += int(reused)
+        self.stats["prompt_eval_tokens"] += prompt_eval_tokens
+        self.stats["prefill_tokens_saved"] += saved
+        LLM_CONTEXT_TURNS.labels(context="reused" if reused else "fresh").inc()
+        LLM_PREFILL_TOKENS_SAVED.inc(saved)
+        self.logger.info(
+            f"Turn prefill: {prompt_eval_tokens} tokens evaluated, {saved} saved by context reuse "
+            f"(session totals: {self.stats})."
+        )
+        return saved
@@ -0,0 +1,341 @@
+"""
+Routing of LLM generations over one or more Ollama instances.
+
+Each backend has its own cap on in-flight generations, a circuit breaker that stops sending it requests after
+consecutive failures, and a periodic health check. A failed generation is retried on another backend; an interactive
+generation still running after `hedge_after_seconds` is also sent to a second backend with a free slot, and the first
+answer wins. Identical non-streaming requests in flight at the same time share one generation.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+import httpx
+
+from llm.http_client import AsyncHTTPClient
+from llm.metrics import LLM_BACKEND_IN_FLIGHT, LLM_BACKEND_UP, LLM_ROUTER_EVENTS
+
+if TYPE_CHECKING:
+    from llm.scheduler import LLMScheduler
+
+
+class LLMError(Exception):
+    """Raised when a generation failed on every backend it was tried on."""
+
+
+def backend_urls(config: dict) -> list:
+    """
+    The Ollama base URLs to route generations to.
+
+    Args:
+        config (dict): Configuration with an `llm_backends` section.
+
+    Returns:
+        list: URLs from the comma-separated `OLLAMA_URLS` environment variable, else from `llm_backends.urls`, else
+            the single `OLLAMA_URL`.
+    """
+    urls = [url.strip() for url in os.getenv("OLLAMA_URLS", "").split(",") if url.strip()]
+    return urls or config["llm_backends"]["urls"] or [os.environ["OLLAMA_URL"]]
+
+
+class Backend:
+    """An Ollama instance: its in-flight generations, circuit breaker and health."""
+
+    def __init__(self, url: str, max_in_flight: int) -> None:
+        self.url = url.rstrip("/")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.healthy = True
+
+    def up(self, now: float) -> bool:
+        """Whether the backend passes its health checks and its circuit is not open."""
+        return self.healthy and now >= self.open_until
+
+    def available(self, now: float) -> bool:
+        """Whether a new generation can be sent to the backend now."""
+        if not self.up(now) or self.in_flight >= self.max_in_flight:
+            return False
+        # Half-open after a failure streak: let a single trial request through.
+        return self.failures == 0 or self.in_flight == 0
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, threshold: int, open_seconds: float) -> bool:
+        """Count a failure; returns whether it opened the circuit."""
+        self.failures += 1
+        if self.failures >= threshold:
+            self.open_until = time.monotonic() + open_seconds
+            return True
+        return False
+
+
+class LLMRouter:
+    """
+    Sends Ollama /api/generate requests to the least loaded, or the next, available backend.
+
+    Every generation first takes a slot from the scheduler, granted by priority class, then a slot on a backend.
+    """
+
+    def __init__(self, config: dict, http_client: AsyncHTTPClient, urls: list, scheduler: "LLMScheduler") -> None:
+        """
+        Initialize the router; call `start` from the event loop to run the health checks.
+
+        Args:
+            config (dict): Configuration with an `llm_backends` section holding the strategy, limits, retry, hedging,
+                circuit breaker and health check settings.
+            http_client (AsyncHTTPClient): Shared pooled HTTP client.
+            urls (list): Base URLs of the Ollama instances.
+            scheduler (LLMScheduler): Admission control and priority scheduling of the generations.
+        """
+        router_config = config["llm_backends"]
+        self.logger = logging.getLogger(__name__)
+        self.http_client = http_client
+        self.scheduler = scheduler
+        self.backends = [Backend(url, router_config["max_in_flight_per_backend"]) for url in urls]
+        self.strategy = router_config["strategy"]
+        self.request_timeout = router_config["request_timeout_seconds"]
+        self.max_attempts = router_config["max_attempts"]
+        self.hedge_after = router_config["hedge_after_seconds"]
+        self.failure_threshold = router_config["failure_threshold"]
+        self.open_seconds = router_config["open_seconds"]
+        self.health_check_interval = router_config["health_check_interval_seconds"]
+        self.health_check_timeout = router_config["health_check_timeout_seconds"]
+        self.coalesce = router_config["coalesce"]
+        self._next = 0
+        self._released: Optional[asyncio.Condition] = None
+        self._in_flight: dict = {}
+        self._health_task: Optional[asyncio.Task] = None
+        for backend in self.backends:
+            LLM_BACKEND_UP.labels(backend=backend.url).set_function(
+                lambda backend=backend: float(backend.up(time.monotonic()))
+            )
+            LLM_BACKEND_IN_FLIGHT.labels(backend=backend.url).set_function(lambda backend=backend: backend.in_flight)
+
+    @property
+    def released(self) -> asyncio.Condition:
+        """Condition notified whenever a backend slot is released or a backend recovers."""
+        if self._released is None:
+            self._released = asyncio.Condition()
+        return self._released
+
+    async def start(self) -> None:
+        """Start the periodic health checks."""
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._check_health())
+
+    async def stop(self) -> None:
+        """Stop the health checks."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    async def generate(self, payload: dict, priority: str = "turn") -> dict:
+        """
+        Run a non-streaming generation, retried on other backends if it fails.
+
+        Identical requests already in flight are not sent again; their result is shared.
+
+        Args:
+            payload (dict): Ollama /api/generate request body with `"stream": False`.
+            priority (str): Priority class of the generation (see `llm.scheduler`); evaluations are never hedged.
+
+        Returns:
+            dict: The decoded Ollama response.
+
+        Raises:
+            LLMError: If the generation failed on every attempt, or was turned away by the scheduler
+                (`LLMOverloadedError`).
+        """
+        if not self.coalesce:
+            return await self._generate(payload, priority, shared=False)
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(payload, priority, shared=True))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            # Mark a failure as retrieved even if every caller went away; the callers still get it.
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        else:
+            LLM_ROUTER_EVENTS.labels(event="coalesced").inc()
+        # Shielded, so one caller going away does not cancel the generation the others wait for.
+        return await asyncio.shield(task)
+
+    async def stream(self, payload: dict, priority: str = "turn") -> AsyncIterator[dict]:
+        """
+        Run a streaming generation and yield its NDJSON chunks.
+
+        A backend that fails before sending the first chunk is replaced by another one; a failure after that ends the
+        stream with an error, since the chunks already yielded cannot be taken back.
+
+        Args:
+            payload (dict): Ollama /api/generate request body with `"stream": True`.
+            priority (str): Priority class of the generation (see `llm.scheduler`).
+
+        Yields:
+            dict: Each decoded chunk of the response.
+
+        Raises:
+            LLMError: If the stream could not be started on any backend, or broke off, or was turned away by the
+                scheduler (`LLMOverloadedError`).
+        """
+        errors = []
+        tried = set()
+        async with self.scheduler.slot(priority):
+            for _ in range(self.max_attempts):
+                backend = await self._acquire(tried)
+                started = False
+                try:
+                    async with self.http_client.client.stream(
+                        "POST", f"{backend.url}/api/generate", json=payload
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if line:
+                                chunk = json.loads(line)
+                                started = True
+                                yield chunk
+                    backend.record_success()
+                    return
+                except (httpx.HTTPError, json.JSONDecodeError) as e:
+                    # A malformed chunk means a broken stream, like a dropped connection.
+                    self._record_failure(backend, e)
+                    if started:
+                        raise LLMError(f"LLM stream from {backend.url} broke off: {e}") from e
+                    errors.append(f"{backend.url}: {e!r}")
+                    LLM_ROUTER_EVENTS.labels(event="retry").inc()
+                finally:
+                    await self._release(backend)
+        raise LLMError(f"LLM stream failed after {len(errors)} attempts: {'; '.join(errors)}")
+
+    async def _generate(self, payload: dict, priority: str, shared: bool) -> dict:
+        errors = []
+        tried = set()
+        # A shared generation is not dropped when the request that started it goes away; others may be waiting for it.
+        async with self.scheduler.slot(priority, detached=shared):
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    LLM_ROUTER_EVENTS.labels(event="retry").inc()
+                try:
+                    return await self._attempt(payload, tried, hedge=priority != "evaluation")
+                except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                    errors.append(repr(e))
+        raise LLMError(f"LLM generation failed after {len(errors)} attempts: {'; '.join(errors)}")
+
+    async def _attempt(self, payload: dict, tried: set, hedge: bool) -> dict:
+        """Send a generation to one backend and, if it is slow, to a second one; return the first success."""
+        backend = await self._acquire(tried)
+        pending = {self._post(backend, payload)}
+        if hedge and self.hedge_after > 0:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                second = self._try_acquire(tried)
+                if second is not None:
+                    LLM_ROUTER_EVENTS.labels(event="hedged").inc()
+                    pending.add(self._post(second, payload))
+            pending |= done
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _post(self, backend: Backend, payload: dict) -> asyncio.Task:
+        """Post a generation to a backend whose slot is held; the slot is released when the task ends."""
+
+        async def post() -> dict:
+            try:
+                response = await asyncio.wait_for(
+                    self.http_client.client.post(f"{backend.url}/api/generate", json=payload), self.request_timeout
+                )
+                response.raise_for_status()
+            except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                self._record_failure(backend, e)
+                raise
+            backend.record_success()
+            return response.json()
+
+        task = asyncio.create_task(post())
+        # A done callback rather than `finally`, so the slot is also released if the task is cancelled before it runs.
+        task.add_done_callback(lambda _: asyncio.create_task(self._release(backend)))
+        return task
+
+    def _record_failure(self, backend: Backend, error: Exception) -> None:
+        self.logger.warning(f"LLM backend {backend.url} failed: {error!r}")
+        if backend.record_failure(self.failure_threshold, self.open_seconds):
+            LLM_ROUTER_EVENTS.labels(event="circuit_opened").inc()
+            self.logger.error(f"Opened the circuit of LLM backend {backend.url} for {self.open_seconds}s.")
+
+    def _try_acquire(self, tried: set) -> Optional[Backend]:
+        """Take a slot on an available backend, preferring ones not tried yet, or return None."""
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend.available(now)]
+        untried = [backend for backend in candidates if backend.url not in tried]
+        candidates = untried or candidates
+        if not candidates:
+            return None
+        if self.strategy == "round_robin":
+            backend = candidates[self._next % len(candidates)]
+            self._next += 1
+        else:
+            backend = min(candidates, key=lambda backend: backend.in_flight / backend.max_in_flight)
+        backend.in_flight += 1
+        tried.add(backend.url)
+        return backend
+
+    async def _acquire(self, tried: set) -> Backend:
+        """Take a slot on a backend, waiting while every backend that is up is at its cap."""
+        async with self.released:
+            while True:
+                backend = self._try_acquire(tried)
+                if backend is not None:
+                    return backend
+                now = time.monotonic()
+                up = [backend for backend in self.backends if backend.up(now)]
+                if not up:
+                    raise LLMError("No LLM backend is available.")
+                # Wake up when a slot is released, or when a half-open backend's trial may have ended.
+                try:
+                    await asyncio.wait_for(self.released.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, backend: Backend) -> None:
+        backend.in_flight -= 1
+        async with self.released:
+            self.released.notify_all()
+
+    async def _check_health(self) -> None:
+        while True:
+            for backend in self.backends:
+                try:
+                    response = await self.http_client.client.get(
+                        f"{backend.url}/api/tags", timeout=self.health_check_timeout
+                    )
+                    healthy = response.status_code == 200
+                except httpx.HTTPError:
+                    healthy = False
+                if healthy != backend.healthy:
+                    self.logger.info(f"LLM backend {backend.url} is {'healthy' if healthy else 'unhealthy'}.")
+                    backend.healthy = healthy
+                    if healthy:
+                        async with self.released:
+                            self.released.notify_all()
+            await asyncio.sleep(self.health_check_interval)
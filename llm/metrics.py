@@ -0,0 +1,184 @@
+"""
+Instrumentation for the llm service: Prometheus metrics, optional OpenTelemetry spans and sampled payload logging.
+
+Stages of the interview hot path are timed with `stage`, which records the `interview_stage_seconds` histogram and,
+when the `opentelemetry-api` package is installed, opens a span carrying the session ID. Spans are only exported if an
+OpenTelemetry SDK is configured, e.g. by running the service under `opentelemetry-instrument`.
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+try:
+    from opentelemetry import trace
+except ImportError:  # OpenTelemetry is optional.
+    trace = None
+
+tracer = trace.get_tracer("llm") if trace is not None else None
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, per route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "interview_stage_seconds", "Time spent in each stage of the interview hot path.", ["stage"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens processed by Ollama.", ["kind"])
+LLM_PHASE_SECONDS = Histogram(
+    "llm_phase_seconds",
+    "Ollama's own timings of a generation: model load, prompt evaluation, generation and total.",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM calls.")
+LLM_CONTEXT_TURNS = Counter(
+    "llm_context_turns_total", "Question turns, by whether they continued from the cached Ollama context.", ["context"]
+)
+LLM_PREFILL_TOKENS_SAVED = Counter(
+    "llm_prefill_tokens_saved_total",
+    "Prompt tokens Ollama did not evaluate thanks to context reuse, against the full prompt at the session's measured "
+    "tokens per character.",
+)
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "LLM requests holding a slot, per priority class.", ["kind"])
+LLM_QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM requests waiting for a slot, per priority class.", ["priority"])
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time an LLM request waited for a slot.", ["priority"], buckets=LATENCY_BUCKETS
+)
+LLM_ADMISSION_REJECTED = Counter(
+    "llm_admission_rejected_total",
+    "LLM requests turned away because their queue was full, or dropped after a timeout or a client disconnect.",
+    ["priority", "reason"],
+)
+LLM_BACKEND_IN_FLIGHT = Gauge(
+    "llm_backend_requests_in_flight", "Generations in flight per Ollama backend.", ["backend"]
+)
+LLM_BACKEND_UP = Gauge(
+    "llm_backend_up", "Whether an Ollama backend passes its health checks and its circuit is closed.", ["backend"]
+)
+LLM_ROUTER_EVENTS = Counter(
+    "llm_router_events_total", "Retried, hedged and coalesced generations, and opened circuits.", ["event"]
+)
+OPENING_QUESTIONS = Counter("opening_question_cache_total", "Opening question cache lookups.", ["result"])
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Texts per embedding model call in the embedding service.",
+    ["kind"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+ACTIVE_SESSIONS = Gauge("interview_sessions", "Interview sessions held in memory.")
+QUEUED_EVALUATIONS = Gauge("evaluation_jobs_queued", "Evaluation jobs waiting for a worker.")
+
+# Ollama reports durations in nanoseconds.
+OLLAMA_DURATIONS = {
+    "load": "load_duration",
+    "prompt_eval": "prompt_eval_duration",
+    "eval": "eval_duration",
+    "total": "total_duration",
+}
+
+
+@contextmanager
+def stage(name: str, session_id: Optional[str] = None) -> Iterator[None]:
+    """
+    Time a stage of the hot path, inside a span when OpenTelemetry is available.
+
+    Args:
+        name (str): Stage name, used as the metric label and the span name.
+        session_id (Optional[str]): Interview session ID, set as the span's `session.id` attribute.
+    """
+    span = (
+        tracer.start_as_current_span(name, attributes={"session.id": str(session_id)})
+        if tracer is not None
+        else nullcontext()
+    )
+    start = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.labels(stage=name).observe(time.perf_counter() - start)
+
+
+def start_span(name: str, session_id: Optional[str] = None):
+    """
+    Start a span that is not made current, for work spread over an async generator, or None without OpenTelemetry.
+
+    Args:
+        name (str): Span name.
+        session_id (Optional[str]): Interview session ID, set as the span's `session.id` attribute.
+
+    Returns:
+        The started span, to be ended by the caller, or None.
+    """
+    if tracer is None:
+        return None
+    return tracer.start_span(name, attributes={"session.id": str(session_id)})
+
+
+def observe_llm_response(response_data: dict) -> None:
+    """
+    Record the token counts and timings Ollama reports in a final response.
+
+    Args:
+        response_data (dict): Final /api/generate response, or the `done` chunk of a stream.
+    """
+    LLM_TOKENS.labels(kind="prompt_eval").inc(response_data.get("prompt_eval_count", 0))
+    LLM_TOKENS.labels(kind="eval").inc(response_data.get("eval_count", 0))
+    for phase, field in OLLAMA_DURATIONS.items():
+        if field in response_data:
+            LLM_PHASE_SECONDS.labels(phase=phase).observe(response_data[field] / 1e9)
+
+
+def log_payload(logger: logging.Logger, message: str, payload: dict, sample_rate: float) -> None:
+    """
+    Log an LLM payload at DEBUG level for a random sample of calls.
+
+    Payloads hold the prompt and history, so they are only formatted when DEBUG is enabled and the call is sampled.
+
+    Args:
+        logger (logging.Logger): Logger to write to.
+        message (str): Message logged before the payload.
+        payload (dict): Request or response body.
+        sample_rate (float): Fraction of calls that are logged.
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < sample_rate:
+        logger.debug(f"{message}: {payload}")
+
+
+def instrument(app: FastAPI) -> None:
+    """
+    Time every request of an app and serve the metrics at /metrics.
+
+    Args:
+        app (FastAPI): The app to instrument.
+    """
+
+    @app.middleware("http")
+    async def time_request(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            method=request.method, route=route.path if route is not None else "unmatched", status=response.status_code
+        ).observe(time.perf_counter() - start)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
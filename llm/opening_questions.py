@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from llm.cache import LRUCache
+from llm.metrics import OPENING_QUESTIONS
+
+# Stands for the candidate's name while an opening question is generated, and is replaced by it when served.
+NAME_PLACEHOLDER = "[candidate name]"
+
+
+def normalize_role(role: str) -> str:
+    """
+    Normalize a role so trivially different spellings share an opening question.
+
+    Args:
+        role (str): Role as entered by the candidate.
+
+    Returns:
+        str: The lowercased role, with whitespace collapsed and surrounding punctuation removed.
+    """
+    return " ".join(role.lower().split()).strip(" .,;:!?")
+
+
+class OpeningQuestionCache:
+    """
+    Opening interview questions, generated once per role and served to every candidate applying for it.
+
+    The first question only depends on the role: it is generated with `NAME_PLACEHOLDER` as the candidate's name, and
+    the name is filled in when the question is served. Entries are keyed by the normalized role, the model and
+    `prompt_version`, expire after `ttl_seconds`, and the least recently used are evicted beyond `max_entries`.
+    Concurrent misses for the same role share one generation.
+    """
+
+    def __init__(self, config: dict) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+            config (dict): Configuration with an `opening_questions` section holding the cache limits, prompt version
+                and roles to prewarm.
+        """
+        cache_config = config["opening_questions"]
+        self.logger = logging.getLogger(__name__)
+        self.enabled = cache_config["enabled"]
+        self.model = config["ollama"]["model"]
+        self.prompt_version = cache_config["prompt_version"]
+        self.prewarm_roles = cache_config["prewarm_roles"]
+        self.cache = LRUCache(
+            max_size=cache_config["max_entries"], sizeof=lambda _: 1, ttl_seconds=cache_config["ttl_seconds"]
+        )
+        self._in_flight: dict = {}
+
+    def key(self, role: str) -> tuple:
+        return normalize_role(role), self.model, self.prompt_version
+
+    async def get(self, role: str, generate: Callable[[str], Awaitable[str]]) -> str:
+        """
+        Get the opening question template for a role, generating it on a miss.
+
+        Args:
+            role (str): Role as entered by the candidate.
+            generate (Callable[[str], Awaitable[str]]): Generates the question for a normalized role, with
+                `NAME_PLACEHOLDER` as the candidate's name.
+
+        Returns:
+            str: The question, still holding `NAME_PLACEHOLDER`; see `render`.
+
+        Raises:
+            LLMError: If the question had to be generated and the generation failed.
+        """
+        key = self.key(role)
+        template = self.cache.get(key)
+        if template is not None:
+            OPENING_QUESTIONS.labels(result="hit").inc()
+            return template
+        OPENING_QUESTIONS.labels(result="miss").inc()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(generate(key[0]))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        template = await asyncio.shield(task)
+        if template.strip():
+            self.cache.put(key, template)
+        return template
+
+    @staticmethod
+    def render(template: str, name: str) -> str:
+        """
+        Fill the candidate's name into an opening question template.
+
+        Args:
+            template (str): Question returned by `get`.
+            name (str): Candidate's name.
+
+        Returns:
+            str: The question for this candidate.
+        """
+        return template.replace(NAME_PLACEHOLDER, name)
+
+    async def prewarm(self, generate: Callable[[str], Awaitable[str]]) -> None:
+        """
+        Generate the opening questions of the configured common roles, one after the other.
+
+        Args:
+            generate (Callable[[str], Awaitable[str]]): Generates the question for a normalized role, as for `get`.
+        """
+        for role in self.prewarm_roles:
+            try:
+                await self.get(role, generate)
+            except Exception as e:
+                self.logger.warning(f"Could not prewarm the opening question for {role!r}: {e}")
+        self.logger.info(f"Prewarmed opening questions for {len(self.prewarm_roles)} roles.")
@@ -10,3 +10,17 @@ interview_user_prompt = """Guidelines on how to conduct the interview:
 
 Conversation History:
 {history}Interviewer:"""
+
+interview_continuation_prompt = """{history}Interviewer:"""
+
+interview_continuation_guidelines_prompt = """Updated guidelines on how to conduct the interview:
+{context}
+
+{history}Interviewer:"""
+
+skill_evaluation_system_prompt = """You are an expert in human resources and talent evaluation. Given a transcript of a job interview between a candidate and an AI interviewer, you rate one of the candidate's soft skills on a scale from 1 (poor) to 5 (excellent). Answer only with a JSON object of the form {"score": <integer from 1 to 5>, "justification": "<one or two sentences>"}."""
+
+skill_evaluation_user_prompt = """Skill to rate: {skill}
+
+Conversation History:
+{history}"""
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
+
+from llm.cache import LRUCache
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+MB = 1024 * 1024
+
+
+class EmbeddingBatcher:
+    """
+    Groups query embeddings requested concurrently from several threads into one batched model call.
+
+    The first caller to arrive becomes the leader: it waits up to `max_wait_ms` for other queries, embeds up to
+    `max_batch_size` of them with a single `embed_documents` call, and hands every caller its own vector.
+    """
+
+    def __init__(self, embed_documents: Callable[[list], list], max_batch_size: int, max_wait_ms: float) -> None:
+        """
+        Initialize the batcher.
+
+        Args:
+            embed_documents (Callable[[list], list]): Embeds a list of texts into a list of vectors.
+            max_batch_size (int): Maximum number of texts per model call.
+            max_wait_ms (float): Time the leader waits for more queries before embedding a partial batch.
+        """
+        self.embed_documents = embed_documents
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._leader_active = False
+        self._lock = threading.Lock()
+        self._batch_ready = threading.Condition(self._lock)
+
+    def embed(self, text: str) -> list:
+        """
+        Embed a query, batched with any concurrent queries.
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            list: The query embedding.
+        """
+        future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            lead = not self._leader_active
+            self._leader_active = True
+            if len(self._pending) >= self.max_batch_size:
+                self._batch_ready.notify()
+        if lead:
+            self._lead()
+        return future.result()
+
+    def _lead(self) -> None:
+        with self._lock:
+            self._batch_ready.wait_for(lambda: len(self._pending) >= self.max_batch_size, timeout=self.max_wait)
+        while True:
+            with self._lock:
+                batch = self._pending[: self.max_batch_size]
+                self._pending = self._pending[self.max_batch_size :]
+                if not batch:
+                    self._leader_active = False
+                    return
+            try:
+                vectors = self.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+class Retriever:
+    """
+    Cached similarity search over the shared vectorstore.
+
+    Query embeddings and search results are kept in size-bounded LRU caches, and concurrent query embeddings are
+    batched. In `exact` mode, the chunk embeddings are precomputed as a NumPy matrix and the top-k chunks are found with
+    a single matrix product, which is faster than going through LangChain and FAISS for small corpora.
+
+    The vectorstore can be replaced while searches run (see `swap`); each search uses either the old or the new one.
+    """
+
+    def __init__(self, vectorstore: "FAISS", config: dict) -> None:
+        """
+        Initialize the retriever.
+
+        Args:
+            vectorstore (FAISS): Vectorstore holding the document chunks and the embedding model.
+            config (dict): Configuration with a `retrieval` section holding the mode, cache sizes and batching settings.
+        """
+        retrieval_config = config["retrieval"]
+        self.logger = logging.getLogger(__name__)
+        self.vectorstore = vectorstore
+        self.mode = retrieval_config["mode"]
+        # Bumped on every swap, so results computed over a replaced vectorstore are never cached as current ones.
+        self.generation = 0
+        self.embedding_cache = LRUCache(
+            max_size=int(retrieval_config["embedding_cache_mb"] * MB), sizeof=lambda vector: 8 * len(vector) + 64
+        )
+        self.result_cache = LRUCache(
+            max_size=int(retrieval_config["result_cache_mb"] * MB),
+            sizeof=lambda docs: sum(len(doc.page_content) for doc in docs) + 64,
+        )
+        embeddings = vectorstore.embeddings
+        self.batcher = EmbeddingBatcher(
+            # An embedding service client sends query batches to its query workers rather than its bulk ones.
+            getattr(embeddings, "embed_queries", embeddings.embed_documents),
+            max_batch_size=retrieval_config["batch_size"],
+            max_wait_ms=retrieval_config["batch_wait_ms"],
+        )
+        if self.mode == "exact":
+            self.exact = self.load_matrix(vectorstore)
+
+    def load_matrix(self, vectorstore: "FAISS") -> tuple:
+        """Precompute the chunk embedding matrix, its squared norms and the chunks in index order."""
+        start = time.perf_counter()
+        index = vectorstore.index
+        matrix = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+        squared_norms = np.einsum("ij,ij->i", matrix, matrix)
+        docs = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[position]) for position in range(index.ntotal)
+        ]
+        self.logger.info(f"Loaded {index.ntotal} chunk embeddings in {time.perf_counter() - start:.3f}s.")
+        return matrix, squared_norms, docs
+
+    def swap(self, vectorstore: "FAISS") -> None:
+        """
+        Replace the vectorstore, e.g. with an updated copy, and drop the results cached over the previous one.
+
+        Args:
+            vectorstore (FAISS): New vectorstore, using the same embedding model.
+        """
+        exact = self.load_matrix(vectorstore) if self.mode == "exact" else None
+        # Single assignments, so a concurrent search sees either the old or the new index, never a mix.
+        self.vectorstore = vectorstore
+        self.exact = exact
+        self.generation += 1
+        self.clear_cache()
+
+    def embed_query(self, query: str) -> list:
+        """
+        Embed a query, using the cache when possible.
+
+        Args:
+            query (str): Query text.
+
+        Returns:
+            list: The query embedding.
+        """
+        vector = self.embedding_cache.get(query)
+        if vector is None:
+            vector = self.batcher.embed(query)
+            self.embedding_cache.put(query, vector)
+        return vector
+
+    def search(self, query: str, k: int) -> list:
+        """
+        Find the chunks most similar to a query.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of chunks to return.
+
+        Returns:
+            list: The `k` closest documents, closest first.
+        """
+        query = " ".join(query.split())
+        key = (query, k, self.generation)
+        docs = self.result_cache.get(key)
+        if docs is not None:
+            return docs
+
+        vector = self.embed_query(query)
+        if self.mode == "exact":
+            docs = self.exact_search(vector, k)
+        else:
+            docs = self.vectorstore.similarity_search_by_vector(vector, k=k)
+        self.result_cache.put(key, docs)
+        return docs
+
+    def exact_search(self, vector: list, k: int) -> list:
+        """
+        Exact L2 top-k over the precomputed embedding matrix.
+
+        Minimizing ||q - x||^2 is the same as maximizing 2 q.x - ||x||^2, so one matrix-vector product ranks every chunk.
+
+        Args:
+            vector (list): Query embedding.
+            k (int): Number of chunks to return.
+
+        Returns:
+            list: The `k` closest documents, closest first.
+        """
+        matrix, squared_norms, docs = self.exact
+        k = min(k, len(docs))
+        if k == 0:
+            return []
+        scores = 2 * (matrix @ np.asarray(vector, dtype=np.float32)) - squared_norms
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [docs[position] for position in top]
+
+    def clear_cache(self) -> None:
+        """Drop all cached results, e.g. after the corpus changed."""
+        self.result_cache.clear()
@@ -0,0 +1,223 @@
+"""
+Admission control and priority scheduling of the LLM generations.
+
+Every generation takes one of `max_concurrent` slots before it is sent to a backend. When they are all taken,
+generations wait in one queue per priority class, and a released slot goes to the oldest waiter of the highest class:
+mid-interview turns, then interview starts, then evaluations, which also never hold more than
+`max_concurrent_evaluations` slots. A generation is turned away at once when its queue is full, and dropped when it has
+waited longer than its class allows, longer than its client is willing to wait, or its client has gone away, so the
+slots are spent on answers someone will read.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from llm.llm_router import LLMError
+from llm.metrics import (
+    LLM_ADMISSION_REJECTED,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_DEPTH,
+    LLM_QUEUE_WAIT_SECONDS,
+)
+
+TURN = "turn"
+START = "start"
+EVALUATION = "evaluation"
+# Highest priority first.
+PRIORITIES = (TURN, START, EVALUATION)
+
+
+class LLMOverloadedError(LLMError):
+    """Raised when a generation is turned away or dropped by admission control; it can be retried later."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int, queue_depth: int) -> None:
+        """
+        Args:
+            message (str): Why the generation was not run.
+            status_code (int): 429 if the queue was full, 503 if the generation was dropped from the queue.
+            retry_after (int): Estimated seconds until a slot is free.
+            queue_depth (int): Generations waiting ahead of a new one of the same class.
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+    @property
+    def headers(self) -> dict:
+        """Response headers telling the client when to retry."""
+        return {"Retry-After": str(self.retry_after), "X-Queue-Depth": str(self.queue_depth)}
+
+
+class Admission:
+    """The deadline and connection of the request generations are made for, set with `admit`."""
+
+    def __init__(self, deadline: Optional[float], is_disconnected: Optional[Callable[[], Awaitable[bool]]]) -> None:
+        """
+        Args:
+            deadline (Optional[float]): `time.monotonic()` time after which the client no longer waits for an answer.
+            is_disconnected (Optional[Callable[[], Awaitable[bool]]]): Whether the client has gone away, e.g.
+                `starlette.requests.Request.is_disconnected`.
+        """
+        self.deadline = deadline
+        self.is_disconnected = is_disconnected
+
+    async def disconnected(self) -> bool:
+        return self.is_disconnected is not None and await self.is_disconnected()
+
+
+current_admission: ContextVar[Optional[Admission]] = ContextVar("current_admission", default=None)
+
+
+def admit(timeout_seconds: Optional[float], is_disconnected: Optional[Callable[[], Awaitable[bool]]]) -> None:
+    """
+    Attach the calling request's deadline and connection to the generations made for it from now on.
+
+    Args:
+        timeout_seconds (Optional[float]): How long the client waits for the answer; None if it did not say.
+        is_disconnected (Optional[Callable[[], Awaitable[bool]]]): Whether the client has gone away.
+    """
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+    current_admission.set(Admission(deadline, is_disconnected))
+
+
+class LLMScheduler:
+    """Grants the generation slots by priority class. Not thread-safe: use it from the event loop only."""
+
+    def __init__(self, config: dict) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            config (dict): Configuration with a `scheduler` section holding the slot count, the evaluations' share, and
+                the queue length, maximum wait per class and disconnect check interval.
+        """
+        scheduler_config = config["scheduler"]
+        self.max_concurrent = scheduler_config["max_concurrent"]
+        self.max_running = {EVALUATION: scheduler_config["max_concurrent_evaluations"]}
+        self.max_queued = scheduler_config["max_queued"]
+        self.max_wait = scheduler_config["max_wait_seconds"]
+        self.disconnect_check = scheduler_config["disconnect_check_seconds"]
+        self.running = {priority: 0 for priority in PRIORITIES}
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        # Moving average of how long a generation holds its slot, to estimate when the queue will have moved.
+        self._hold_seconds = 1.0
+        for priority in PRIORITIES:
+            LLM_QUEUE_DEPTH.labels(priority=priority).set_function(
+                lambda priority=priority: len(self._queues[priority])
+            )
+            LLM_IN_FLIGHT.labels(kind=priority).set_function(lambda priority=priority: self.running[priority])
+
+    @asynccontextmanager
+    async def slot(self, priority: str, detached: bool = False) -> AsyncIterator[None]:
+        """
+        Hold a generation slot, waiting for one in the priority class's queue if needed.
+
+        Args:
+            priority (str): `TURN`, `START` or `EVALUATION`.
+            detached (bool): Ignore the deadline and connection of the calling request, e.g. for a generation shared
+                by several requests.
+
+        Raises:
+            LLMOverloadedError: If the queue is full, or the generation was dropped from it.
+        """
+        await self.acquire(priority, detached)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_seconds += 0.1 * (time.monotonic() - start - self._hold_seconds)
+            self.release(priority)
+
+    def queue_depth(self, priority: str) -> int:
+        """The number of generations a new one of the given class would wait behind."""
+        rank = PRIORITIES.index(priority)
+        return sum(len(self._queues[other]) for other in PRIORITIES[: rank + 1])
+
+    def retry_after(self, priority: str) -> int:
+        """Estimated seconds until a new generation of the given class would get a slot."""
+        return max(math.ceil((self.queue_depth(priority) + 1) * self._hold_seconds / self.max_concurrent), 1)
+
+    def check(self, priority: str) -> None:
+        """
+        Turn a request away before it starts if its generation would be rejected, e.g. before a response is streamed.
+
+        Args:
+            priority (str): Class of the generation the request will make.
+
+        Raises:
+            LLMOverloadedError: If the class's queue is full.
+        """
+        if len(self._queues[priority]) >= self.max_queued[priority]:
+            self._reject(priority, "queue_full", 429, f"Too many {priority} requests are waiting for the LLM.")
+
+    async def acquire(self, priority: str, detached: bool = False) -> None:
+        """
+        Take a slot, or wait in the class's queue until one is granted.
+
+        Args:
+            priority (str): `TURN`, `START` or `EVALUATION`.
+            detached (bool): Ignore the deadline and connection of the calling request.
+
+        Raises:
+            LLMOverloadedError: If the queue is full, or the generation was dropped from it.
+        """
+        arrived = time.monotonic()
+        if self._can_run(priority) and not self.queue_depth(priority):
+            self.running[priority] += 1
+            LLM_QUEUE_WAIT_SECONDS.labels(priority=priority).observe(0)
+            return
+        self.check(priority)
+        admission = None if detached else current_admission.get()
+        deadlines = [arrived + self.max_wait[priority]] if self.max_wait[priority] else []
+        if admission is not None and admission.deadline is not None:
+            deadlines.append(admission.deadline)
+        deadline = min(deadlines, default=None)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        try:
+            while not waiter.done():
+                timeout = self.disconnect_check if admission is not None else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(priority, "timeout", 503, "Timed out waiting for the LLM.")
+                    timeout = min(timeout, remaining) if timeout is not None else remaining
+                await asyncio.wait({waiter}, timeout=timeout)
+                if not waiter.done() and admission is not None and await admission.disconnected():
+                    self._reject(priority, "disconnected", 503, "The client went away while waiting for the LLM.")
+            # The client may have left while the slot was being granted.
+            if admission is not None and await admission.disconnected():
+                self._reject(priority, "disconnected", 503, "The client went away while waiting for the LLM.")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority)
+            else:
+                waiter.cancel()
+                self._queues[priority].remove(waiter)
+            raise
+        LLM_QUEUE_WAIT_SECONDS.labels(priority=priority).observe(time.monotonic() - arrived)
+
+    def release(self, priority: str) -> None:
+        """Give back a slot, and grant the free slots to the waiters of the highest classes."""
+        self.running[priority] -= 1
+        for waiting in PRIORITIES:
+            queue = self._queues[waiting]
+            while queue and self._can_run(waiting):
+                self.running[waiting] += 1
+                queue.popleft().set_result(None)
+
+    def _can_run(self, priority: str) -> bool:
+        if sum(self.running.values()) >= self.max_concurrent:
+            return False
+        return self.running[priority] < self.max_running.get(priority, self.max_concurrent)
+
+    def _reject(self, priority: str, reason: str, status_code: int, message: str) -> None:
+        LLM_ADMISSION_REJECTED.labels(priority=priority, reason=reason).inc()
+        raise LLMOverloadedError(message, status_code, self.retry_after(priority), self.queue_depth(priority))
@@ -0,0 +1,327 @@
+"""
+Session state storage shared by the replicas and workers of the llm service.
+
+A session is stored as a small `meta` record (candidate info, question count, number of turns, LLM context) and an
+append-only list of turns. Each turn only appends the new turns and replaces the meta record, instead of rewriting the
+whole transcript, and a replica that already holds a session only fetches the turns it has not seen.
+
+Backends:
+    memory: In-process; the registry's cache is the only copy, and sessions are not shared between workers or replicas.
+    sqlite: A SQLite file; shared by the workers of one host, or by pods mounting the same volume on one node.
+    redis: Any Redis-protocol server; shared by every replica.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+try:
+    import redis
+except ImportError:  # Only needed for the redis backend.
+    redis = None
+
+
+def encode(value) -> str:
+    """Compact JSON encoding used for the meta record and the turns."""
+    return json.dumps(value, separators=(",", ":"))
+
+
+class SessionBackend(ABC):
+    """Stores session state. Methods are blocking and meant to run in worker threads."""
+
+    # Whether sessions only live in the registry's cache of this process, so there is nothing to load from the backend.
+    in_process = False
+
+    @abstractmethod
+    def create(self, session_id: str, meta: dict) -> None:
+        """
+        Store a new session without turns.
+
+        Args:
+            session_id (str): Session ID.
+            meta (dict): Session meta record, with `turns` set to 0.
+        """
+
+    @abstractmethod
+    def append(self, session_id: str, turns: list, meta: dict) -> None:
+        """
+        Append turns to a session and replace its meta record, atomically.
+
+        Args:
+            session_id (str): Session ID.
+            turns (list): New `(role, text)` turns, possibly empty.
+            meta (dict): Session meta record, whose `turns` is the total number of turns after the append.
+        """
+
+    @abstractmethod
+    def load(self, session_id: str, since: int = 0) -> Optional[tuple]:
+        """
+        Load a session.
+
+        Args:
+            session_id (str): Session ID.
+            since (int): Number of turns the caller already holds; only later turns are returned.
+
+        Returns:
+            Optional[tuple]: The meta record and the turns after `since`, or None if the session does not exist or
+                has expired.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """
+        Delete a session.
+
+        Args:
+            session_id (str): Session ID.
+        """
+
+    def put_job(self, job: dict) -> None:
+        """
+        Share the status of an evaluation job, so any replica can answer polls for it.
+
+        Jobs are stored as records without turns under a `job:` prefix, so every backend supports them; they expire
+        like sessions.
+
+        Args:
+            job (dict): The job, as returned by `JobStore.get`.
+        """
+        self.create(f"job:{job['id']}", {"turns": 0, "job": job})
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        Look up an evaluation job shared with `put_job`.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            Optional[dict]: The job, or None if it is unknown or has expired.
+        """
+        state = self.load(f"job:{job_id}")
+        return state[0]["job"] if state is not None else None
+
+    def close(self) -> None:
+        """Release the backend's connections."""
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    In-process backend that stores nothing: the session registry's cache is the only copy of the sessions.
+
+    Sessions are not shared between workers or replicas, and end when the registry drops them from its cache, so
+    `sessions.max_sessions` and `sessions.max_memory_mb` bound all the memory they hold.
+    """
+
+    in_process = True
+
+    def create(self, session_id: str, meta: dict) -> None:
+        pass
+
+    def append(self, session_id: str, turns: list, meta: dict) -> None:
+        pass
+
+    def load(self, session_id: str, since: int = 0) -> Optional[tuple]:
+        return None
+
+    def delete(self, session_id: str) -> None:
+        pass
+
+    def put_job(self, job: dict) -> None:
+        # Jobs are only polled from this process, whose job store already has them.
+        pass
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        return None
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite-backed sessions: one row per session and one row per turn, with a connection per thread.
+
+    A session expires `ttl_seconds` after its last write; expired sessions are purged periodically.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, purge_interval_seconds: float = 60) -> None:
+        """
+        Open the database and create its tables if needed.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            ttl_seconds (float): Idle time after which a session expires.
+            purge_interval_seconds (float): Minimum time between purges of expired sessions.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval_seconds
+        self._last_purge = 0.0
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS session (id TEXT PRIMARY KEY, meta TEXT, updated_at REAL)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_turn (
+                    session_id TEXT,
+                    seq INTEGER,
+                    turn TEXT,
+                    PRIMARY KEY (session_id, seq)
+                ) WITHOUT ROWID
+            """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_updated_at ON session (updated_at)")
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only used by this thread, but closed by whichever thread calls `close`.
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def create(self, session_id: str, meta: dict) -> None:
+        self._purge_expired()
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session (id, meta, updated_at) VALUES (?, ?, ?)",
+                (session_id, encode(meta), time.time()),
+            )
+
+    def append(self, session_id: str, turns: list, meta: dict) -> None:
+        first = meta["turns"] - len(turns)
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_turn (session_id, seq, turn) VALUES (?, ?, ?)",
+                [(session_id, first + offset, encode(turn)) for offset, turn in enumerate(turns)],
+            )
+            conn.execute("UPDATE session SET meta=?, updated_at=? WHERE id=?", (encode(meta), time.time(), session_id))
+
+    def load(self, session_id: str, since: int = 0) -> Optional[tuple]:
+        conn = self.connection()
+        row = conn.execute(
+            "SELECT meta FROM session WHERE id=? AND updated_at >= ?", (session_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        meta = json.loads(row[0])
+        turns = conn.execute(
+            "SELECT turn FROM session_turn WHERE session_id=? AND seq >= ? AND seq < ? ORDER BY seq",
+            (session_id, since, meta["turns"]),
+        ).fetchall()
+        return meta, [tuple(json.loads(turn)) for (turn,) in turns]
+
+    def delete(self, session_id: str) -> None:
+        with self.connection() as conn:
+            conn.execute("DELETE FROM session WHERE id=?", (session_id,))
+            conn.execute("DELETE FROM session_turn WHERE session_id=?", (session_id,))
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        with self.connection() as conn:
+            conn.execute(
+                "DELETE FROM session_turn WHERE session_id IN (SELECT id FROM session WHERE updated_at < ?)",
+                (now - self.ttl_seconds,),
+            )
+            conn.execute("DELETE FROM session WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Redis-backed sessions: a `session:<id>` string holding the meta record and a `session:<id>:turns` list.
+
+    Both keys expire `ttl_seconds` after the last write. Writes run in a MULTI transaction, so readers never see new
+    turns without the matching meta record.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float) -> None:
+        """
+        Connect to the server.
+
+        Args:
+            url (str): Redis URL, e.g. `redis://redis-service:6379/0`.
+            ttl_seconds (float): Idle time after which a session expires.
+        """
+        if redis is None:
+            raise ImportError("The redis session backend requires the `redis` package.")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds)
+
+    @staticmethod
+    def keys(session_id: str) -> tuple:
+        return f"session:{session_id}", f"session:{session_id}:turns"
+
+    def create(self, session_id: str, meta: dict) -> None:
+        meta_key, turns_key = self.keys(session_id)
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(meta_key, encode(meta), ex=self.ttl_seconds)
+            pipe.delete(turns_key)
+            pipe.execute()
+
+    def append(self, session_id: str, turns: list, meta: dict) -> None:
+        meta_key, turns_key = self.keys(session_id)
+        with self.client.pipeline(transaction=True) as pipe:
+            if turns:
+                pipe.rpush(turns_key, *(encode(turn) for turn in turns))
+            pipe.set(meta_key, encode(meta), ex=self.ttl_seconds)
+            pipe.expire(turns_key, self.ttl_seconds)
+            pipe.execute()
+
+    def load(self, session_id: str, since: int = 0) -> Optional[tuple]:
+        meta_key, turns_key = self.keys(session_id)
+        raw_meta = self.client.get(meta_key)
+        if raw_meta is None:
+            return None
+        meta = json.loads(raw_meta)
+        turns = self.client.lrange(turns_key, since, meta["turns"] - 1) if meta["turns"] > since else []
+        return meta, [tuple(json.loads(turn)) for turn in turns]
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(*self.keys(session_id))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_backend(config: dict, backend: str, redis_url: str) -> SessionBackend:
+    """
+    Create the configured session backend.
+
+    Args:
+        config (dict): The `sessions` configuration section.
+        backend (str): `memory`, `sqlite` or `redis`.
+        redis_url (str): Redis URL, for the redis backend.
+
+    Returns:
+        SessionBackend: The backend.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "memory":
+        return MemorySessionBackend()
+    if backend == "sqlite":
+        return SQLiteSessionBackend(config["sqlite_path"], config["ttl_seconds"])
+    if backend == "redis":
+        return RedisSessionBackend(redis_url, config["ttl_seconds"])
+    raise ValueError(f"Unknown session backend: {backend}")
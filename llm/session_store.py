@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from llm.interview_chain import InterviewChain
+from llm.session_backends import SessionBackend
+
+
+class SessionNotFoundError(KeyError):
+    """Raised when a session ID is unknown or its session has been evicted."""
+
+
+class SessionRegistry:
+    """
+    Keeps one InterviewChain per interview, keyed by session ID, on top of a session backend.
+
+    The backend holds the state of every session, so with a shared backend any replica can serve any turn. Chains are
+    also kept in a local cache in least-recently-used order: on each lookup, only the backend's meta record and the
+    turns added by other replicas are fetched, and after each turn only the new turns are appended. With an in-process
+    backend, the cache is the only copy of the sessions and the backend is not read. Idle sessions are
+    dropped from the cache after `ttl_seconds`, and the least recently used whenever `max_sessions` or the memory cap
+    is exceeded.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], InterviewChain],
+        backend: SessionBackend,
+        ttl_seconds: float,
+        max_sessions: int,
+        max_memory_mb: float,
+    ) -> None:
+        """
+        Initialize the registry.
+
+        Args:
+            factory (Callable[[], InterviewChain]): Creates a new InterviewChain sharing the service-wide resources.
+            backend (SessionBackend): Stores the session state.
+            ttl_seconds (float): Idle time after which a session is dropped from the local cache.
+            max_sessions (int): Maximum number of sessions kept in the local cache.
+            max_memory_mb (float): Approximate memory cap for the locally cached session state, in megabytes.
+        """
+        self.factory = factory
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+        # Each cached chain with its last use time and its memory footprint when last cached or saved.
+        self._sessions: "OrderedDict[str, tuple[InterviewChain, float, int]]" = OrderedDict()
+        # Sum of the footprints, kept up to date so enforcing the memory cap does not walk every session's turns.
+        self._memory = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def create(self) -> InterviewChain:
+        """
+        Create and register a new interview session.
+
+        Returns:
+            InterviewChain: The chain for the new session.
+        """
+        chain = self.factory()
+        chain.init_new_session()
+        await asyncio.to_thread(self.backend.create, str(chain.session_id), chain.session_meta())
+        self._cache(str(chain.session_id), chain)
+        return chain
+
+    async def get(self, session_id: str) -> InterviewChain:
+        """
+        Look up a session, bringing the cached chain up to date with the backend.
+
+        Args:
+            session_id (str): Session ID returned by `create`.
+
+        Returns:
+            InterviewChain: The chain for the session.
+
+        Raises:
+            SessionNotFoundError: If the session does not exist or has expired.
+        """
+        with self._lock:
+            self._evict()
+            cached = self._sessions.get(session_id)
+        if self.backend.in_process:
+            if cached is None:
+                raise SessionNotFoundError(session_id)
+            return self._cache(session_id, cached[0])
+        if cached is not None and self._has_unsaved_turns(cached[0]):
+            # Turns from another replica would be appended after the unsaved ones, so rebuild from the backend.
+            with self._lock:
+                self._drop(session_id, cached[0])
+            cached = None
+        since = cached[0].persisted_turns if cached is not None else 0
+        state = await asyncio.to_thread(self.backend.load, session_id, since)
+        if state is None:
+            with self._lock:
+                self._pop(session_id)
+            raise SessionNotFoundError(session_id)
+        meta, turns = state
+
+        with self._lock:
+            # Another request may have cached the session while the backend was read.
+            cached = self._sessions.get(session_id)
+            if cached is not None and (cached[0].persisted_turns < since or self._has_unsaved_turns(cached[0])):
+                self._drop(session_id, cached[0])
+                cached = None
+        if cached is None:
+            chain = self.factory()
+            chain.apply_session_state(session_id, meta, turns)
+        else:
+            chain = cached[0]
+            if meta["turns"] > chain.persisted_turns:
+                # Another replica served turns of this session since it was cached here.
+                chain.apply_session_state(session_id, meta, turns[chain.persisted_turns - since :])
+        return self._cache(session_id, chain)
+
+    async def save(self, chain: InterviewChain) -> None:
+        """
+        Persist the turns added to a session since it was last saved, and its updated meta record.
+
+        Args:
+            chain (InterviewChain): The session's chain.
+        """
+        turns = chain.history.turns[chain.persisted_turns :]
+        meta = chain.session_meta()
+        await asyncio.to_thread(self.backend.append, str(chain.session_id), turns, meta)
+        chain.persisted_turns = meta["turns"]
+        with self._lock:
+            cached = self._sessions.get(str(chain.session_id))
+            if cached is not None and cached[0] is chain:
+                self._put(str(chain.session_id), chain, cached[1])
+                self._evict()
+
+    async def remove(self, session_id: str) -> None:
+        """
+        Drop a session, e.g. once its interview has been saved.
+
+        Args:
+            session_id (str): Session ID to remove.
+        """
+        with self._lock:
+            self._pop(session_id)
+        await asyncio.to_thread(self.backend.delete, session_id)
+
+    def close(self) -> None:
+        """Close the backend."""
+        self.backend.close()
+
+    def _cache(self, session_id: str, chain: InterviewChain) -> InterviewChain:
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None and cached[0] is not chain:
+                chain = cached[0]
+            # Re-inserted, so the session moves to the most recently used end.
+            self._put(session_id, chain, time.monotonic())
+            self._evict()
+        return chain
+
+    def _put(self, session_id: str, chain: InterviewChain, last_used: float) -> None:
+        self._pop(session_id)
+        footprint = chain.memory_footprint()
+        self._sessions[session_id] = (chain, last_used, footprint)
+        self._memory += footprint
+
+    def _pop(self, session_id: str) -> None:
+        cached = self._sessions.pop(session_id, None)
+        if cached is not None:
+            self._memory -= cached[2]
+
+    @staticmethod
+    def _has_unsaved_turns(chain: InterviewChain) -> bool:
+        """Whether a chain kept turns that never reached the backend, e.g. those of a stream cut short."""
+        # While a turn is in progress, its new turns are not saved yet.
+        return not chain.lock.locked() and len(chain.history) != chain.persisted_turns
+
+    def _drop(self, session_id: str, chain: InterviewChain) -> None:
+        cached = self._sessions.get(session_id)
+        if cached is not None and cached[0] is chain:
+            self._pop(session_id)
+
+    def memory_usage(self) -> int:
+        """Approximate memory held by all sessions, in bytes, as of when each was last cached or saved."""
+        return self._memory
+
+    def _evict(self) -> None:
+        """Evict expired sessions, then least recently used ones until the size and memory caps hold."""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (_, last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds:
+                break
+            self._pop(session_id)
+            self.logger.info(f"Dropped idle session {session_id} from the cache.")
+
+        while len(self._sessions) > self.max_sessions:
+            session_id = next(iter(self._sessions))
+            self._pop(session_id)
+            self.logger.info(f"Dropped session {session_id} from the cache (session limit reached).")
+
+        while len(self._sessions) > 1 and self._memory > self.max_memory_bytes:
+            session_id = next(iter(self._sessions))
+            self._pop(session_id)
+            self.logger.info(f"Dropped session {session_id} from the cache (memory limit reached).")
@@ -0,0 +1,169 @@
+import json
+import re
+from typing import Optional
+
+
+class IncrementalResponseProcessor:
+    """
+    Applies the `InterviewChain.process_llm_response` trimming and the stopwords to a streamed LLM response.
+
+    Text is released as soon as it can no longer be trimmed: a leading "Interviewer:" label and a preamble line ending
+    in ":\\n\\n" (e.g. "Here is my next question:\\n\\n") are held back until they can be recognized and dropped, and a
+    trailing fragment that could be the start of a stopword is held back until it is disambiguated. Only a first line
+    opening with one of the `PREAMBLE_OPENERS` words is held back as a possible preamble; any other first word starts
+    the question, which is then released right away. Unlike the non-streaming path, a ":\\n\\n" appearing after text has
+    been released cannot retract that text.
+    """
+
+    SPEAKER_LABEL = "Interviewer:"
+    PREAMBLE_END = ":\n\n"
+    # First words of the preambles models put before the question, e.g. "Sure! Here's my next question:".
+    PREAMBLE_OPENERS = frozenset(
+        {
+            "absolutely",
+            "alright",
+            "based",
+            "certainly",
+            "excellent",
+            "follow",
+            "following",
+            "good",
+            "got",
+            "great",
+            "here",
+            "here's",
+            "i",
+            "i'd",
+            "i'll",
+            "i'm",
+            "let",
+            "let's",
+            "moving",
+            "my",
+            "next",
+            "now",
+            "ok",
+            "okay",
+            "question",
+            "sure",
+            "thank",
+            "thanks",
+            "that's",
+            "the",
+            "understood",
+        }
+    )
+    FIRST_WORD = re.compile(r"\s*([\w'’]+)[^\w'’]")
+
+    def __init__(self, stopwords: list, preamble_window: int = 80) -> None:
+        """
+        Initialize the processor.
+
+        Args:
+            stopwords (list): Strings that end the response when they appear.
+            preamble_window (int): Number of characters after which a first line opening like a preamble is no longer
+                treated as one.
+        """
+        self.stopwords = [stopword for stopword in stopwords if stopword]
+        self.preamble_window = preamble_window
+        self.buffer = ""
+        self.text = ""
+        self.started = False
+        self.stopped = False
+
+    def feed(self, token: str) -> str:
+        """
+        Add a token from the stream.
+
+        Args:
+            token (str): Next piece of the raw response.
+
+        Returns:
+            str: Text that is now safe to show, possibly empty.
+        """
+        if self.stopped:
+            return ""
+        self.buffer += token
+        positions = [self.buffer.find(stopword) for stopword in self.stopwords if stopword in self.buffer]
+        if positions:
+            self.buffer = self.buffer[: min(positions)]
+            self.stopped = True
+            return self._drain(final=True)
+        return self._drain(final=False)
+
+    def finish(self) -> str:
+        """
+        Flush the held-back text at the end of the stream.
+
+        Returns:
+            str: The remaining text, possibly empty.
+        """
+        if self.stopped:
+            return ""
+        self.stopped = True
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> str:
+        if not self.started and not self._strip_preamble(final):
+            return ""
+
+        if final:
+            released = self.buffer.rstrip()
+        else:
+            released = self.buffer[: len(self.buffer) - self._held_tail_length()]
+        self.buffer = self.buffer[len(released) :]
+        self.text += released
+        return released
+
+    def _strip_preamble(self, final: bool) -> bool:
+        """Drop the speaker label and preamble from the buffer; returns False while more text is needed to decide."""
+        if not final and self.SPEAKER_LABEL.startswith(self.buffer):
+            return False
+        if self.buffer.startswith(self.SPEAKER_LABEL):
+            self.buffer = self.buffer[len(self.SPEAKER_LABEL) :]
+
+        preamble_end = self.buffer.find(self.PREAMBLE_END)
+        first_newline = self.buffer.find("\n")
+        if preamble_end >= 0:
+            self.buffer = self.buffer[preamble_end + len(self.PREAMBLE_END) :]
+        elif not final:
+            # A preamble line ends in a colon, not a question, so a question mark means the question has started.
+            if first_newline < 0 and len(self.buffer) < self.preamble_window and "?" not in self.buffer:
+                first_word = self.FIRST_WORD.match(self.buffer)
+                if first_word is None or first_word.group(1).replace("’", "'").lower() in self.PREAMBLE_OPENERS:
+                    return False
+            if first_newline >= 0 and self.buffer[first_newline - 1 : first_newline] == ":":
+                if first_newline + 1 == len(self.buffer):
+                    return False
+
+        self.buffer = self.buffer.lstrip()
+        if not self.buffer and not final:
+            return False
+        self.started = True
+        return True
+
+    def _held_tail_length(self) -> int:
+        """Length of the buffer suffix that must be held back: a possible stopword prefix and whitespace before it."""
+        held = 0
+        for stopword in self.stopwords:
+            for length in range(min(len(stopword) - 1, len(self.buffer)), 0, -1):
+                if self.buffer.endswith(stopword[:length]):
+                    held = max(held, length)
+                    break
+        rest = self.buffer[: len(self.buffer) - held]
+        return held + len(rest) - len(rest.rstrip())
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """
+    Format a server-sent event.
+
+    Args:
+        data (dict): JSON-serializable event payload.
+        event (str): Optional event name; unnamed events are "message" events.
+
+    Returns:
+        str: The encoded event.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
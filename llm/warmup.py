@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional
+
+
+class Warmup:
+    """
+    Loads a slow, shared resource (e.g. the embedding model and the vectorstore) once, in a worker thread.
+
+    The server binds its port without waiting for the resource: `start` begins loading it in the background, and
+    requests that need it `wait` until it is loaded. If loading fails, the next `wait` tries again.
+    """
+
+    def __init__(self, load: Callable[[], Any], name: str) -> None:
+        """
+        Initialize the warmup; nothing is loaded until `start` or `wait` is called from the event loop.
+
+        Args:
+            load (Callable[[], Any]): Blocking function loading the resource.
+            name (str): Resource name, used in logs and in the readiness status.
+        """
+        self.load = load
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.value: Optional[Any] = None
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.seconds is not None
+
+    @property
+    def loading(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start loading the resource in the background, unless it is loaded or already loading."""
+        if self._task is None or (self._task.done() and not self.ready):
+            self._task = asyncio.create_task(self._run())
+            # Mark a failure as retrieved; it is logged by `_run` and raised to the requests waiting for it.
+            self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def wait(self) -> Any:
+        """
+        Wait until the resource is loaded, starting to load it if needed.
+
+        Returns:
+            Any: The loaded resource.
+
+        Raises:
+            Exception: Whatever loading the resource raised.
+        """
+        if self.ready:
+            return self.value
+        self.start()
+        # Shielded, so a cancelled request does not cancel the load other requests are waiting for.
+        return await asyncio.shield(self._task)
+
+    def status(self) -> dict:
+        """
+        Describe the state of the warmup, for the readiness endpoint.
+
+        Returns:
+            dict: Whether the resource is ready or loading, how long it took to load, and the last loading error.
+        """
+        return {
+            "name": self.name,
+            "ready": self.ready,
+            "loading": self.loading,
+            "seconds": self.seconds,
+            "error": self.error,
+        }
+
+    async def _run(self) -> Any:
+        self.logger.info(f"Loading {self.name}.")
+        start = time.perf_counter()
+        try:
+            self.value = await asyncio.to_thread(self.load)
+        except Exception as e:
+            self.error = str(e)
+            self.logger.error(f"Failed to load {self.name}: {e}")
+            raise
+        self.seconds = time.perf_counter() - start
+        self.error = None
+        self.logger.info(f"Loaded {self.name} in {self.seconds:.2f}s.")
+        return self.value
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from llm.http_client import AsyncHTTPClient
+
+
+class WriteBufferFullError(Exception):
+    """Raised when an interview is not buffered because `max_pending` interviews are already waiting to be sent."""
+
+
+class InterviewWriteBuffer:
+    """
+    Buffers finished interviews and sends them to the DB service's /log_batch endpoint in batches.
+
+    A flush is triggered once `max_batch_size` interviews are pending, or `flush_interval_seconds` after the first one
+    was buffered. `add` returns once the interview's batch is committed, and raises if it could not be, so the caller
+    (the evaluation job) is retried instead of the interview being lost.
+    """
+
+    def __init__(
+        self,
+        http_client: AsyncHTTPClient,
+        db_url: str,
+        max_batch_size: int,
+        flush_interval_seconds: float,
+        max_pending: int,
+    ) -> None:
+        """
+        Initialize an empty buffer.
+
+        Args:
+            http_client (AsyncHTTPClient): Shared pooled HTTP client.
+            db_url (str): Base URL of the DB service.
+            max_batch_size (int): Number of interviews sent per request.
+            flush_interval_seconds (float): Maximum time an interview waits before being sent.
+            max_pending (int): Maximum number of buffered interviews; more are rejected.
+        """
+        self.http_client = http_client
+        self.db_url = db_url
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_seconds
+        self.max_pending = max_pending
+        self.logger = logging.getLogger(__name__)
+        # Pending interviews, each with the future resolved once it is committed.
+        self.pending = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Flushes started by a full batch, referenced so they are not garbage collected.
+        self._flushes: set = set()
+
+    async def add(self, interview: dict) -> None:
+        """
+        Buffer an interview and wait until the batch holding it is committed.
+
+        Args:
+            interview (dict): Interview record as accepted by the DB service's /log endpoint.
+
+        Raises:
+            WriteBufferFullError: If `max_pending` interviews are already waiting to be sent.
+            httpx.HTTPError: If the batch could not be saved.
+        """
+        if len(self.pending) >= self.max_pending:
+            raise WriteBufferFullError(f"{len(self.pending)} interviews are already waiting to be saved.")
+        saved = asyncio.get_running_loop().create_future()
+        self.pending.append((interview, saved))
+        if len(self.pending) >= self.max_batch_size:
+            # Flushed in a task of its own, so the batch is still sent if this caller is cancelled.
+            flush = asyncio.create_task(self.flush())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        else:
+            self._schedule_flush()
+        await saved
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        while self.pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send all pending interviews, in batches of at most `max_batch_size`, and tell their callers the outcome."""
+        while self.pending:
+            batch = self.pending[: self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size :]
+            try:
+                await self.http_client.post_db(
+                    f"{self.db_url}/log_batch", {"conversations": [interview for interview, _ in batch]}
+                )
+            except asyncio.CancelledError:
+                # Put the batch back, so the next flush, e.g. the one on shutdown, sends it.
+                self.pending = batch + self.pending
+                raise
+            except httpx.HTTPError as e:
+                self.logger.error(f"Error saving {len(batch)} interviews: {e}")
+                for _, saved in batch:
+                    if not saved.done():
+                        saved.set_exception(e)
+                continue
+            self.logger.info(f"Saved {len(batch)} interviews.")
+            for _, saved in batch:
+                if not saved.done():
+                    saved.set_result(None)
+
+    async def aclose(self) -> None:
+        """Flush what is pending before shutdown."""
+        tasks = [task for task in (self._flush_task, *self._flushes) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
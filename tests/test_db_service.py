@@ -0,0 +1,147 @@
+import asyncio
+import importlib
+import json
+import sqlite3
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from db.storage import ConnectionPool, Storage, conversation_row
+from db.writer import GroupCommitWriter
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    """The DB service module, with its storage and writer on a fresh database."""
+    monkeypatch.setenv("DB_NAME", str(tmp_path / "import.db"))
+    main = importlib.import_module("db.main")
+    storage = Storage(
+        ConnectionPool(str(tmp_path / "conversations.db"), size=2, cache_mb=2, mmap_mb=0, busy_timeout_ms=5000)
+    )
+    writer = GroupCommitWriter(storage, max_batch_size=256, max_latency_ms=0)
+    monkeypatch.setattr(main, "storage", storage)
+    monkeypatch.setattr(main, "writer", writer)
+    yield main
+    # Already done by the app's shutdown when a test client ran; stopping again returns at once.
+    writer.stop()
+    storage.pool.close()
+
+
+@pytest.fixture
+def client(main) -> TestClient:
+    with TestClient(main.app) as client:
+        yield client
+
+
+def add_interviews(storage: Storage, count: int) -> None:
+    storage.insert_conversations(
+        [
+            conversation_row(f"s{i}", json.dumps({"role": "Engineer" if i % 2 else "Designer"}), "Transcript.", "Good.")
+            for i in range(count)
+        ]
+    )
+
+
+def test_cursor_round_trip(main):
+    row = {"timestamp": "2026-01-02 03:04:05", "id": 42}
+    assert main.decode_cursor(main.encode_cursor(row)) == ("2026-01-02 03:04:05", 42)
+
+
+def test_pages_follow_the_cursor(main, client):
+    add_interviews(main.storage, 7)
+    ids, cursor = [], None
+    while True:
+        page = client.get("/interviews", params={"limit": 3, **({"cursor": cursor} if cursor else {})}).json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == list(range(7, 0, -1))
+    assert client.get("/interviews", params={"cursor": "not a cursor"}).status_code == 400
+
+
+def test_export_streams_every_matching_interview(main, client):
+    add_interviews(main.storage, 7)
+    response = client.get("/interviews/export", params={"role": "Engineer", "fields": "id,session_id"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["session_id"] for row in rows] == ["s5", "s3", "s1"]
+    assert client.get("/interviews/export", params={"fields": "id,password"}).status_code == 400
+
+
+def test_export_returns_the_connection_between_pages(main):
+    add_interviews(main.storage, 5)
+    pool = main.storage.pool._connections
+    rows = main.storage.iter_interviews(fields=("id",), chunk_size=2)
+    ids = []
+    for row in rows:
+        # Both connections are back in the pool while the caller holds a row.
+        assert pool.qsize() == 2
+        ids.append(row["id"])
+    assert ids == [5, 4, 3, 2, 1]
+
+
+def post_concurrently(main, path: str, payloads: list) -> list:
+    async def run() -> list:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://db") as client:
+            return await asyncio.gather(*(client.post(path, json=payload) for payload in payloads))
+
+    return asyncio.run(run())
+
+
+def interview(session_id: str) -> dict:
+    return {"session_id": session_id, "user": "{}", "conversation": "Transcript.", "evaluation": "Good."}
+
+
+@pytest.fixture
+def batching_writer(main, monkeypatch) -> list:
+    """Give the writer time to collect concurrent inserts, and record the rows of each transaction."""
+    transactions = []
+    insert_conversations = main.storage.insert_conversations
+
+    def record(rows: list) -> int:
+        transactions.append([row[0] for row in rows])
+        return insert_conversations(rows)
+
+    monkeypatch.setattr(main.storage, "insert_conversations", record)
+    writer = GroupCommitWriter(main.storage, max_batch_size=256, max_latency_ms=200)
+    monkeypatch.setattr(main, "writer", writer)
+    yield transactions
+    writer.stop()
+
+
+def test_concurrent_logs_share_one_transaction(main, batching_writer):
+    responses = post_concurrently(main, "/log", [interview(f"s{i}") for i in range(5)])
+    assert [response.json() for response in responses] == [{"status": "success"}] * 5
+    assert len(batching_writer) == 1
+    assert sorted(batching_writer[0]) == [f"s{i}" for i in range(5)]
+    assert all(main.storage.get_logs(f"s{i}") for i in range(5))
+
+
+def test_failed_transaction_fails_every_waiting_log(main, batching_writer, monkeypatch):
+    def insert_conversations(rows: list) -> int:
+        batching_writer.append([row[0] for row in rows])
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(main.storage, "insert_conversations", insert_conversations)
+    responses = post_concurrently(main, "/log", [interview("s0"), interview("s1")])
+    batch_response = post_concurrently(main, "/log_batch", [{"conversations": [interview("s2"), interview("s3")]}])
+    for response in (*responses, *batch_response):
+        assert response.status_code == 500
+        assert response.json()["detail"] == "database is locked"
+    assert sorted(batching_writer[0]) == ["s0", "s1"]
+
+
+def test_writer_commits_queued_rows_on_stop(tmp_path):
+    storage = Storage(
+        ConnectionPool(str(tmp_path / "conversations.db"), size=1, cache_mb=2, mmap_mb=0, busy_timeout_ms=5000)
+    )
+    writer = GroupCommitWriter(storage, max_batch_size=2, max_latency_ms=1000)
+    futures = [writer.submit([conversation_row(f"s{i}", "{}", "Transcript.", "Good.")]) for i in range(3)]
+    writer.stop()
+    # Two full batches of at most `max_batch_size` rows, committed without waiting for the latency.
+    assert sorted(future.result(timeout=0) for future in futures) == [1, 2, 2]
+    assert all(storage.get_logs(f"s{i}") for i in range(3))
+    storage.pool.close()
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from llm import embedding_service
+from llm.embeddings import FAKE_MODEL, EmbeddingClient, FakeEmbedding, create_embedding
+
+
+@pytest.fixture
+def batches(monkeypatch) -> list:
+    """Run the embedding service's workers in threads, recording the texts of each model call."""
+    calls = []
+
+    def thread_pool(workers, context, initializer, initargs):
+        return ThreadPoolExecutor(workers, initializer=initializer, initargs=initargs)
+
+    def embed_in_worker(texts: list) -> list:
+        calls.append(texts)
+        return embedding_service.worker_model.embed_documents(texts)
+
+    monkeypatch.setattr(embedding_service, "ProcessPoolExecutor", thread_pool)
+    monkeypatch.setattr(embedding_service, "embed_in_worker", embed_in_worker)
+    return calls
+
+
+@pytest.fixture
+def service(monkeypatch, batches) -> TestClient:
+    pool = embedding_service.EmbeddingWorkerPool(
+        FAKE_MODEL, bulk_workers=2, query_workers=1, max_batch_size=4, max_wait_ms=50
+    )
+    monkeypatch.setattr(embedding_service, "pool", pool)
+    with TestClient(embedding_service.app) as client:
+        batches.clear()
+        yield client
+
+
+def service_client(service: TestClient, model: str = FAKE_MODEL) -> EmbeddingClient:
+    client = EmbeddingClient(str(service.base_url), model, timeout_seconds=5)
+    client.client = service
+    return client
+
+
+def test_fake_embedding_is_deterministic():
+    first, second = FakeEmbedding(), FakeEmbedding()
+    assert first.embed_query("teamwork") == second.embed_query("teamwork")
+    assert first.embed_query("teamwork") != first.embed_query("leadership")
+    assert len(first.embed_query("teamwork")) == 384
+    assert first.embed_queries(["a", "b"]) == first.embed_documents(["a", "b"])
+
+
+def test_create_embedding_selects_fake_model(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_SERVICE_URL", raising=False)
+    config = {"embedding_model": FAKE_MODEL, "embeddings": {"service_url": "", "request_timeout_seconds": 5}}
+    assert isinstance(create_embedding(config), FakeEmbedding)
+    monkeypatch.setenv("EMBEDDING_SERVICE_URL", "http://embedding-service:8002")
+    assert isinstance(create_embedding(config), EmbeddingClient)
+
+
+def test_documents_are_split_into_batches_in_order(service, batches):
+    texts = [f"chunk {i}" for i in range(10)]
+    assert service_client(service).embed_documents(texts) == FakeEmbedding().embed_documents(texts)
+    assert sorted(len(batch) for batch in batches) == [2, 4, 4]
+
+
+def test_concurrent_queries_share_model_calls(batches):
+    pool = embedding_service.EmbeddingWorkerPool(
+        FAKE_MODEL, bulk_workers=1, query_workers=1, max_batch_size=4, max_wait_ms=50
+    )
+    texts = [f"query {i}" for i in range(6)]
+
+    async def run() -> list:
+        await pool.start()
+        batches.clear()
+        try:
+            return await asyncio.gather(*(pool.embed_queries([text]) for text in texts))
+        finally:
+            pool.stop()
+
+    results = asyncio.run(run())
+    assert [vectors[0] for vectors in results] == FakeEmbedding().embed_documents(texts)
+    assert sorted(len(batch) for batch in batches) == [2, 4]
+
+
+def test_query_through_the_service(service, batches):
+    client = service_client(service)
+    assert client.embed_query("teamwork") == FakeEmbedding().embed_query("teamwork")
+    assert client.embed_documents([]) == []
+    assert len(batches) == 1
+
+
+def test_model_mismatch_is_rejected(service, batches):
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        service_client(service, model="sentence-transformers/all-mpnet-base-v2").embed_query("teamwork")
+    assert error.value.response.status_code == 409
+    assert batches == []
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+import yaml
+
+from llm.evaluation import SkillEvaluator, parse_skill_result
+from llm.llm_router import LLMError
+
+
+class StubRouter:
+    """Stands in for `LLMRouter`, answering each skill prompt with `answers[skill]` and recording the calls."""
+
+    def __init__(self, answers: dict, delay: float = 0) -> None:
+        self.answers = answers
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, payload: dict, priority: str = "turn") -> dict:
+        self.calls.append(payload["skill"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            answer = self.answers[payload["skill"]]
+            if isinstance(answer, Exception):
+                raise answer
+            return {"response": answer}
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def config() -> dict:
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    config["evaluation"].update(skills=["communication", "teamwork", "leadership"], max_parallel=2)
+    return config
+
+
+def build_payload(skill: str) -> dict:
+    return {"skill": skill}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"score": 4, "justification": "Clear answers."}', {"score": 4, "justification": "Clear answers."}),
+        (
+            '```json\n{"score": "3", "justification": "Some examples."}\n```',
+            {"score": 3, "justification": "Some examples."},
+        ),
+        (
+            'Here is my assessment: {"score": 4.6, "justification": "Led the team."} Hope this helps.',
+            {"score": 5, "justification": "Led the team."},
+        ),
+        ('{"score": 9, "justification": "Exceptional."}', {"score": 5, "justification": "Exceptional."}),
+        ('{"score": -2}', {"score": 1, "justification": ""}),
+        ("The candidate communicates well.", {"score": None, "justification": "The candidate communicates well."}),
+        ('{"score": "high"}', {"score": None, "justification": '{"score": "high"}'}),
+    ],
+)
+def test_parse_skill_result(text, expected):
+    assert parse_skill_result(text) == expected
+
+
+def test_scores_are_cached_per_transcript_and_skill(config):
+    router = StubRouter({skill: '{"score": 4, "justification": "Good."}' for skill in config["evaluation"]["skills"]})
+    evaluator = SkillEvaluator(config, router)
+
+    async def run() -> tuple:
+        first = await evaluator.evaluate("Candidate: Hi", build_payload)
+        again = await evaluator.evaluate("Candidate: Hi", build_payload)
+        await evaluator.evaluate("Candidate: Hello", build_payload)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == again
+    assert first["overall_score"] == 4
+    assert first["transcript_hash"] == evaluator.transcript_hash("Candidate: Hi")
+    assert len(router.calls) == 6
+
+
+def test_retry_only_scores_the_missing_skills(config):
+    router = StubRouter(
+        {
+            "communication": '{"score": 4, "justification": "Good."}',
+            "teamwork": LLMError("backend down"),
+            "leadership": "No score here.",
+        }
+    )
+    evaluator = SkillEvaluator(config, router)
+
+    async def run() -> dict:
+        with pytest.raises(LLMError):
+            await evaluator.evaluate("Candidate: Hi", build_payload)
+        router.answers["teamwork"] = '{"score": 2, "justification": "Worked alone."}'
+        router.calls.clear()
+        return await evaluator.evaluate("Candidate: Hi", build_payload)
+
+    result = asyncio.run(run())
+    # Unparsed answers are not cached, so they are asked again too.
+    assert sorted(router.calls) == ["leadership", "teamwork"]
+    assert result["scores"] == {"communication": 4, "teamwork": 2, "leadership": None}
+    assert result["overall_score"] == 3
+
+
+def test_skill_calls_are_bounded_by_max_parallel(config):
+    router = StubRouter(
+        {skill: '{"score": 3, "justification": "Fine."}' for skill in config["evaluation"]["skills"]}, delay=0.02
+    )
+    evaluator = SkillEvaluator(config, router)
+
+    async def run() -> None:
+        await asyncio.gather(*(evaluator.evaluate(f"Candidate: {i}", build_payload) for i in range(3)))
+
+    asyncio.run(run())
+    assert len(router.calls) == 9
+    assert router.max_in_flight == 2
@@ -0,0 +1,52 @@
+from llm.history import ConversationHistory, estimate_tokens
+
+
+def test_recent_turns_stay_verbatim():
+    history = ConversationHistory(recent_turns=2, token_budget=1000, summary_token_budget=1000)
+    history.append("Interviewer", "Tell me about a project. What was your role?")
+    history.append("Candidate", "I led a migration. It took three months.")
+    assert history.summary == ""
+    assert history.prompt_view() == history.transcript()
+
+    history.append("Interviewer", "How did you handle setbacks?")
+    assert len(history) == 3
+    assert history.prompt_view() == (
+        "Summary of the earlier conversation: Interviewer: Tell me about a project.\n"
+        "Candidate: I led a migration. It took three months.\n"
+        "Interviewer: How did you handle setbacks?\n"
+    )
+    # The saved transcript keeps every turn.
+    assert history.transcript().startswith("Interviewer: Tell me about a project. What was your role?\n")
+
+
+def test_token_budget_folds_long_turns_but_keeps_the_newest():
+    history = ConversationHistory(recent_turns=10, token_budget=20, summary_token_budget=1000)
+    history.append("Candidate", "First answer. " * 10)
+    history.append("Candidate", "Second answer. " * 10)
+    assert history.summarized == 1
+    assert history.prompt_view().endswith("Candidate: " + "Second answer. " * 10 + "\n")
+    assert history.recent_tokens == estimate_tokens(
+        ConversationHistory.format_turn("Candidate", "Second answer. " * 10)
+    )
+
+
+def test_summary_keeps_the_newest_parts_within_its_budget():
+    history = ConversationHistory(recent_turns=1, token_budget=1000, summary_token_budget=14)
+    for i in range(5):
+        history.append("Candidate", f"Answer number {i}. More detail follows.")
+    assert history.summary == "Candidate: Answer number 2. Candidate: Answer number 3."
+    assert history.summary_tokens <= 14
+
+
+def test_summarize_turn_takes_the_first_sentence_within_max_words():
+    assert ConversationHistory.summarize_turn("I led  a migration.\nIt took months.") == "I led a migration."
+    assert ConversationHistory.summarize_turn("one two three four", max_words=2) == "one two..."
+    assert ConversationHistory.summarize_turn("No sentence end") == "No sentence end"
+
+
+def test_latest_is_the_newest_turn():
+    history = ConversationHistory(recent_turns=2, token_budget=1000, summary_token_budget=1000)
+    assert history.latest() == ""
+    history.append("Interviewer", "Tell me about a project.")
+    history.append("Candidate", "I led a migration.")
+    assert history.latest() == "I led a migration."
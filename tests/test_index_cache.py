@@ -0,0 +1,44 @@
+import os
+
+import pytest
+import yaml
+
+from llm import index_cache
+from llm.embeddings import FakeEmbedding
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> dict:
+    monkeypatch.delenv("INDEX_SEED_DIR", raising=False)
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    rag_dir = tmp_path / "rag_docs"
+    rag_dir.mkdir()
+    (rag_dir / "teamwork.txt").write_text("Good teams agree on priorities and share the work.")
+    return {
+        **config,
+        "rag_dir_path": str(rag_dir),
+        "index_cache_dir": str(tmp_path / "cache"),
+        "index_seed_dir": str(tmp_path / "seed"),
+    }
+
+
+def test_index_is_seeded_instead_of_rebuilt(config, monkeypatch):
+    index_cache.load_or_build_vectorstore(
+        {**config, "index_cache_dir": config["index_seed_dir"]}, embedding=FakeEmbedding()
+    )
+
+    def build_vectorstore(*args, **kwargs):
+        raise AssertionError("The seeded index should have been used.")
+
+    monkeypatch.setattr(index_cache, "build_vectorstore", build_vectorstore)
+    vectorstore = index_cache.load_or_build_vectorstore(config, embedding=FakeEmbedding())
+    assert vectorstore.index.ntotal == 1
+    fingerprint = index_cache.index_fingerprint(config)
+    assert os.path.exists(os.path.join(config["index_cache_dir"], fingerprint, index_cache.DOCS_FILE))
+
+
+def test_index_is_built_without_a_matching_seed(config):
+    os.makedirs(os.path.join(config["index_seed_dir"], "outdated"))
+    assert not index_cache.seed_index(config, index_cache.index_fingerprint(config))
+    assert index_cache.load_or_build_vectorstore(config, embedding=FakeEmbedding()).index.ntotal == 1
@@ -0,0 +1,94 @@
+import pytest
+import yaml
+
+from llm import index_cache
+from llm.embeddings import FakeEmbedding
+from llm.ingestion import DocumentIngestor
+from llm.retrieval import Retriever
+
+
+class CountingEmbedding(FakeEmbedding):
+    """`FakeEmbedding` recording every document text it embeds."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts: list) -> list:
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> dict:
+    monkeypatch.delenv("INDEX_SEED_DIR", raising=False)
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    rag_dir = tmp_path / "rag_docs"
+    rag_dir.mkdir()
+    (rag_dir / "teamwork.txt").write_text("Good teams agree on priorities and share the work.")
+    (rag_dir / "conflict.txt").write_text("Disagreements are settled by looking at the data together.")
+    (rag_dir / "feedback.md").write_text("Feedback is specific, timely and about the work.")
+    return {**config, "rag_dir_path": str(rag_dir), "index_cache_dir": str(tmp_path / "cache"), "index_seed_dir": ""}
+
+
+@pytest.fixture
+def embedding() -> CountingEmbedding:
+    return CountingEmbedding()
+
+
+@pytest.fixture
+def retriever(config, embedding) -> Retriever:
+    retriever = Retriever(index_cache.load_or_build_vectorstore(config, embedding=embedding), config)
+    embedding.embedded.clear()
+    return retriever
+
+
+def chunk_ids(retriever: Retriever) -> set:
+    return set(retriever.vectorstore.index_to_docstore_id.values())
+
+
+def test_unchanged_documents_are_not_embedded_again(config, retriever, embedding):
+    vectorstore = retriever.vectorstore
+    result = DocumentIngestor(config).sync(retriever)
+    assert result == {"added": 0, "updated": 0, "removed": 0, "chunks_added": 0, "chunks_removed": 0, "chunks": 3}
+    assert retriever.vectorstore is vectorstore
+    assert embedding.embedded == []
+
+
+def test_changes_replace_their_chunks_in_a_new_index(config, retriever, embedding, tmp_path):
+    ingestor = DocumentIngestor(config)
+    ingestor.sync(retriever)
+    previous = retriever.vectorstore
+    rag_dir = tmp_path / "rag_docs"
+    (rag_dir / "teamwork.txt").write_text("Good teams write down their decisions.")
+    (rag_dir / "conflict.txt").unlink()
+    (rag_dir / "leadership.txt").write_text("Leaders explain the why behind a plan.")
+
+    result = ingestor.sync(retriever)
+    assert {key: result[key] for key in ("added", "updated", "removed", "chunks_added", "chunks_removed")} == {
+        "added": 1,
+        "updated": 1,
+        "removed": 1,
+        "chunks_added": 2,
+        "chunks_removed": 2,
+    }
+    # Only the new and edited documents are embedded; feedback.md keeps its chunk.
+    assert sorted(embedding.embedded) == [
+        "Good teams write down their decisions.",
+        "Leaders explain the why behind a plan.",
+    ]
+    assert retriever.vectorstore is not previous
+    assert retriever.vectorstore.index.ntotal == result["chunks"] == 3
+    assert chunk_ids(retriever) == {"teamwork.txt#0", "leadership.txt#0", "feedback.md#0"}
+    texts = {retriever.vectorstore.docstore.search(chunk_id).page_content for chunk_id in chunk_ids(retriever)}
+    assert "Good teams agree on priorities and share the work." not in texts
+    # Searches in flight keep the previous index, which is left untouched.
+    assert previous.index.ntotal == 3
+    assert "conflict.txt#0" in set(previous.index_to_docstore_id.values())
+
+    # The updated index is cached under the new documents' fingerprint, so a restart loads it.
+    embedding.embedded.clear()
+    reloaded = index_cache.load_or_build_vectorstore(config, embedding=embedding)
+    assert embedding.embedded == []
+    assert set(reloaded.index_to_docstore_id.values()) == chunk_ids(retriever)
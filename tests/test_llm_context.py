@@ -0,0 +1,73 @@
+import pytest
+import yaml
+
+from llm.interview_chain import InterviewChain
+from llm.llm_context import SessionLLMContext
+from llm.prompts import interview_system_prompt
+
+
+@pytest.fixture
+def config(monkeypatch) -> dict:
+    monkeypatch.setenv("OLLAMA_URL", "http://ollama")
+    monkeypatch.setenv("DB_SERVICE_URL", "http://db")
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    config["ollama"]["reuse_context"] = True
+    return config
+
+
+def test_saving_is_measured_against_the_last_full_prompt():
+    llm_context = SessionLLMContext(max_tokens=4096)
+    # Nothing is measured yet, e.g. for a context loaded from an older replica.
+    assert llm_context.record_turn({"prompt_eval_count": 40}, full_prompt_chars=2000, reused=True) == 0
+
+    assert llm_context.record_turn({"prompt_eval_count": 400}, full_prompt_chars=1600, reused=False) == 0
+    assert llm_context.tokens_per_char == 0.25
+    assert llm_context.record_turn({"prompt_eval_count": 50}, full_prompt_chars=2000, reused=True) == 450
+    assert llm_context.record_turn(None, full_prompt_chars=2000, reused=True) == 0
+    assert llm_context.stats == {"turns": 4, "reused_turns": 3, "prompt_eval_tokens": 490, "prefill_tokens_saved": 450}
+
+
+def test_state_round_trip_keeps_the_measured_rate():
+    llm_context = SessionLLMContext(max_tokens=4096)
+    llm_context.record_turn({"prompt_eval_count": 300}, full_prompt_chars=1000, reused=False)
+    llm_context.update({"context": [1, 2, 3]}, covered_turns=2, guidelines="Ask about teamwork.")
+    loaded = SessionLLMContext(max_tokens=4096)
+    loaded.load_state(llm_context.to_state())
+    assert (loaded.tokens, loaded.covered_turns, loaded.guidelines, loaded.tokens_per_char) == (
+        [1, 2, 3],
+        2,
+        "Ask about teamwork.",
+        0.3,
+    )
+    # Contexts serialized before the rate was kept still load.
+    state = llm_context.to_state()
+    del state["tokens_per_char"]
+    loaded.load_state(state)
+    assert loaded.tokens_per_char is None
+
+
+def test_system_prompt_is_sent_again_after_a_context_reset(config):
+    chain = InterviewChain(config, retriever=object(), http_client=object(), llm_router=object(), evaluator=object())
+    chain.init_new_session()
+    chain.update_history("Hi, I am ready.", "Candidate")
+
+    prompt, llm_context = chain.create_turn_prompt("Ask about teamwork.")
+    payload = chain.create_llm_payload(prompt, interview_system_prompt, [], stream=False, llm_context=llm_context)
+    assert payload["system"] == interview_system_prompt and "context" not in payload
+
+    chain.update_history("Tell me about a project.", "Interviewer")
+    chain.llm_context.update({"context": [1, 2, 3]}, covered_turns=len(chain.history), guidelines="Ask about teamwork.")
+    chain.update_history("I led a migration.", "Candidate")
+    prompt, llm_context = chain.create_turn_prompt("Ask about teamwork.")
+    payload = chain.create_llm_payload(prompt, interview_system_prompt, [], stream=False, llm_context=llm_context)
+    # The context holds the system prompt already; only the new turn is sent.
+    assert payload["context"] == [1, 2, 3] and "system" not in payload
+    assert "I led a migration." in payload["prompt"] and "Tell me about a project." not in payload["prompt"]
+
+    # A context grown past max_tokens is dropped, and the next turn sends the full prompt with the system prompt.
+    chain.llm_context.update({"context": list(range(chain.llm_context.max_tokens + 1))}, 4, "Ask about teamwork.")
+    prompt, llm_context = chain.create_turn_prompt("Ask about teamwork.")
+    payload = chain.create_llm_payload(prompt, interview_system_prompt, [], stream=False, llm_context=llm_context)
+    assert payload["system"] == interview_system_prompt and "context" not in payload
+    assert "Tell me about a project." in payload["prompt"]
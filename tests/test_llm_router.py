@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import yaml
+
+from llm.llm_router import LLMError, LLMRouter
+from llm.scheduler import LLMScheduler
+
+
+class FakeHTTPClient:
+    """Stands in for `AsyncHTTPClient`, sending every request to `handler` through a mock transport."""
+
+    def __init__(self, handler) -> None:
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def config() -> dict:
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    config["llm_backends"].update(
+        max_in_flight_per_backend=4, max_attempts=2, hedge_after_seconds=0, failure_threshold=2, open_seconds=0.2
+    )
+    return config
+
+
+def router(config: dict, handler, urls: tuple = ("http://a",)) -> LLMRouter:
+    return LLMRouter(config, FakeHTTPClient(handler), urls=list(urls), scheduler=LLMScheduler(config))
+
+
+def test_circuit_opens_then_lets_one_trial_through(config):
+    config["llm_backends"]["max_attempts"] = 1
+    calls = []
+    in_flight = []
+    failing = True
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        if failing:
+            return httpx.Response(500)
+        in_flight.append(1)
+        await asyncio.sleep(0.05)
+        concurrent = len(in_flight)
+        in_flight.pop()
+        return httpx.Response(200, json={"response": "ok", "concurrent": concurrent})
+
+    async def run() -> list:
+        nonlocal failing
+        llm_router = router(config, handler)
+        for _ in range(2):
+            with pytest.raises(LLMError):
+                await llm_router.generate({"prompt": "q"})
+        # The circuit is open: the backend is not even tried.
+        with pytest.raises(LLMError, match="No LLM backend is available"):
+            await llm_router.generate({"prompt": "q"})
+        assert len(calls) == 2
+
+        await asyncio.sleep(0.25)
+        failing = False
+        # Half-open: a single trial runs, and the other generation waits for its outcome.
+        results = await asyncio.gather(llm_router.generate({"prompt": "q1"}), llm_router.generate({"prompt": "q2"}))
+        assert llm_router.backends[0].failures == 0
+        return results
+
+    results = asyncio.run(run())
+    assert [result["concurrent"] for result in results] == [1, 1]
+
+
+def test_slow_generation_is_hedged_and_the_loser_cancelled(config):
+    config["llm_backends"]["hedge_after_seconds"] = 0.05
+    cancelled = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "slow":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(request.url.host)
+                raise
+        return httpx.Response(200, json={"response": request.url.host})
+
+    async def run() -> tuple:
+        llm_router = router(config, handler, urls=("http://slow", "http://fast"))
+        result = await llm_router.generate({"prompt": "q"})
+        await asyncio.sleep(0.01)
+        return result, [backend.in_flight for backend in llm_router.backends]
+
+    result, in_flight = asyncio.run(run())
+    assert result == {"response": "fast"}
+    assert cancelled == ["slow"]
+    assert in_flight == [0, 0]
+
+
+def test_identical_generations_share_one_request(config):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content)["prompt"])
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"response": "ok"})
+
+    async def run() -> list:
+        llm_router = router(config, handler)
+        return await asyncio.gather(
+            *(llm_router.generate({"prompt": "same"}) for _ in range(3)), llm_router.generate({"prompt": "other"})
+        )
+
+    results = asyncio.run(run())
+    assert results == [{"response": "ok"}] * 4
+    assert sorted(calls) == ["other", "same"]
+
+
+def test_stream_is_retried_before_the_first_chunk(config):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        if request.url.host == "a":
+            return httpx.Response(200, content=b"{not json\n")
+        return httpx.Response(200, content=b'{"response": "Hi"}\n{"done": true}\n')
+
+    async def run() -> list:
+        llm_router = router(config, handler, urls=("http://a", "http://b"))
+        return [chunk async for chunk in llm_router.stream({"prompt": "q"})]
+
+    assert asyncio.run(run()) == [{"response": "Hi"}, {"done": True}]
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.parametrize("broken", [b"{not json\n", None])
+def test_stream_is_not_retried_after_the_first_chunk(config, broken):
+    calls = []
+
+    async def body():
+        yield b'{"response": "Hi"}\n'
+        if broken is None:
+            raise httpx.ReadError("connection reset")
+        yield broken
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return httpx.Response(200, content=body())
+
+    async def run() -> list:
+        llm_router = router(config, handler, urls=("http://a", "http://b"))
+        chunks = []
+        with pytest.raises(LLMError, match="broke off"):
+            async for chunk in llm_router.stream({"prompt": "q"}):
+                chunks.append(chunk)
+        return chunks
+
+    assert asyncio.run(run()) == [{"response": "Hi"}]
+    assert calls == ["a"]
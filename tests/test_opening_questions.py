@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import pytest
+import yaml
+
+from llm.interview_chain import InterviewChain
+from llm.llm_router import LLMError
+from llm.opening_questions import NAME_PLACEHOLDER, OpeningQuestionCache, normalize_role
+
+
+class StubGenerator:
+    """Stands in for `InterviewChain.generate_opening_template`, recording the roles it is asked for."""
+
+    def __init__(self, delay: float = 0, error: Exception = None) -> None:
+        self.delay = delay
+        self.error = error
+        self.roles = []
+
+    async def __call__(self, role: str) -> str:
+        self.roles.append(role)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"Welcome {NAME_PLACEHOLDER}! Why do you want to work as a {role}?"
+
+
+@pytest.fixture
+def config(monkeypatch) -> dict:
+    monkeypatch.setenv("OLLAMA_URL", "http://ollama")
+    monkeypatch.setenv("DB_SERVICE_URL", "http://db")
+    with open("llm/config.yml") as config_file:
+        return yaml.safe_load(config_file)
+
+
+@pytest.mark.parametrize(
+    "role, expected",
+    [
+        ("Software Engineer", "software engineer"),
+        ("  senior   DATA  scientist. ", "senior data scientist"),
+        ("PM!", "pm"),
+    ],
+)
+def test_normalize_role(role, expected):
+    assert normalize_role(role) == expected
+
+
+def test_spellings_of_a_role_share_one_question(config):
+    questions = OpeningQuestionCache(config)
+    generate = StubGenerator()
+
+    async def run() -> list:
+        return [await questions.get(role, generate) for role in ("Software Engineer", " software  engineer.")]
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert generate.roles == ["software engineer"]
+    assert questions.render(first, "Ada") == "Welcome Ada! Why do you want to work as a software engineer?"
+
+
+def test_concurrent_misses_share_one_generation(config):
+    questions = OpeningQuestionCache(config)
+    generate = StubGenerator(delay=0.02)
+
+    async def run() -> list:
+        return await asyncio.gather(*(questions.get("Designer", generate) for _ in range(5)))
+
+    assert len(set(asyncio.run(run()))) == 1
+    assert generate.roles == ["designer"]
+
+
+def test_failed_generation_reaches_every_caller_and_is_not_cached(config):
+    questions = OpeningQuestionCache(config)
+    failing = StubGenerator(delay=0.02, error=LLMError("backend down"))
+
+    async def run() -> list:
+        results = await asyncio.gather(*(questions.get("Designer", failing) for _ in range(3)), return_exceptions=True)
+        generate = StubGenerator()
+        await questions.get("Designer", generate)
+        return results + generate.roles
+
+    *results, retried = asyncio.run(run())
+    assert all(isinstance(result, LLMError) for result in results)
+    assert failing.roles == ["designer"]
+    assert retried == "designer"
+
+
+def test_questions_expire_after_the_ttl(config):
+    config["opening_questions"]["ttl_seconds"] = 0.05
+    questions = OpeningQuestionCache(config)
+    generate = StubGenerator()
+    asyncio.run(questions.get("Designer", generate))
+    asyncio.run(questions.get("Designer", generate))
+    time.sleep(0.06)
+    asyncio.run(questions.get("Designer", generate))
+    assert generate.roles == ["designer", "designer"]
+
+
+def test_opening_question_is_served_from_the_cache(config, monkeypatch):
+    questions = OpeningQuestionCache(config)
+    generate = StubGenerator()
+    monkeypatch.setattr(InterviewChain, "generate_opening_template", lambda chain, role: generate(role))
+
+    async def start(name: str) -> InterviewChain:
+        chain = InterviewChain(
+            config,
+            retriever=object(),
+            http_client=object(),
+            llm_router=object(),
+            evaluator=object(),
+            opening_questions=questions,
+        )
+        chain.init_new_session()
+        chain.add_candidate_info(name=name, role="Designer", email="")
+        await chain.generate_opening_question()
+        return chain
+
+    first, second = asyncio.run(start("Ada")), asyncio.run(start("Grace"))
+    assert generate.roles == ["designer"]
+    assert second.question_count == 1
+    assert second.history.turns == [
+        ("Candidate", second.opening_input("Grace", "Designer")),
+        ("Interviewer", "Welcome Grace! Why do you want to work as a designer?"),
+    ]
+    assert first.history.latest() == "Welcome Ada! Why do you want to work as a designer?"
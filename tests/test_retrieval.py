@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+import yaml
+from langchain_community.vectorstores import FAISS
+
+from llm.embeddings import FakeEmbedding
+from llm.retrieval import MB, EmbeddingBatcher, Retriever
+
+VECTOR_BYTES = 8 * 384 + 64
+
+
+class CountingEmbedding(FakeEmbedding):
+    """`FakeEmbedding` recording each batch of queries it embeds."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = []
+
+    def embed_queries(self, texts: list) -> list:
+        self.batches.append(list(texts))
+        return super().embed_queries(texts)
+
+
+@pytest.fixture
+def config() -> dict:
+    with open("llm/config.yml") as config_file:
+        return yaml.safe_load(config_file)
+
+
+def embed_concurrently(batcher: EmbeddingBatcher, texts: list) -> list:
+    """Embed each text from its own thread, all started together."""
+    results = [None] * len(texts)
+    start = threading.Barrier(len(texts))
+
+    def embed(index: int) -> None:
+        start.wait()
+        try:
+            results[index] = batcher.embed(texts[index])
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=embed, args=(index,)) for index in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_queries_share_one_model_call():
+    embedding = CountingEmbedding()
+    batcher = EmbeddingBatcher(embedding.embed_queries, max_batch_size=16, max_wait_ms=200)
+    texts = [f"query {i}" for i in range(6)]
+    results = embed_concurrently(batcher, texts)
+    assert len(embedding.batches) == 1
+    assert sorted(embedding.batches[0]) == texts
+    # Every caller gets the vector of its own text.
+    assert results == [embedding.embed_query(text) for text in texts]
+
+
+def test_batches_are_capped_and_failures_reach_every_caller():
+    embedding = CountingEmbedding()
+    batcher = EmbeddingBatcher(embedding.embed_queries, max_batch_size=4, max_wait_ms=200)
+    embed_concurrently(batcher, [f"query {i}" for i in range(10)])
+    assert sum(len(batch) for batch in embedding.batches) == 10
+    assert max(len(batch) for batch in embedding.batches) == 4
+
+    def fail(texts: list) -> list:
+        raise RuntimeError("model unavailable")
+
+    results = embed_concurrently(EmbeddingBatcher(fail, max_batch_size=4, max_wait_ms=50), ["a", "b", "c"])
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def vectorstore(embedding: FakeEmbedding, texts: list) -> FAISS:
+    return FAISS.from_texts(texts, embedding)
+
+
+def test_query_embeddings_and_results_are_cached(config):
+    config["retrieval"].update(embedding_cache_mb=2 * VECTOR_BYTES / MB, batch_wait_ms=0)
+    embedding = CountingEmbedding()
+    retriever = Retriever(vectorstore(embedding, ["Teams share the work.", "Leaders set priorities."]), config)
+
+    first = retriever.search("How do teams  work?", k=1)
+    assert retriever.search(" How do teams work? ", k=1) is first
+    # Another k misses the result cache, but not the embedding cache.
+    assert len(retriever.search("How do teams work?", k=2)) == 2
+    assert embedding.batches == [["How do teams work?"]]
+
+    # The least recently used query embedding is evicted first.
+    retriever.embed_query("b")
+    retriever.embed_query("How do teams work?")
+    retriever.embed_query("c")
+    retriever.embed_query("How do teams work?")
+    retriever.embed_query("b")
+    assert embedding.batches[1:] == [["b"], ["c"], ["b"]]
+
+
+@pytest.mark.parametrize("mode", ["faiss", "exact"])
+def test_swap_serves_the_new_index(config, mode):
+    config["retrieval"].update(mode=mode, batch_wait_ms=0)
+    embedding = CountingEmbedding()
+    retriever = Retriever(vectorstore(embedding, ["Teams share the work."]), config)
+    assert [doc.page_content for doc in retriever.search("teams", k=1)] == ["Teams share the work."]
+
+    retriever.swap(vectorstore(embedding, ["Leaders set priorities.", "Teams write down decisions."]))
+    assert retriever.generation == 1
+    # Results cached over the previous index are not served.
+    assert {doc.page_content for doc in retriever.search("teams", k=2)} == {
+        "Leaders set priorities.",
+        "Teams write down decisions.",
+    }
+    assert len(embedding.batches) == 1
@@ -0,0 +1,128 @@
+import asyncio
+from typing import Optional
+
+import pytest
+import yaml
+
+from llm.scheduler import (
+    EVALUATION,
+    START,
+    TURN,
+    LLMOverloadedError,
+    LLMScheduler,
+    admit,
+)
+
+
+@pytest.fixture
+def config() -> dict:
+    with open("llm/config.yml") as config_file:
+        config = yaml.safe_load(config_file)
+    config["scheduler"].update(
+        max_concurrent=1,
+        max_concurrent_evaluations=1,
+        max_queued={TURN: 2, START: 2, EVALUATION: 2},
+        max_wait_seconds={TURN: 0, START: 0, EVALUATION: 0},
+        disconnect_check_seconds=0.01,
+    )
+    return config
+
+
+def test_free_slot_goes_to_the_highest_class(config):
+    scheduler = LLMScheduler(config)
+    granted = []
+
+    async def generation(priority: str) -> None:
+        async with scheduler.slot(priority):
+            granted.append(priority)
+
+    async def run() -> None:
+        await scheduler.acquire(TURN)
+        tasks = []
+        for priority in (EVALUATION, START, TURN):
+            tasks.append(asyncio.create_task(generation(priority)))
+            await asyncio.sleep(0)
+        assert [scheduler.queue_depth(priority) for priority in (TURN, START, EVALUATION)] == [1, 2, 3]
+        scheduler.release(TURN)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert granted == [TURN, START, EVALUATION]
+    assert scheduler.running == {TURN: 0, START: 0, EVALUATION: 0}
+
+
+def test_full_queue_is_turned_away_with_429(config):
+    scheduler = LLMScheduler(config)
+
+    async def run() -> LLMOverloadedError:
+        await scheduler.acquire(TURN)
+        waiters = [asyncio.create_task(scheduler.acquire(TURN)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError) as error:
+            await scheduler.acquire(TURN)
+        with pytest.raises(LLMOverloadedError):
+            scheduler.check(TURN)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.queue_depth == 2
+    assert int(error.headers["Retry-After"]) >= 1
+    assert error.headers["X-Queue-Depth"] == "2"
+
+
+def test_generation_waiting_too_long_is_dropped_with_503(config):
+    config["scheduler"]["max_wait_seconds"][START] = 0.05
+    scheduler = LLMScheduler(config)
+
+    async def run() -> LLMOverloadedError:
+        await scheduler.acquire(TURN)
+        with pytest.raises(LLMOverloadedError) as error:
+            await scheduler.acquire(START)
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert int(error.headers["Retry-After"]) >= 1
+    assert scheduler.queue_depth(EVALUATION) == 0
+
+
+def test_expired_and_disconnected_waiters_are_skipped(config):
+    config["scheduler"]["max_queued"][TURN] = 3
+    scheduler = LLMScheduler(config)
+    gone = False
+    granted = []
+
+    async def is_disconnected() -> bool:
+        return gone
+
+    async def generation(name: str, timeout: Optional[float] = None, disconnect: bool = False) -> None:
+        admit(timeout, is_disconnected if disconnect else None)
+        try:
+            await scheduler.acquire(TURN)
+        except LLMOverloadedError as e:
+            granted.append((name, e.status_code))
+            return
+        granted.append((name, "granted"))
+        scheduler.release(TURN)
+
+    async def run() -> None:
+        nonlocal gone
+        await scheduler.acquire(TURN)
+        expired = asyncio.create_task(generation("expired", timeout=0.02))
+        disconnected = asyncio.create_task(generation("disconnected", disconnect=True))
+        waiting = asyncio.create_task(generation("waiting"))
+        await asyncio.sleep(0.05)
+        gone = True
+        await asyncio.gather(expired, disconnected)
+        assert scheduler.queue_depth(TURN) == 1
+        scheduler.release(TURN)
+        await waiting
+
+    asyncio.run(run())
+    assert granted == [("expired", 503), ("disconnected", 503), ("waiting", "granted")]
+    assert scheduler.running[TURN] == 0
+    assert scheduler.queue_depth(EVALUATION) == 0
@@ -0,0 +1,68 @@
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from llm.session_backends import RedisSessionBackend
+
+
+@pytest.fixture
+def backend(monkeypatch) -> RedisSessionBackend:
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server))
+    backend = RedisSessionBackend("redis://redis-service:6379/0", ttl_seconds=60)
+    yield backend
+    backend.close()
+
+
+def test_put_get_delete(backend):
+    backend.create("s1", {"turns": 0, "question_count": 0})
+    assert backend.load("s1") == ({"turns": 0, "question_count": 0}, [])
+
+    backend.append("s1", [("Candidate", "Hi"), ("Interviewer", "Tell me about a project.")], {"turns": 2})
+    backend.append("s1", [("Candidate", "I led a migration.")], {"turns": 3})
+    meta, turns = backend.load("s1")
+    assert meta == {"turns": 3}
+    assert turns == [
+        ("Candidate", "Hi"),
+        ("Interviewer", "Tell me about a project."),
+        ("Candidate", "I led a migration."),
+    ]
+    assert backend.load("s1", since=2) == ({"turns": 3}, [("Candidate", "I led a migration.")])
+    assert backend.load("s1", since=3) == ({"turns": 3}, [])
+
+    backend.delete("s1")
+    assert backend.load("s1") is None
+    assert backend.load("unknown") is None
+
+
+def test_create_replaces_a_session(backend):
+    backend.create("s1", {"turns": 0})
+    backend.append("s1", [("Candidate", "Hi")], {"turns": 1})
+    backend.create("s1", {"turns": 0})
+    assert backend.load("s1") == ({"turns": 0}, [])
+
+
+def test_writes_refresh_the_ttl(backend):
+    backend.create("s1", {"turns": 0})
+    backend.append("s1", [("Candidate", "Hi")], {"turns": 1})
+    for key in backend.keys("s1"):
+        assert 0 < backend.client.ttl(key) <= 60
+
+
+def test_sessions_expire(backend):
+    backend.ttl_seconds = 1
+    backend.create("s1", {"turns": 0})
+    backend.append("s1", [("Candidate", "Hi")], {"turns": 1})
+    time.sleep(1.1)
+    assert backend.load("s1") is None
+    assert not any(backend.client.exists(key) for key in backend.keys("s1"))
+
+
+def test_jobs_are_shared(backend):
+    job = {"id": "j1", "session_id": "s1", "status": "done", "result": "{}", "error": None, "attempts": 1}
+    backend.put_job(job)
+    assert backend.get_job("j1") == job
+    assert backend.get_job("unknown") is None
+    assert 0 < backend.client.ttl("session:job:j1") <= 60
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+import yaml
+
+from llm.interview_chain import InterviewChain
+from llm.session_backends import MemorySessionBackend, SQLiteSessionBackend
+from llm.session_store import SessionNotFoundError, SessionRegistry
+
+
+@pytest.fixture
+def config(monkeypatch) -> dict:
+    monkeypatch.setenv("OLLAMA_URL", "http://ollama")
+    monkeypatch.setenv("DB_SERVICE_URL", "http://db")
+    with open("llm/config.yml") as config_file:
+        return yaml.safe_load(config_file)
+
+
+@pytest.fixture
+def backend(tmp_path) -> SQLiteSessionBackend:
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"), ttl_seconds=60)
+    yield backend
+    backend.close()
+
+
+def registry(config: dict, backend, **limits) -> SessionRegistry:
+    """A registry whose chains have no retriever, router or evaluator; only their session state is used."""
+
+    def factory() -> InterviewChain:
+        return InterviewChain(config, retriever=object(), http_client=object(), llm_router=object(), evaluator=object())
+
+    return SessionRegistry(
+        factory,
+        backend,
+        ttl_seconds=limits.get("ttl_seconds", 60),
+        max_sessions=limits.get("max_sessions", 10),
+        max_memory_mb=limits.get("max_memory_mb", 10),
+    )
+
+
+def test_cached_session_catches_up_with_other_replicas(config, backend):
+    local, remote = registry(config, backend), registry(config, backend)
+
+    async def run() -> list:
+        chain = await local.create()
+        session_id = str(chain.session_id)
+        chain.update_history("Hi", "Candidate")
+        await local.save(chain)
+
+        other = await remote.get(session_id)
+        other.update_history("Tell me about a project.", "Interviewer")
+        await remote.save(other)
+
+        chain = await local.get(session_id)
+        return chain.history.turns
+
+    assert asyncio.run(run()) == [("Candidate", "Hi"), ("Interviewer", "Tell me about a project.")]
+
+
+def test_unsaved_turns_are_replaced_by_the_backend_state(config, backend):
+    local, remote = registry(config, backend), registry(config, backend)
+
+    async def run() -> tuple:
+        chain = await local.create()
+        session_id = str(chain.session_id)
+        # A stream cut short on this replica, whose turn never reached the backend.
+        chain.update_history("Lost answer", "Candidate")
+
+        other = await remote.get(session_id)
+        other.update_history("Hi", "Candidate")
+        other.update_history("Tell me about a project.", "Interviewer")
+        await remote.save(other)
+
+        rebuilt = await local.get(session_id)
+        return rebuilt is chain, rebuilt.history.turns, rebuilt.persisted_turns
+
+    rebuilt_is_cached, turns, persisted_turns = asyncio.run(run())
+    assert not rebuilt_is_cached
+    assert turns == [("Candidate", "Hi"), ("Interviewer", "Tell me about a project.")]
+    assert persisted_turns == 2
+
+
+def test_turn_in_progress_keeps_the_cached_chain(config, backend):
+    sessions = registry(config, backend)
+
+    async def run() -> bool:
+        chain = await sessions.create()
+        async with chain.lock:
+            chain.update_history("Hi", "Candidate")
+            return await sessions.get(str(chain.session_id)) is chain
+
+    assert asyncio.run(run())
+
+
+def cached_sessions(sessions: SessionRegistry, *chains: InterviewChain) -> list:
+    """Which of the chains are still cached, by their position."""
+
+    async def run() -> list:
+        found = []
+        for index, chain in enumerate(chains):
+            try:
+                await sessions.get(str(chain.session_id))
+            except SessionNotFoundError:
+                continue
+            found.append(index)
+        return found
+
+    return asyncio.run(run())
+
+
+def test_idle_sessions_expire(config):
+    sessions = registry(config, MemorySessionBackend(), ttl_seconds=0.05)
+    idle = asyncio.run(sessions.create())
+    time.sleep(0.06)
+    recent = asyncio.run(sessions.create())
+    assert cached_sessions(sessions, idle, recent) == [1]
+    assert sessions.memory_usage() == recent.memory_footprint()
+
+
+def test_least_recently_used_session_is_evicted(config):
+    sessions = registry(config, MemorySessionBackend(), max_sessions=2)
+    first = asyncio.run(sessions.create())
+    second = asyncio.run(sessions.create())
+    asyncio.run(sessions.get(str(first.session_id)))
+    third = asyncio.run(sessions.create())
+    assert cached_sessions(sessions, first, second, third) == [0, 2]
+
+
+def test_memory_cap_evicts_the_least_recently_used_sessions(config):
+    empty = registry(config, MemorySessionBackend()).factory()
+    empty.init_new_session()
+    sessions = registry(config, MemorySessionBackend(), max_memory_mb=(3 * empty.memory_footprint() + 8) / 1024 / 1024)
+
+    async def run() -> tuple:
+        chains = [await sessions.create() for _ in range(3)]
+        assert sessions.memory_usage() == sum(chain.memory_footprint() for chain in chains)
+        # The growth is counted when the turn is saved, and the least recently used session makes room.
+        chains[1].update_history("I led a migration.", "Candidate")
+        await sessions.save(chains[1])
+        return chains
+
+    chains = asyncio.run(run())
+    assert len(sessions) == 2
+    assert sessions.memory_usage() == chains[1].memory_footprint() + chains[2].memory_footprint()
+    assert cached_sessions(sessions, *chains) == [1, 2]
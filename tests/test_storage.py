@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from db import compression
+from db.compression import HEADER, TextCodec, train_dictionary
+from db.migrate import migrate
+from db.storage import ConnectionPool, Storage, conversation_row
+
+TOPICS = ("a migration", "an outage", "a hiring plan", "a code review", "a product launch", "a vendor dispute")
+
+
+def open_storage(path, **options) -> Storage:
+    return Storage(ConnectionPool(str(path), size=2, cache_mb=2, mmap_mb=0, busy_timeout_ms=5000), **options)
+
+
+@pytest.fixture
+def storage(tmp_path) -> Storage:
+    storage = open_storage(tmp_path / "conversations.db")
+    yield storage
+    storage.pool.close()
+
+
+def row(session_id: str, conversation: str = "Candidate: I led a migration.") -> tuple:
+    return conversation_row(session_id, '{"role": "Engineer"}', conversation, "Good.")
+
+
+def transcript(rng: random.Random) -> str:
+    """A transcript long enough to be compressed."""
+    return "\n".join(
+        f"Interviewer: Tell me about {rng.choice(TOPICS)}.\nCandidate: I worked through {rng.choice(TOPICS)} with my "
+        f"team over {rng.randint(2, 9)} weeks and we shipped it."
+        for _ in range(6)
+    )
+
+
+def test_saving_a_session_again_keeps_one_row(storage):
+    assert storage.insert_conversations([row("s1"), row("s2")]) == 2
+    # A retried save, alone or in a batch with new interviews, only adds the new ones.
+    assert storage.insert_conversations([row("s1")]) == 0
+    assert storage.insert_conversations([row("s2"), row("s3"), row("s3")]) == 1
+    assert [len(storage.get_logs(session_id)) for session_id in ("s1", "s2", "s3")] == [1, 1, 1]
+    assert len(storage.search("migration", limit=10)) == 3
+
+
+def test_saving_again_without_full_text_search(tmp_path):
+    storage = open_storage(tmp_path / "plain.db", full_text_search=False)
+    assert storage.insert_conversations([row("s1"), row("s1")]) == 1
+    assert storage.insert_conversations([row("s1")]) == 0
+    assert len(storage.get_logs("s1")) == 1
+    storage.pool.close()
+
+
+@pytest.mark.parametrize("storage_format, codec", [("zlib", compression.ZLIB), ("zstd", compression.ZSTD)])
+def test_codec_round_trip(storage_format, codec):
+    text = transcript(random.Random(0))
+    value = TextCodec(storage_format).encode(text)
+    assert isinstance(value, bytes) and len(value) < len(text.encode())
+    assert HEADER.unpack_from(value) == (codec, 0)
+    # Any codec reads every format, and plain text as is.
+    assert TextCodec("text").decode(value) == text
+    assert TextCodec(storage_format).encode("Short.") == "Short."
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        TextCodec("text").decode(HEADER.pack(9, 0) + b"data")
+
+
+def test_zstd_values_name_their_dictionary(tmp_path):
+    rng = random.Random(0)
+    storage = open_storage(tmp_path / "conversations.db", storage_format="zstd")
+    dictionary_id = storage.add_dictionary(train_dictionary([transcript(rng) for _ in range(300)], 4096))
+    text = transcript(rng)
+    value = storage.codec.encode(text)
+    assert HEADER.unpack_from(value) == (compression.ZSTD, dictionary_id)
+    storage.insert_conversations([row("s1", text)])
+    storage.pool.close()
+
+    # Another process loads the dictionary from the database to read the row.
+    reader = open_storage(tmp_path / "conversations.db", storage_format="text")
+    assert reader.get_logs("s1")[0][3] == text
+    reader.pool.close()
+    with pytest.raises(ValueError, match="Unknown compression dictionary"):
+        TextCodec("zstd").decode(value)
+
+
+def test_search_through_the_contentless_index(tmp_path):
+    storage = open_storage(tmp_path / "conversations.db", storage_format="zstd")
+    storage.insert_conversations(
+        [row("s1", "Candidate: I was migrating our billing service."), row("s2", "Candidate: I hired two engineers.")]
+    )
+    # Stemmed, and decompressed for the results.
+    hits = storage.search("migrate", limit=10, fields=("session_id", "conversation"))
+    assert [(hit["session_id"], hit["conversation"]) for hit in hits] == [
+        ("s1", "Candidate: I was migrating our billing service.")
+    ]
+    assert storage.search('"billing service" OR hired', limit=10, raw=True)
+    with pytest.raises(ValueError, match="Invalid search query"):
+        storage.search('"unterminated', limit=10, raw=True)
+
+    # The index keeps no copy of the text; a deleted row's entry is left behind but never returned.
+    with storage.pool.connection() as conn, conn:
+        conn.execute("DELETE FROM conversation WHERE session_id = 's1'")
+    assert storage.search("migrate", limit=10) == []
+    storage.pool.close()
+
+
+def test_migration_compresses_and_indexes_plain_rows(tmp_path):
+    rng = random.Random(0)
+    texts = [transcript(rng) for _ in range(5)]
+    # Rows stored before compression and full-text search.
+    old = open_storage(tmp_path / "conversations.db", full_text_search=False)
+    old.insert_conversations([row(f"s{i}", text) for i, text in enumerate(texts)])
+    old.pool.close()
+
+    storage = open_storage(tmp_path / "conversations.db", storage_format="zlib")
+    assert storage.search("weeks", limit=10) == []
+    assert migrate(storage, batch_size=2) == {"rewritten": 5, "indexed": 5}
+    with storage.pool.connection() as conn:
+        assert {value_type for (value_type,) in conn.execute("SELECT typeof(conversation) FROM conversation")} == {
+            "blob"
+        }
+    assert [storage.get_logs(f"s{i}")[0][3] for i in range(5)] == texts
+    assert len(storage.search("weeks", limit=10)) == 5
+    # Running it again finds nothing left to rewrite, and rebuilds the same index.
+    assert migrate(storage, batch_size=2) == {"rewritten": 0, "indexed": 5}
+    assert len(storage.search("weeks", limit=10)) == 5
+    storage.pool.close()
@@ -0,0 +1,32 @@
+from llm.streaming import IncrementalResponseProcessor
+
+
+def stream(tokens: list, stopwords: tuple = ("Candidate:",)) -> list:
+    """Feed tokens to a processor and return what it released after each, then at the end."""
+    processor = IncrementalResponseProcessor(list(stopwords))
+    return [processor.feed(token) for token in tokens] + [processor.finish()]
+
+
+def test_question_is_released_once_its_first_word_is_complete():
+    released = stream(["Can", " you", " tell", " me", " about", " a", " time", " you", " led", " a", " team", "?"])
+    assert released[:2] == ["", "Can you"]
+    assert "".join(released) == "Can you tell me about a time you led a team?"
+
+
+def test_speaker_label_is_dropped():
+    released = stream(["Inter", "viewer", ":", " How", " do", " you", " prioritize", "?"])
+    assert "".join(released) == "How do you prioritize?"
+    assert released[:5] == ["", "", "", "", "How do"]
+
+
+def test_preamble_is_held_back_and_dropped():
+    released = stream(
+        ["Sure", "!", " Here", "'s", " my", " next", " question", ":\n\n", "How", " did", " it", " go", "?"]
+    )
+    assert "".join(released[:8]) == ""
+    assert "".join(released) == "How did it go?"
+
+
+def test_stopword_ends_the_question():
+    released = stream(["What", " went", " well", "?", "\n", "Cand", "idate", ":", " I"])
+    assert "".join(released) == "What went well?"
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from llm.jobs import JobStore
+from llm.warmup import Warmup
+
+
+class GatedLoad:
+    """Blocking load that waits for `release`, then fails with `error` until it is cleared, or returns a resource."""
+
+    def __init__(self, error: Exception = None) -> None:
+        self.error = error
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def release(self) -> None:
+        self.gate.set()
+
+    def __call__(self) -> str:
+        self.calls += 1
+        assert self.gate.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return "retriever"
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    monkeypatch.setenv("OLLAMA_URL", "http://ollama")
+    monkeypatch.setenv("DB_SERVICE_URL", "http://db")
+    from llm import api
+
+    monkeypatch.setitem(api.config["startup"], "warmup", True)
+    monkeypatch.setattr(api.opening_questions, "prewarm_roles", [])
+    # The app closes the job store on shutdown; each test starts it over a fresh one.
+    monkeypatch.setattr(api.evaluation_jobs, "store", JobStore(str(tmp_path / "jobs.sqlite")))
+    return api
+
+
+def poll_ready(client: TestClient, status: str) -> dict:
+    """Poll `/ready` until it reports `status`, and return its body."""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        body = client.get("/ready").json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.01)
+    raise AssertionError(f"/ready did not report {status!r}: {body}")
+
+
+def test_concurrent_waits_share_one_load():
+    load = GatedLoad()
+    warmup = Warmup(load, "retriever")
+
+    async def run() -> list:
+        waits = asyncio.gather(*(warmup.wait() for _ in range(3)))
+        await asyncio.sleep(0.01)
+        assert warmup.status() == {"name": "retriever", "ready": False, "loading": True, "seconds": None, "error": None}
+        load.release()
+        return await waits
+
+    assert asyncio.run(run()) == ["retriever"] * 3
+    assert load.calls == 1
+    assert warmup.ready and warmup.status()["seconds"] is not None
+
+
+def test_failed_load_reaches_the_waiters_and_is_retried():
+    load = GatedLoad(error=OSError("model not found"))
+    warmup = Warmup(load, "retriever")
+    load.release()
+
+    async def run() -> list:
+        results = await asyncio.gather(warmup.wait(), warmup.wait(), return_exceptions=True)
+        status = warmup.status()
+        load.error = None
+        return results, status, await warmup.wait()
+
+    results, status, value = asyncio.run(run())
+    assert all(isinstance(result, OSError) for result in results)
+    assert (status["ready"], status["loading"], status["error"]) == (False, False, "model not found")
+    assert value == "retriever" and load.calls == 2
+    assert warmup.status()["error"] is None
+
+
+def test_ready_reports_503_until_the_retriever_is_loaded(api, monkeypatch):
+    load = GatedLoad()
+    monkeypatch.setattr(api, "retriever", Warmup(load, "retriever"))
+    with TestClient(api.app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503 and response.json()["status"] == "loading"
+        load.release()
+        body = poll_ready(client, "ready")
+        assert body["warmup"]["ready"] and client.get("/ready").status_code == 200
+
+
+def test_failed_warmup_is_reported_and_loaded_again(api, monkeypatch):
+    load = GatedLoad(error=OSError("model not found"))
+    monkeypatch.setattr(api, "retriever", Warmup(load, "retriever"))
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    with TestClient(api.app) as client:
+        load.release()
+        body = poll_ready(client, "failed")
+        assert body["warmup"]["error"] == "model not found"
+        # Requests waiting for the retriever get the error instead of waiting forever.
+        response = client.post("/admin/reindex")
+        assert response.status_code == 500 and response.json()["detail"] == "model not found"
+
+        # Each failed probe starts another load, which succeeds once the model is available.
+        load.error = None
+        poll_ready(client, "ready")
+        assert client.get("/ready").status_code == 200
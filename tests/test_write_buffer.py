@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from llm.write_buffer import InterviewWriteBuffer, WriteBufferFullError
+
+
+class FakeDB:
+    """Stands in for `AsyncHTTPClient.post_db`, recording the batches and failing the first `failures` calls."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.batches = []
+        self.failures = failures
+
+    async def post_db(self, url: str, payload: dict) -> None:
+        await asyncio.sleep(0)
+        if self.failures:
+            self.failures -= 1
+            raise httpx.ConnectError("DB service unavailable")
+        self.batches.append([interview["session_id"] for interview in payload["conversations"]])
+
+
+def write_buffer(db: FakeDB, max_batch_size: int = 2, max_pending: int = 10) -> InterviewWriteBuffer:
+    return InterviewWriteBuffer(
+        db, "http://db", max_batch_size=max_batch_size, flush_interval_seconds=0.01, max_pending=max_pending
+    )
+
+
+def test_add_returns_once_the_batch_is_committed():
+    db = FakeDB()
+
+    async def run() -> None:
+        buffer = write_buffer(db)
+        await asyncio.gather(*(buffer.add({"session_id": str(i)}) for i in range(3)))
+        assert not buffer.pending
+
+    asyncio.run(run())
+    assert sorted(session for batch in db.batches for session in batch) == ["0", "1", "2"]
+    assert sorted(len(batch) for batch in db.batches) == [1, 2]
+
+
+def test_failed_batch_raises_to_its_callers():
+    db = FakeDB(failures=1)
+
+    async def run() -> None:
+        buffer = write_buffer(db)
+        with pytest.raises(httpx.ConnectError):
+            await buffer.add({"session_id": "lost"})
+        await buffer.add({"session_id": "retried"})
+
+    asyncio.run(run())
+    assert db.batches == [["retried"]]
+
+
+def test_full_buffer_rejects_interviews():
+    db = FakeDB()
+
+    async def run() -> None:
+        buffer = write_buffer(db, max_batch_size=10, max_pending=1)
+        first = asyncio.create_task(buffer.add({"session_id": "first"}))
+        await asyncio.sleep(0)
+        with pytest.raises(WriteBufferFullError):
+            await buffer.add({"session_id": "second"})
+        await first
+
+    asyncio.run(run())
+    assert db.batches == [["first"]]